@@ -0,0 +1,29 @@
+"""
+Append-only audit event log
+
+Every mutating endpoint calls record_event() before it commits, so the event
+is written in the same transaction as the change it describes: both land or
+neither does. Rows are only ever inserted (database triggers reject UPDATE
+and DELETE), carry no foreign keys, and are read as range scans on
+(occurred_at, id) or (subject_type, subject_id), so old ranges can be moved
+to partitions or archived without touching the rest of the schema.
+"""
+from datetime import datetime, timezone
+from typing import Optional
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session
+from models import AuditEvent, User
+
+def record_event(db: Session, actor: Optional[User], action: str, subject_type: str, subject_id=None, **details) -> AuditEvent:
+    """Add an event to the caller's transaction; it is written by the caller's commit"""
+    event = AuditEvent(
+        occurred_at=datetime.now(timezone.utc),
+        actor_id=actor.id if actor is not None else None,
+        actor_email=actor.email if actor is not None else None,
+        action=action,
+        subject_type=subject_type,
+        subject_id=str(subject_id) if subject_id is not None else None,
+        details=jsonable_encoder(details) if details else None
+    )
+    db.add(event)
+    return event
@@ -1,13 +1,24 @@
 from datetime import datetime, timedelta
+import asyncio
 from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from dataclasses import dataclass
+import threading
+import time
+import uuid
 from jose import JWTError, jwt
 import bcrypt
+import hashlib
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from database import get_db
-from models import User
+from database import get_db, get_async_db
+from models import User, UserRole, UserStatus
 from schemas import TokenData
+from token_revocation import revocation_store
 import os
 from dotenv import load_dotenv
 
@@ -16,51 +27,244 @@ load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "14"))
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", "10000"))
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+# bcrypt releases the GIL, so a small thread pool is enough to keep hashing off the
+# request threads while capping how many CPU-bound hashes run at once per worker.
+_password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+
+def configure_password_pool(max_workers: int):
+    """Replace the bcrypt pool with one of the given size (used by benchmarks and tuning)"""
+    global _password_executor
+    old_executor = _password_executor
+    _password_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+    old_executor.shutdown(wait=True)
+
+def _checkpw(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
 
-def get_password_hash(password: str) -> str:
-    salt = bcrypt.gensalt()
+def _hashpw(password: str) -> str:
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
     return hashed.decode('utf-8')
 
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return _password_executor.submit(_checkpw, plain_password, hashed_password).result()
+
+def get_password_hash(password: str) -> str:
+    return _password_executor.submit(_hashpw, password).result()
+
+# For async def handlers: the event loop keeps serving other requests while the pool hashes
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await asyncio.wrap_future(_password_executor.submit(_checkpw, plain_password, hashed_password))
+
+async def get_password_hash_async(password: str) -> str:
+    return await asyncio.wrap_future(_password_executor.submit(_hashpw, password))
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """True if the hash was made with a bcrypt cost other than BCRYPT_ROUNDS"""
+    try:
+        # bcrypt hashes look like $2b$12$<salt+hash>
+        rounds = int(hashed_password.split("$")[2])
+    except (IndexError, ValueError):
+        return True
+    return rounds != BCRYPT_ROUNDS
+
+def hash_token(token: str) -> str:
+    """Digest stored for email verification and password reset tokens (the raw token is only emailed)"""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    # Float iat so a revocation made in the same second as issuance is ordered correctly
+    to_encode.update({"exp": expire, "iat": time.time(), "type": "access"})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
-    credentials_exception = HTTPException(
+def create_refresh_token(data: dict) -> str:
+    to_encode = data.copy()
+    expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    to_encode.update({"exp": expire, "iat": time.time(), "type": "refresh", "jti": uuid.uuid4().hex})
+    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+def create_token_pair(user: User) -> dict:
+    data = {"sub": user.email, "user_id": user.id, "role": user.role}
+    return {
+        "access_token": create_access_token(data),
+        "refresh_token": create_refresh_token(data),
+        "token_type": "bearer"
+    }
+
+def decode_refresh_token(token: str) -> Optional[dict]:
+    """Payload of a valid, unexpired refresh token, or None"""
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    if payload.get("type") != "refresh" or not payload.get("sub") or not payload.get("jti"):
+        return None
+    return payload
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """Identity of the authenticated caller, served from the user cache without a query
+    
+    Handlers that need the rest of the row (balances, quotas, the user itself in a
+    response) load it with load_user or the *_row dependencies below.
+    """
+    id: int
+    email: str
+    role: UserRole
+    status: UserStatus
+    property_id: Optional[int]
+
+class UserCache:
+    """Size-bounded LRU of token subject (email) -> CurrentUser with a short TTL"""
+    
+    def __init__(self, ttl_seconds: float, max_size: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, email: str) -> Optional[CurrentUser]:
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is None:
+                return None
+            current_user, expires = entry
+            if expires < time.monotonic():
+                del self._entries[email]
+                return None
+            self._entries.move_to_end(email)
+            return current_user
+    
+    def set(self, email: str, user: User) -> CurrentUser:
+        current_user = CurrentUser(
+            id=user.id, email=user.email, role=user.role, status=user.status, property_id=user.property_id
+        )
+        if self.ttl_seconds <= 0 or self.max_size <= 0:
+            return current_user
+        with self._lock:
+            self._entries[email] = (current_user, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(email)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return current_user
+    
+    def invalidate(self, email: str):
+        with self._lock:
+            self._entries.pop(email, None)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+user_cache = UserCache(USER_CACHE_TTL_SECONDS, USER_CACHE_MAX_SIZE)
+
+def invalidate_cached_user(*emails: str):
+    """Drop cached identities after a member's status, role, property or email changes"""
+    for email in emails:
+        if email:
+            user_cache.invalidate(email)
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def _token_subject(token: str) -> str:
+    """Email from a valid, unrevoked access token"""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
+        if email is None or payload.get("type") == "refresh":
+            raise _credentials_exception()
+        if revocation_store.is_revoked(payload):
+            raise _credentials_exception()
         token_data = TokenData(email=email)
     except JWTError:
-        raise credentials_exception
-    user = db.query(User).filter(User.email == token_data.email).first()
+        raise _credentials_exception()
+    return token_data.email
+
+def _keep_loaded(db, user: User):
+    # The identity map only holds weak references; keep the row for the rest of the
+    # request so a handler that loads it on a cache miss doesn't query it again
+    db.info["current_user_row"] = user
+
+# A cache hit costs no query; the session only connects on a miss
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> CurrentUser:
+    email = _token_subject(token)
+    cached = user_cache.get(email)
+    if cached is not None:
+        return cached
+    user = db.query(User).filter(User.email == email).first()
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
+    _keep_loaded(db, user)
+    return user_cache.set(email, user)
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> CurrentUser:
+    email = _token_subject(token)
+    cached = user_cache.get(email)
+    if cached is not None:
+        return cached
+    user = (await db.execute(select(User).filter(User.email == email))).scalars().first()
+    if user is None:
+        raise _credentials_exception()
+    _keep_loaded(db, user)
+    return user_cache.set(email, user)
+
+def _current_row(current_user: CurrentUser, user: Optional[User]) -> User:
+    # Deleted or given another email (in another worker) within the cache TTL
+    if user is None or user.email != current_user.email:
+        user_cache.invalidate(current_user.email)
+        raise _credentials_exception()
     return user
 
-def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
+def load_user(db: Session, current_user: CurrentUser) -> User:
+    """The User row behind a cached identity (401 if it no longer exists)"""
+    return _current_row(current_user, db.get(User, current_user.id))
+
+async def load_user_async(db: AsyncSession, current_user: CurrentUser) -> User:
+    return _current_row(current_user, await db.get(User, current_user.id))
+
+def get_current_active_user(current_user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
     if current_user.status != "active":
         raise HTTPException(status_code=400, detail="User is not active")
     return current_user
 
-def get_current_admin_user(current_user: User = Depends(get_current_user)) -> User:
+async def get_current_active_user_async(current_user: CurrentUser = Depends(get_current_user_async)) -> CurrentUser:
+    if current_user.status != "active":
+        raise HTTPException(status_code=400, detail="User is not active")
+    return current_user
+
+# For handlers that read or change more than the identity; same session as the handler's own get_db
+def get_current_user_row(current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)) -> User:
+    return load_user(db, current_user)
+
+def get_current_active_user_row(
+    current_user: CurrentUser = Depends(get_current_active_user), db: Session = Depends(get_db)
+) -> User:
+    return load_user(db, current_user)
+
+async def get_current_active_user_row_async(
+    current_user: CurrentUser = Depends(get_current_active_user_async), db: AsyncSession = Depends(get_async_db)
+) -> User:
+    return await load_user_async(db, current_user)
+
+def get_current_admin_user(current_user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not enough permissions")
     return current_user
@@ -0,0 +1,163 @@
+"""
+Benchmark sync vs async database handlers at equal worker counts
+
+Serves two routes that run the same availability queries (bookings, maintenance
+blocks and calendar for a 60-day window): one a sync def on get_db, which runs in
+Starlette's threadpool, the other an async def on get_async_db. Both are served by
+uvicorn with the same number of workers and driven at the same concurrency.
+Uses a throwaway SQLite database unless DATABASE_URL is set (Postgres gives the
+meaningful numbers; SQLite serializes access).
+
+Usage:
+    cd backend
+    python -m benchmarks.async_db --workers 2 --concurrency 100 --duration 10
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench_async.db")
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from database import Base, SessionLocal, engine, get_async_db, get_db
+from models import Booking, BookingStatus, Cottage, MaintenanceBlock, Property, SystemCalendar, User
+
+START = date(2030, 1, 1)
+END = START + timedelta(days=60)
+
+def _statements(cottage_id: int):
+    return [
+        select(Booking.check_in, Booking.check_out).filter(
+            Booking.cottage_id == cottage_id,
+            Booking.check_in <= END,
+            Booking.check_out > START,
+            Booking.status.in_([BookingStatus.PENDING, BookingStatus.CONFIRMED])
+        ),
+        select(MaintenanceBlock.start_date, MaintenanceBlock.end_date).filter(
+            MaintenanceBlock.cottage_id == cottage_id,
+            MaintenanceBlock.start_date <= END,
+            MaintenanceBlock.end_date >= START
+        ),
+        select(SystemCalendar.date, SystemCalendar.is_holiday).filter(
+            SystemCalendar.date >= START,
+            SystemCalendar.date <= END
+        ),
+    ]
+
+app = FastAPI()
+
+@app.get("/sync/{cottage_id}")
+def sync_availability(cottage_id: int, db: Session = Depends(get_db)):
+    return {"rows": sum(len(db.execute(stmt).all()) for stmt in _statements(cottage_id))}
+
+@app.get("/async/{cottage_id}")
+async def async_availability(cottage_id: int, db: AsyncSession = Depends(get_async_db)):
+    rows = 0
+    for stmt in _statements(cottage_id):
+        rows += len((await db.execute(stmt)).all())
+    return {"rows": rows}
+
+def seed(cottages: int = 20):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        if db.query(Cottage).count():
+            return
+        property_obj = Property(name="Benchmark Property")
+        db.add(property_obj)
+        db.flush()
+        owner = User(email="bench-async@example.com", phone="0", name="Bench", password_hash="x", property_id=property_obj.id)
+        db.add(owner)
+        db.flush()
+        for i in range(cottages):
+            cottage = Cottage(property_id=property_obj.id, cottage_id=f"B-{i}", capacity=4)
+            db.add(cottage)
+            db.flush()
+            for week in range(0, 52, 2):
+                check_in = START + timedelta(weeks=week)
+                db.add(Booking(user_id=owner.id, cottage_id=cottage.id, check_in=check_in,
+                               check_out=check_in + timedelta(days=3), status=BookingStatus.CONFIRMED))
+        db.commit()
+    finally:
+        db.close()
+
+async def drive(base_url: str, path: str, concurrency: int, duration: float) -> dict:
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    
+    async def client_loop(client: httpx.AsyncClient, worker: int):
+        nonlocal errors
+        i = worker
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                response = await client.get(f"{path}/{i % 20 + 1}")
+                if response.status_code != 200:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+            i += concurrency
+    
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(client, w) for w in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else 0,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0,
+    }
+
+def wait_until_up(base_url: str, timeout: float = 30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.get(f"{base_url}/sync/1", timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError("Benchmark server did not start")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    
+    seed()
+    base_url = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen([
+        sys.executable, "-m", "uvicorn", "benchmarks.async_db:app",
+        "--port", str(args.port), "--workers", str(args.workers), "--log-level", "warning"
+    ], env=os.environ.copy())
+    try:
+        wait_until_up(base_url)
+        print(f"workers: {args.workers}, concurrency: {args.concurrency}, duration: {args.duration}s")
+        print(f"{'handler':>8} {'req/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+        for name in ("sync", "async"):
+            result = asyncio.run(drive(base_url, f"/{name}", args.concurrency, args.duration))
+            print(f"{name:>8} {result['rps']:>10.1f} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} {result['errors']:>7}")
+    finally:
+        server.terminate()
+        server.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""
+Latency and SQL benchmark for the API hot paths
+
+Drives the app in-process (FastAPI TestClient) against a generated dataset and
+reports p50/p95/p99 latency and SQL statements per call for owner
+availability, calculate-cost, create_booking, the approval queue, inventory
+health, the audit trail, report statistics and login (the per-worker user
+cache is cleared before each call, so every call includes its authentication
+lookup). Results are written as
+JSON and compared with a stored baseline: a scenario that issues more
+statements per call than the baseline, or whose p95 grows by more than
+--tolerance, is reported as a regression and the run exits with code 1.
+
+Without DATABASE_URL a scratch SQLite database is migrated and filled by
+generate_dataset.py (--users/--bookings set its size). With DATABASE_URL the
+database must already be migrated and generated; create_booking leaves
+pending one-night bookings two years ahead there, so use a scratch database.
+
+Latencies depend on the machine and database; compare runs made on the same
+setup, and refresh the baseline (--save-baseline) when an intentional change
+moves the numbers.
+
+Usage:
+    cd backend
+    python -m benchmarks.hot_paths
+    python -m benchmarks.hot_paths --iterations 500 --output results.json
+    python -m benchmarks.hot_paths --save-baseline   # after an intentional change
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from datetime import date, datetime, timedelta, timezone
+
+SCRATCH_DATABASE = "DATABASE_URL" not in os.environ
+if SCRATCH_DATABASE:
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "hot_paths.db")
+# Measure the login handler, not the login throttle
+os.environ["LOGIN_RATE_LIMIT_EMAIL_BURST"] = os.environ["LOGIN_RATE_LIMIT_IP_BURST"] = "1000000000"
+
+from alembic import command
+from fastapi.testclient import TestClient
+from sqlalchemy import func
+from main import alembic_config, app
+from auth import create_access_token, user_cache
+from database import SessionLocal, engine
+from metrics import route_metrics
+from models import Booking, BookingStatus, Cottage, User, UserRole, UserStatus
+import generate_dataset
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "hot_paths.json")
+
+# request(i) returns the keyword arguments for the i-th call: path (formatted route), token, json, params
+Scenario = namedtuple("Scenario", "name method route request iterations")
+
+def seed_scratch_database(args):
+    command.upgrade(alembic_config(), "head")
+    dataset = argparse.Namespace(
+        users=args.users, bookings=args.bookings, properties=10, cottages_per_property=10, admins=2,
+        years=3, password=args.password, seed=42, batch_size=20_000, truncate=False
+    )
+    with contextlib.redirect_stdout(io.StringIO()):
+        generate_dataset.generate(dataset)
+
+def bookable_owners(db, needed: int):
+    """Active owners with a property, a free weekday credit and no overdrawn weekend credits (balance minus pending)"""
+    pending = db.query(
+        Booking.user_id,
+        func.sum(Booking.weekday_credits_used).label("weekday"),
+        func.sum(Booking.weekend_credits_used).label("weekend")
+    ).filter(Booking.status == BookingStatus.PENDING).group_by(Booking.user_id).subquery()
+    return db.query(User).outerjoin(pending, pending.c.user_id == User.id).filter(
+        User.role == UserRole.OWNER,
+        User.status == UserStatus.ACTIVE,
+        User.property_id.isnot(None),
+        User.weekday_balance - func.coalesce(pending.c.weekday, 0) >= 1,
+        User.weekend_balance - func.coalesce(pending.c.weekend, 0) >= 0
+    ).order_by(User.id).limit(needed).all()
+
+def scenarios(args) -> list:
+    db = SessionLocal()
+    try:
+        admin = db.query(User).filter(User.role == UserRole.ADMIN, User.status == UserStatus.ACTIVE).order_by(User.id).first()
+        owners = bookable_owners(db, args.iterations + args.warmup)
+        if admin is None or not owners:
+            raise SystemExit("❌ No active admin or bookable owner found; generate a dataset first (generate_dataset.py)")
+        first_cottage = {
+            property_id: cottage_id for property_id, cottage_id in db.query(
+                Cottage.property_id, func.min(Cottage.id)
+            ).group_by(Cottage.property_id)
+        }
+        owner = owners[0]
+        owner_cottage = first_cottage[owner.property_id]
+        tokens = {user.id: create_access_token({"sub": user.email}) for user in [admin] + owners}
+        login_email = owner.email
+    finally:
+        db.close()
+    
+    today = date.today()
+    # Weekday nights two years out: past the generated horizon, one distinct date per call
+    booking_nights = []
+    night = today + timedelta(days=730)
+    while len(booking_nights) < args.iterations + args.warmup:
+        if night.weekday() < 4:
+            booking_nights.append(night)
+        night += timedelta(days=1)
+    
+    def owner_request(**kwargs):
+        return lambda i: dict(token=tokens[owner.id], **kwargs)
+    
+    def admin_request(**kwargs):
+        return lambda i: dict(token=tokens[admin.id], **kwargs)
+    
+    def create_booking(i):
+        member = owners[i % len(owners)]
+        check_in = booking_nights[i]
+        return dict(
+            path="/api/owner/bookings", token=tokens[member.id],
+            json={"cottage_id": first_cottage[member.property_id], "check_in": check_in.isoformat(),
+                  "check_out": (check_in + timedelta(days=1)).isoformat()}
+        )
+    
+    stay = {"cottage_id": owner_cottage, "check_in": (today + timedelta(days=30)).isoformat(),
+            "check_out": (today + timedelta(days=33)).isoformat()}
+    window = {"start_date": today.isoformat(), "end_date": (today + timedelta(days=60)).isoformat()}
+    return [
+        Scenario("availability", "GET", "/api/owner/availability/{cottage_id}", owner_request(
+            path=f"/api/owner/availability/{owner_cottage}", params=window
+        ), args.iterations),
+        Scenario("calculate_cost", "POST", "/api/owner/calculate-cost", owner_request(
+            path="/api/owner/calculate-cost", json=stay
+        ), args.iterations),
+        Scenario("create_booking", "POST", "/api/owner/bookings", create_booking, args.iterations),
+        Scenario("approval_queue", "GET", "/api/admin/approval-queue", admin_request(
+            path="/api/admin/approval-queue"
+        ), args.iterations),
+        Scenario("inventory_health", "GET", "/api/admin/inventory-health", admin_request(
+            path="/api/admin/inventory-health",
+            params={"start_date": today.isoformat(), "end_date": (today + timedelta(days=30)).isoformat()}
+        ), args.iterations),
+        Scenario("audit_trail", "GET", "/api/admin/audit-trail", admin_request(
+            path="/api/admin/audit-trail",
+            params={"start_date": (today - timedelta(days=30)).isoformat(), "end_date": today.isoformat()}
+        ), args.iterations),
+        Scenario("reports_statistics", "GET", "/api/admin/reports/statistics", admin_request(
+            path="/api/admin/reports/statistics"
+        ), args.iterations),
+        Scenario("reports_occupancy", "GET", "/api/admin/reports/occupancy", admin_request(
+            path="/api/admin/reports/occupancy",
+            params={"start_date": (today - timedelta(days=365)).isoformat(), "end_date": today.isoformat()}
+        ), args.iterations),
+        # bcrypt dominates login, so it gets fewer calls
+        Scenario("login", "POST", "/api/auth/login", lambda i: dict(
+            path="/api/auth/login", token=None, json={"email": login_email, "password": args.password}
+        ), args.login_iterations),
+    ]
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def run_scenario(client, scenario: Scenario, warmup: int) -> dict:
+    def call(i):
+        # Every call pays for its authentication lookup, so statement counts don't depend on cache timing
+        user_cache.clear()
+        kwargs = scenario.request(i)
+        token = kwargs.pop("token")
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        return client.request(scenario.method, kwargs.pop("path"), headers=headers, **kwargs)
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(warmup):
+            call(i)
+    route_metrics.reset()
+    latencies = []
+    errors = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(warmup, warmup + scenario.iterations):
+            started = time.perf_counter()
+            response = call(i)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                errors += 1
+                last_error = f"{response.status_code}: {response.text[:200]}"
+    if errors:
+        print(f"   ❌ {scenario.name}: {errors} call(s) failed, last {last_error}")
+    latencies.sort()
+    return {
+        "method": scenario.method,
+        "route": scenario.route,
+        "calls": scenario.iterations,
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "statements_per_call": round(route_metrics.statement_total(scenario.method, scenario.route) / scenario.iterations, 2),
+    }
+
+def dataset_summary() -> dict:
+    db = SessionLocal()
+    try:
+        return {
+            "dialect": engine.dialect.name,
+            "users": db.query(User).count(),
+            "cottages": db.query(Cottage).count(),
+            "bookings": db.query(Booking).count(),
+        }
+    finally:
+        db.close()
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Regressions of results against baseline, as printable lines"""
+    regressions = []
+    print(f"\nCompared with baseline from {baseline['meta'].get('timestamp', 'unknown')}:")
+    if baseline["meta"].get("dataset") != results["meta"]["dataset"]:
+        print(f"   ⚠️  Baseline dataset differs ({baseline['meta'].get('dataset')}); latencies may not be comparable")
+    for name, current in results["scenarios"].items():
+        previous = baseline["scenarios"].get(name)
+        if previous is None:
+            print(f"   {name:20} new scenario, no baseline")
+            continue
+        print(
+            f"   {name:20} p95 {previous['p95_ms']:9.2f} -> {current['p95_ms']:9.2f} ms   "
+            f"statements {previous['statements_per_call']:7.2f} -> {current['statements_per_call']:7.2f}"
+        )
+        if current["statements_per_call"] > previous["statements_per_call"] + 0.01:
+            regressions.append(
+                f"{name}: {current['statements_per_call']} statements per call (baseline {previous['statements_per_call']})"
+            )
+        if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {current['p95_ms']} ms (baseline {previous['p95_ms']} ms)")
+        if current["errors"]:
+            regressions.append(f"{name}: {current['errors']} failed call(s)")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200, help="Measured calls per scenario")
+    parser.add_argument("--login-iterations", type=int, default=20, help="Measured calls for login (bcrypt-bound)")
+    parser.add_argument("--warmup", type=int, default=5, help="Unmeasured calls before each scenario")
+    parser.add_argument("--users", type=int, default=2000, help="Owners in the scratch dataset")
+    parser.add_argument("--bookings", type=int, default=100_000, help="Bookings in the scratch dataset")
+    parser.add_argument("--password", default="password123", help="Password of the generated accounts")
+    parser.add_argument("--output", default="hot_paths_results.json", help="Where to write this run's results")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed p95 growth over the baseline (0.25 = 25%%)")
+    args = parser.parse_args()
+    
+    if SCRATCH_DATABASE:
+        print(f"Generating a scratch dataset ({args.users} owners, {args.bookings} bookings)...")
+        seed_scratch_database(args)
+    
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "dataset": dataset_summary(),
+        },
+        "scenarios": {},
+    }
+    print(f"\n{'scenario':20} {'calls':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'stmts/call':>11}")
+    with TestClient(app) as client:
+        for scenario in scenarios(args):
+            result = run_scenario(client, scenario, args.warmup)
+            results["scenarios"][scenario.name] = result
+            print(
+                f"{scenario.name:20} {result['calls']:6} {result['p50_ms']:9.2f} {result['p95_ms']:9.2f} "
+                f"{result['p99_ms']:9.2f} {result['statements_per_call']:11.2f}"
+            )
+    
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n✓ Results written to {args.output}")
+    
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+        print(f"✓ Baseline saved to {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return
+    with open(args.baseline) as f:
+        regressions = compare(results, json.load(f), args.tolerance)
+    if regressions:
+        print("\n❌ Regressions:")
+        for line in regressions:
+            print(f"   {line}")
+        sys.exit(1)
+    print("\n✅ No regressions")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark login throughput at different bcrypt pool sizes
+
+Drives the login handler with a fixed number of concurrent requests on one event loop
+(as uvicorn does) and reports logins/second for each PASSWORD_HASH_WORKERS value.
+Uses a throwaway SQLite database unless DATABASE_URL is set.
+
+Usage:
+    cd backend
+    python -m benchmarks.login_throughput --pool-sizes 1 2 4 8 --requests 200
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from starlette.requests import Request
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench_login.db")
+# Measure bcrypt, not the login throttle
+os.environ["LOGIN_RATE_LIMIT_EMAIL_BURST"] = os.environ["LOGIN_RATE_LIMIT_IP_BURST"] = "1000000000"
+
+import auth
+from database import Base, SessionLocal, engine
+from models import User, UserRole, UserStatus
+from routers.auth import login
+from schemas import UserLogin
+
+EMAIL = "bench-login@example.com"
+PASSWORD = "bench-password"
+
+def seed_user():
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.email == EMAIL).first()
+        if not user:
+            user = User(
+                email=EMAIL,
+                phone="0000000000",
+                name="Login Benchmark",
+                password_hash=auth.get_password_hash(PASSWORD),
+                role=UserRole.ADMIN,
+                status=UserStatus.ACTIVE,
+                email_verified=True
+            )
+            db.add(user)
+        else:
+            user.password_hash = auth.get_password_hash(PASSWORD)
+        db.commit()
+    finally:
+        db.close()
+
+async def do_login(slots: asyncio.Semaphore):
+    async with slots:
+        db = SessionLocal()
+        try:
+            request = Request({"type": "http", "client": ("127.0.0.1", 0), "headers": []})
+            await login(UserLogin(email=EMAIL, password=PASSWORD), request=request, db=db)
+        finally:
+            db.close()
+
+async def run_logins(requests: int, concurrency: int):
+    slots = asyncio.Semaphore(concurrency)
+    await asyncio.gather(*(do_login(slots) for _ in range(requests)))
+
+def run(pool_size: int, requests: int, concurrency: int) -> float:
+    auth.configure_password_pool(pool_size)
+    start = time.perf_counter()
+    asyncio.run(run_logins(requests, concurrency))
+    return requests / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=40, help="Concurrent login requests")
+    args = parser.parse_args()
+    
+    Base.metadata.create_all(bind=engine)
+    seed_user()
+    
+    print(f"bcrypt rounds: {auth.BCRYPT_ROUNDS}, requests: {args.requests}, concurrency: {args.concurrency}")
+    print(f"{'pool size':>10} {'logins/s':>10}")
+    for pool_size in args.pool_sizes:
+        throughput = run(pool_size, args.requests, args.concurrency)
+        print(f"{pool_size:>10} {throughput:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+"""
+SQL statement budgets for every owner and admin route
+
+Seeds a scratch database, calls each route in routers/owner.py and
+routers/admin.py once through the app and counts the SQL statements it issues
+(via the per-request instrumentation in metrics.py). A route that issues more
+statements than its budget, returns an unexpected status, or has no budget at
+all fails the run with exit code 1, so per-row lookups creeping back into a
+handler are caught in CI.
+
+The dataset is sized so that a per-row lookup costs dozens of statements
+(OWNERS owners with BOOKINGS_PER_OWNER bookings each); budgets are the counts
+for that dataset. When a handler is optimised, lower its budget in the same
+change. The user cache is cleared before each call, so budgets include the
+authentication lookup.
+
+Usage:
+    cd backend
+    python -m benchmarks.query_budgets
+    python -m benchmarks.query_budgets --verbose   # show every route, not just failures
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+from collections import namedtuple
+from datetime import date, timedelta
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "query_budgets.db")
+
+from alembic import command
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+from main import alembic_config, app
+from auth import create_access_token, get_password_hash, user_cache
+from database import SessionLocal
+from metrics import route_metrics
+from models import (
+    Booking, BookingStatus, Cottage, EmailConfig, EmailTemplate, MaintenanceBlock, PeakSeason, Property,
+    QuotaTransaction, SystemCalendar, User, UserRole, UserStatus
+)
+from routers import admin, owner
+
+OWNERS = 20
+BOOKINGS_PER_OWNER = 4
+START = date(2031, 1, 5)
+
+Case = namedtuple("Case", "method route budget path_params json params token expect")
+
+def case(method, route, budget, path_params=None, json=None, params=None, token="admin", expect=200):
+    return Case(method, route, budget, path_params or {}, json, params, token, expect)
+
+def seed() -> dict:
+    """Create the dataset and return the ids the cases refer to"""
+    db = SessionLocal()
+    password_hash = get_password_hash("budget-password")
+    ids = {}
+    try:
+        home, other = Property(name="Sanctuary A"), Property(name="Sanctuary B")
+        db.add_all([home, other])
+        db.flush()
+        cottages = [Cottage(property_id=home.id, cottage_id=f"A-{i}", capacity=4) for i in range(1, 5)]
+        cottages += [Cottage(property_id=other.id, cottage_id=f"B-{i}", capacity=6) for i in range(1, 3)]
+        db.add_all(cottages)
+        
+        def user(email, role=UserRole.OWNER, status=UserStatus.ACTIVE, property_id=None):
+            return User(
+                email=email, phone="0000000000", name=email.split("@")[0], password_hash=password_hash,
+                role=role, status=status, property_id=property_id, email_verified=True,
+                weekday_quota=100, weekend_quota=100, weekday_balance=100, weekend_balance=100
+            )
+        
+        admins = [user(f"admin{i}@example.com", role=UserRole.ADMIN) for i in range(3)]
+        owners = [user(f"owner{i}@example.com", property_id=home.id if i % 4 else other.id) for i in range(OWNERS)]
+        pending = [user(f"pending{i}@example.com", status=UserStatus.PENDING) for i in range(3)]
+        db.add_all(admins + owners + pending)
+        db.flush()
+        
+        statuses = [BookingStatus.PENDING, BookingStatus.CONFIRMED, BookingStatus.REJECTED, BookingStatus.CANCELLED]
+        bookings = []
+        for i, member in enumerate(owners):
+            member_cottages = [c for c in cottages if c.property_id == member.property_id]
+            db.add(QuotaTransaction(user_id=member.id, transaction_type="activation", weekday_change=100, weekend_change=100))
+            for k in range(BOOKINGS_PER_OWNER):
+                check_in = START + timedelta(days=3 * (i * BOOKINGS_PER_OWNER + k))
+                booking = Booking(
+                    user_id=member.id, cottage_id=member_cottages[k % len(member_cottages)].id,
+                    check_in=check_in, check_out=check_in + timedelta(days=2), status=statuses[k],
+                    weekday_credits_used=1, weekend_credits_used=1
+                )
+                bookings.append(booking)
+            if i % 2:
+                db.add(QuotaTransaction(
+                    user_id=member.id, transaction_type="manual_adjustment", weekday_change=1, weekend_change=0,
+                    description="Seeded adjustment"
+                ))
+        db.add_all(bookings)
+        db.flush()
+        for booking in bookings:
+            db.add(QuotaTransaction(
+                user_id=booking.user_id, transaction_type="booking", booking_id=booking.id,
+                weekday_change=-1, weekend_change=-1, description="Seeded booking"
+            ))
+        
+        # Spans many seeded bookings on the first cottage
+        wide_block = MaintenanceBlock(cottage_id=cottages[0].id, start_date=START, end_date=START + timedelta(days=120))
+        short_block = MaintenanceBlock(cottage_id=cottages[1].id, start_date=date(2033, 1, 1), end_date=date(2033, 1, 3))
+        db.add_all([wide_block, short_block])
+        
+        holidays = [START + timedelta(days=30 * n) for n in range(6)]
+        db.add_all([SystemCalendar(date=d, is_holiday=True, holiday_name=f"Holiday {n}") for n, d in enumerate(holidays)])
+        seasons = []
+        for n, season_start in enumerate([date(2031, 12, 20), date(2032, 5, 1)]):
+            season_end = season_start + timedelta(days=6)
+            seasons.append(PeakSeason(name=f"Season {n}", start_date=season_start, end_date=season_end))
+            db.add_all([
+                SystemCalendar(date=season_start + timedelta(days=d), is_peak_season=True) for d in range(7)
+            ])
+        db.add_all(seasons)
+        db.add_all([
+            EmailTemplate(template_type=kind, subject=kind.title(), html_body=f"<p>{kind}</p>")
+            for kind in ("registration", "approval")
+        ])
+        db.add(EmailConfig(smtp_server="localhost", smtp_port=25, smtp_username="", from_email="", frontend_url="http://localhost:3000", enabled=False))
+        db.commit()
+        
+        owner_bookings = [b for b in bookings if b.user_id == owners[0].id]
+        ids.update(
+            home=home.id, other=other.id, cottage=owner_bookings[0].cottage_id, other_cottage=cottages[-1].id,
+            admin_email=admins[0].email, owner_email=owners[0].email,
+            admins=[a.id for a in admins], owners=[o.id for o in owners], pending=[p.id for p in pending],
+            owner_pending=owner_bookings[0].id, owner_confirmed=owner_bookings[1].id,
+            pending_booking=bookings[4].id, confirmed_booking=bookings[5].id,
+            wide_block=wide_block.id, short_block=short_block.id,
+            holiday=holidays[0].isoformat(), other_holiday=holidays[1].isoformat(),
+            seasons=[s.id for s in seasons]
+        )
+        return ids
+    finally:
+        db.close()
+
+def cases(ids: dict):
+    """Every owner and admin route with the statement budget for the seeded dataset (reads before writes)"""
+    day = lambda offset: (START + timedelta(days=offset)).isoformat()
+    booking = {"cottage_id": ids["cottage"], "check_in": "2032-03-02", "check_out": "2032-03-05"}
+    return [
+        # Owner
+        case("GET", "/api/owner/dashboard", 4, token="owner"),
+        case("GET", "/api/owner/availability/{cottage_id}", 5, {"cottage_id": ids["cottage"]},
+             params={"start_date": day(0), "end_date": day(60)}, token="owner"),
+        case("POST", "/api/owner/calculate-cost", 3, json=booking, token="owner"),
+        case("GET", "/api/owner/quota-status", 2, token="owner"),
+        case("GET", "/api/owner/transactions", 2, token="owner"),
+        case("GET", "/api/owner/my-trips", 2, token="owner"),
+        case("GET", "/api/owner/bookings/changes", 4, params={"since": 0}, token="owner"),
+        # Live streams never end; a refused subscription still runs their setup queries
+        case("GET", "/api/owner/live", 3, params={"cottages": 999999}, token="owner", expect=403),
+        case("GET", "/api/owner/booking-receipt/{booking_id}", 4, {"booking_id": ids["owner_confirmed"]}, token="owner"),
+        case("POST", "/api/owner/bookings", 21, json=booking, token="owner"),
+        case("PUT", "/api/owner/bookings/{booking_id}", 22, {"booking_id": ids["owner_pending"]},
+             json={"check_in": "2032-04-01", "check_out": "2032-04-04"}, token="owner"),
+        case("POST", "/api/owner/cancel-booking/{booking_id}", 11, {"booking_id": ids["owner_pending"]}, token="owner"),
+        case("DELETE", "/api/owner/bookings/{booking_id}", 10, {"booking_id": ids["owner_confirmed"]}, token="owner"),
+        # Admin - members
+        case("GET", "/api/admin/pending-members", 2),
+        case("GET", "/api/admin/member/{user_id}", 4, {"user_id": ids["owners"][1]}),
+        case("GET", "/api/admin/search-members", 2, params={"query": "owner"}),
+        case("GET", "/api/admin/all-members", 2),
+        case("GET", "/api/admin/quota-adjustments", 2),
+        case("POST", "/api/admin/activate-member", 11, json={"user_id": ids["pending"][0], "property_id": ids["home"]}),
+        case("POST", "/api/admin/reject-member", 7, json={"user_id": ids["pending"][1], "reason": "Unknown applicant"}),
+        case("PUT", "/api/admin/member/{user_id}", 10, {"user_id": ids["owners"][1]}, json={"name": "Renamed Owner"}),
+        case("POST", "/api/admin/adjust-quota", 6,
+             json={"user_id": ids["owners"][1], "weekday_change": 2, "weekend_change": 1}),
+        case("POST", "/api/admin/deactivate-member/{user_id}", 8, {"user_id": ids["owners"][2]}),
+        case("POST", "/api/admin/reactivate-member/{user_id}", 7, {"user_id": ids["owners"][2]}),
+        case("DELETE", "/api/admin/member/{user_id}", 15, {"user_id": ids["owners"][3]}),
+        # Admin - properties, cottages and maintenance
+        case("GET", "/api/admin/properties", 2),
+        case("POST", "/api/admin/properties", 4, json={"name": "Sanctuary C"}),
+        case("PUT", "/api/admin/properties/{property_id}", 9, {"property_id": ids["other"]}, json={"name": "Sanctuary B2"}),
+        case("GET", "/api/admin/cottages", 2),
+        case("POST", "/api/admin/cottages", 4, json={"cottage_id": "A-9", "capacity": 2, "property_id": ids["home"]}),
+        case("PUT", "/api/admin/cottages/{cottage_id}", 5, {"cottage_id": ids["other_cottage"]},
+             json={"cottage_id": "B-2", "capacity": 8, "property_id": ids["other"]}),
+        case("GET", "/api/admin/maintenance-blocks", 2),
+        case("GET", "/api/admin/maintenance-blocks/{block_id}/bookings", 3, {"block_id": ids["wide_block"]}),
+        case("GET", "/api/admin/inventory-health", 4, params={"start_date": day(0), "end_date": day(30)}),
+        case("POST", "/api/admin/maintenance-blocks", 5,
+             json={"cottage_id": ids["other_cottage"], "start_date": day(0), "end_date": day(200)}),
+        case("PUT", "/api/admin/maintenance-blocks/{block_id}", 6, {"block_id": ids["short_block"]},
+             json={"cottage_id": ids["other_cottage"], "start_date": "2033-02-01", "end_date": "2033-02-03"}),
+        case("DELETE", "/api/admin/maintenance-blocks/{block_id}", 4, {"block_id": ids["short_block"]}),
+        # Admin - bookings
+        case("GET", "/api/admin/approval-queue", 2),
+        case("GET", "/api/admin/bookings-calendar", 2, params={"start": day(0), "end": day(30)}),
+        case("GET", "/api/admin/bookings/changes", 4, params={"since": 0}),
+        case("GET", "/api/admin/live", 2, params={"cottages": 999999, "approvals": True}, expect=404),
+        case("GET", "/api/admin/rejected-bookings", 2),
+        case("GET", "/api/admin/audit-trail", 2),
+        case("GET", "/api/admin/audit-events", 2, params={"subject_type": "booking"}),
+        # Exports run their query while the body streams, which may finish before or after the
+        # request's statements are recorded
+        case("GET", "/api/admin/export/audit-trail", 2, params={"format": "csv"}),
+        case("GET", "/api/admin/export/bookings", 2, params={"format": "ndjson"}),
+        case("POST", "/api/admin/booking-decision", 12, json={"booking_id": ids["pending_booking"], "action": "reject"}),
+        case("POST", "/api/admin/revoke-booking/{booking_id}", 12, {"booking_id": ids["confirmed_booking"]}, json={}),
+        case("POST", "/api/admin/revoke-maintenance-bookings/{block_id}", 24, {"block_id": ids["wide_block"]},
+             json={"reason": "Roof repairs"}),
+        case("POST", "/api/admin/override-booking", 8, json={
+            "user_id": ids["owners"][1], "cottage_id": ids["cottage"], "check_in": "2033-06-01", "check_out": "2033-06-03"
+        }),
+        case("POST", "/api/admin/reset-all-quotas", 27),
+        # Admin - calendar
+        case("GET", "/api/admin/holidays", 2),
+        case("POST", "/api/admin/holidays", 10, json=[
+            {"date": f"2032-0{month}-15", "holiday_name": f"Festival {month}"} for month in range(1, 4)
+        ]),
+        case("PUT", "/api/admin/holidays/{date}", 4, {"date": ids["holiday"]},
+             json={"date": ids["holiday"], "holiday_name": "Renamed Holiday"}),
+        case("DELETE", "/api/admin/holidays/{date}", 4, {"date": ids["other_holiday"]}),
+        case("GET", "/api/admin/peak-seasons", 2),
+        case("POST", "/api/admin/peak-seasons", 18, json={"name": "Summer", "start_date": "2032-06-01", "end_date": "2032-06-07"}),
+        case("PUT", "/api/admin/peak-seasons/{season_id}", 22, {"season_id": ids["seasons"][0]},
+             json={"name": "Winter", "start_date": "2031-12-22", "end_date": "2031-12-28"}),
+        case("DELETE", "/api/admin/peak-seasons/{season_id}", 12, {"season_id": ids["seasons"][1]}),
+        # Admin - administrators, reports and email
+        case("GET", "/api/admin/admins", 2),
+        case("POST", "/api/admin/create-admin", 6,
+             json={"name": "New Admin", "email": "admin9@example.com", "password": "budget-password", "phone": "0"}),
+        case("POST", "/api/admin/deactivate-admin/{admin_id}", 8, {"admin_id": ids["admins"][1]}),
+        case("POST", "/api/admin/reactivate-admin/{admin_id}", 7, {"admin_id": ids["admins"][1]}),
+        case("DELETE", "/api/admin/admin/{admin_id}", 12, {"admin_id": ids["admins"][2]}),
+        case("GET", "/api/admin/metrics/db-pool", 1),
+        case("GET", "/api/admin/reports/statistics", 3),
+        case("GET", "/api/admin/reports/occupancy", 5, params={"start_date": day(-60), "end_date": day(30)}),
+        case("GET", "/api/admin/reports/credit-utilization", 2, params={"limit": 50}),
+        case("GET", "/api/admin/export/credit-utilization", 2, params={"format": "csv"}),
+        case("GET", "/api/admin/email-config", 2),
+        case("POST", "/api/admin/email-config", 5, json={"smtp_server": "localhost", "smtp_port": 25, "enabled": False}),
+        case("GET", "/api/admin/email-templates", 2),
+        case("GET", "/api/admin/email-templates/{template_type}", 2, {"template_type": "approval"}),
+        case("PUT", "/api/admin/email-templates/{template_type}", 5, {"template_type": "approval"}, json={"subject": "Approved"}),
+        case("POST", "/api/admin/email-templates", 5,
+             json={"template_type": "rejection", "subject": "Rejected", "html_body": "<p>rejected</p>"}),
+        # Email sending is disabled in the seeded config, so the handler stops before SMTP
+        case("POST", "/api/admin/email-config/test", 2, json={"to_email": "owner0@example.com"}, expect=400),
+    ]
+
+def declared_routes():
+    routes = set()
+    for prefix, router in (("/api/owner", owner.router), ("/api/admin", admin.router)):
+        for route in router.routes:
+            if isinstance(route, APIRoute):
+                routes.update((method, prefix + route.path) for method in route.methods)
+    return routes
+
+def run(verbose: bool) -> int:
+    command.upgrade(alembic_config(), "head")
+    ids = seed()
+    tokens = {
+        "admin": create_access_token({"sub": ids["admin_email"]}),
+        "owner": create_access_token({"sub": ids["owner_email"]}),
+    }
+    
+    all_cases = cases(ids)
+    failures = 0
+    missing = declared_routes() - {(c.method, c.route) for c in all_cases}
+    for method, route in sorted(missing, key=lambda r: r[1]):
+        print(f"FAIL  {method:6} {route}: no budget declared")
+        failures += 1
+    
+    with TestClient(app, raise_server_exceptions=False) as client:
+        for c in all_cases:
+            user_cache.clear()
+            route_metrics.reset()
+            # Handlers print email bodies when SMTP isn't configured; keep the report readable
+            with contextlib.redirect_stdout(io.StringIO()):
+                response = client.request(
+                    c.method, c.route.format(**c.path_params), json=c.json, params=c.params,
+                    headers={"Authorization": f"Bearer {tokens[c.token]}"}
+                )
+            statements = route_metrics.statement_total(c.method, c.route)
+            problem = None
+            if response.status_code != c.expect:
+                problem = f"status {response.status_code} (expected {c.expect}): {response.text[:200]}"
+            elif statements > c.budget:
+                problem = f"{statements} statements, budget {c.budget}"
+            if problem:
+                failures += 1
+                print(f"FAIL  {c.method:6} {c.route}: {problem}")
+            elif verbose:
+                print(f"ok    {c.method:6} {c.route}: {statements}/{c.budget}")
+    
+    print(f"\n{len(all_cases)} routes checked, {failures} failure(s)")
+    return 1 if failures else 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    sys.exit(run(args.verbose))
+
+if __name__ == "__main__":
+    main()
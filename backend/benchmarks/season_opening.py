@@ -0,0 +1,417 @@
+"""
+Load test: the opening of a peak booking window
+
+Simulates owners arriving when a new booking window opens, as a Poisson process
+at --owner-rate per second. Each owner logs in, loads the dashboard, polls
+availability for a few cottages in the window, prices a free stay and races
+the others on POST /api/owner/bookings, trying again elsewhere when the dates
+are taken. Meanwhile --admins administrators sweep the approval queue and
+approve (or, at --reject-ratio, reject) the window's requests.
+
+At the end it reports throughput, latency percentiles and error rates per
+endpoint. It also checks the database:
+  - double bookings: overlapping pending/confirmed stays on one cottage
+  - ledger consistency: each participating owner's balance moved by exactly
+    the sum of the quota transactions written during the run, and the
+    debits match the credits of the bookings they created
+The run exits with code 1 on a double booking, a ledger mismatch or an error
+rate (5xx and transport errors) above --max-error-rate.
+
+Runs against a local PostgreSQL database filled by generate_dataset.py (the
+generated accounts share one password) and either a server started here
+(--spawn-server) or one already listening at --base-url. Each simulated user
+sends its own X-Forwarded-For address, so the per-IP login limit applies per
+user as it would in production (uvicorn trusts that header from 127.0.0.1).
+The run writes bookings into the window, so use a scratch database.
+
+Usage:
+    cd backend
+    python generate_dataset.py --users 5000 --bookings 500000
+    python -m benchmarks.season_opening --spawn-server --owners 2000 --owner-rate 40
+    python -m benchmarks.season_opening --base-url http://localhost:8000 --owners 500 --admins 3
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+import httpx
+from sqlalchemy import text
+from database import engine
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class Stats:
+    """Per-endpoint latencies and outcomes, plus booking race results"""
+    
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.transport_errors = Counter()
+        self.outcomes = Counter()
+    
+    async def call(self, endpoint: str, request):
+        started = time.perf_counter()
+        try:
+            response = await request
+        except httpx.HTTPError:
+            self.transport_errors[endpoint] += 1
+            return None
+        self.latencies[endpoint].append((time.perf_counter() - started) * 1000)
+        self.statuses[endpoint][response.status_code] += 1
+        return response
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))]
+
+def free_stays(availability: list, nights: int) -> list:
+    """Check-in dates starting `nights` consecutive available days"""
+    stays = []
+    run = 0
+    for index, day in enumerate(availability):
+        run = run + 1 if day["is_available"] else 0
+        if run >= nights:
+            stays.append(availability[index - nights + 1]["date"])
+    return stays
+
+async def owner_session(client, stats: Stats, email: str, address: str, rng: random.Random, args, window):
+    window_start, window_end = window
+    headers = {"X-Forwarded-For": address}
+    response = await stats.call("login", client.post(
+        "/api/auth/login", json={"email": email, "password": args.password}, headers=headers
+    ))
+    if response is None or response.status_code != 200:
+        stats.outcomes["login failed"] += 1
+        return
+    headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+    
+    response = await stats.call("dashboard", client.get("/api/owner/dashboard", headers=headers))
+    if response is None or response.status_code != 200:
+        stats.outcomes["dashboard failed"] += 1
+        return
+    cottages = [cottage["id"] for cottage in response.json()["cottages"]]
+    
+    for _ in range(args.attempts):
+        nights = rng.randint(1, args.max_nights)
+        candidates = []
+        for cottage_id in rng.sample(cottages, min(args.polls, len(cottages))):
+            response = await stats.call("availability", client.get(
+                f"/api/owner/availability/{cottage_id}", headers=headers,
+                params={"start_date": window_start.isoformat(), "end_date": window_end.isoformat()}
+            ))
+            if response is not None and response.status_code == 200:
+                candidates += [(cottage_id, check_in) for check_in in free_stays(response.json()["availability"], nights)]
+        if not candidates:
+            stats.outcomes["found nothing free"] += 1
+            continue
+        cottage_id, check_in = rng.choice(candidates)
+        stay = {
+            "cottage_id": cottage_id,
+            "check_in": check_in,
+            "check_out": (date.fromisoformat(check_in) + timedelta(days=nights)).isoformat(),
+        }
+        await stats.call("calculate-cost", client.post("/api/owner/calculate-cost", json=stay, headers=headers))
+        
+        response = await stats.call("create booking", client.post("/api/owner/bookings", json=stay, headers=headers))
+        if response is None or response.status_code >= 500:
+            stats.outcomes["booking error"] += 1
+            return
+        if response.status_code == 200:
+            stats.outcomes["booked"] += 1
+            return
+        detail = str(response.json().get("detail", ""))
+        if "credits" in detail:
+            stats.outcomes["insufficient credits"] += 1
+            return
+        # Someone else got the dates (or a block landed on them): look again
+        stats.outcomes["lost the race"] += 1
+    stats.outcomes["gave up"] += 1
+
+async def admin_session(client, stats: Stats, email: str, address: str, rng: random.Random, args, window, done: asyncio.Event):
+    window_start, window_end = window
+    headers = {"X-Forwarded-For": address}
+    response = await stats.call("login", client.post(
+        "/api/auth/login", json={"email": email, "password": args.password}, headers=headers
+    ))
+    if response is None or response.status_code != 200:
+        stats.outcomes["admin login failed"] += 1
+        return
+    headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+    
+    while True:
+        # One more sweep after the owners finish, so the window's queue drains
+        finished = done.is_set()
+        response = await stats.call("approval-queue", client.get("/api/admin/approval-queue", headers=headers))
+        if response is not None and response.status_code == 200:
+            for booking in response.json():
+                if not window_start.isoformat() <= booking["check_in"] <= window_end.isoformat():
+                    continue
+                action, outcome = ("reject", "admin rejected") if rng.random() < args.reject_ratio else ("approve", "admin approved")
+                response = await stats.call("booking-decision", client.post(
+                    "/api/admin/booking-decision", headers=headers,
+                    json={"booking_id": booking["id"], "action": action, "notes": "Season opening load test"}
+                ))
+                if response is not None and response.status_code == 200:
+                    stats.outcomes[outcome] += 1
+        if finished:
+            return
+        try:
+            await asyncio.wait_for(done.wait(), timeout=args.admin_interval)
+        except asyncio.TimeoutError:
+            pass
+
+def pick_accounts(args) -> tuple:
+    with engine.connect() as conn:
+        owners = conn.execute(text(
+            "SELECT id, email FROM users WHERE role = 'OWNER' AND status = 'ACTIVE' AND property_id IS NOT NULL "
+            "ORDER BY id LIMIT :limit"
+        ), {"limit": args.owners}).all()
+        admins = conn.execute(text(
+            "SELECT email FROM users WHERE role = 'ADMIN' AND status = 'ACTIVE' ORDER BY id LIMIT :limit"
+        ), {"limit": args.admins}).scalars().all()
+    if len(owners) < args.owners or len(admins) < args.admins:
+        raise SystemExit(
+            f"❌ Found {len(owners)} active owners and {len(admins)} admins; "
+            "generate a larger dataset (generate_dataset.py) or lower --owners/--admins"
+        )
+    return owners, admins
+
+def snapshot(owner_ids: list) -> dict:
+    with engine.connect() as conn:
+        return {
+            "max_booking_id": conn.execute(text("SELECT coalesce(max(id), 0) FROM bookings")).scalar(),
+            "max_ledger_id": conn.execute(text("SELECT coalesce(max(id), 0) FROM quota_transactions")).scalar(),
+            "balances": {
+                row.id: (row.weekday_balance, row.weekend_balance) for row in conn.execute(text(
+                    "SELECT id, weekday_balance, weekend_balance FROM users WHERE id = ANY(:ids)"
+                ), {"ids": owner_ids})
+            },
+        }
+
+def check_database(before: dict, window) -> dict:
+    window_start, window_end = window
+    owner_ids = list(before["balances"])
+    with engine.connect() as conn:
+        double_bookings = conn.execute(text(
+            "SELECT a.cottage_id, a.id, b.id, a.check_in, a.check_out, b.check_in, b.check_out "
+            "FROM bookings a JOIN bookings b ON a.cottage_id = b.cottage_id AND a.id < b.id "
+            "AND a.check_in < b.check_out AND b.check_in < a.check_out "
+            "WHERE a.status IN ('PENDING', 'CONFIRMED') AND b.status IN ('PENDING', 'CONFIRMED') "
+            "AND a.check_out > :start AND a.check_in <= :end"
+        ), {"start": window_start, "end": window_end}).all()
+        new_bookings = dict(conn.execute(text(
+            "SELECT status, count(*) FROM bookings WHERE id > :max_id GROUP BY status"
+        ), {"max_id": before["max_booking_id"]}).all())
+        balances = {
+            row.id: (row.weekday_balance, row.weekend_balance) for row in conn.execute(text(
+                "SELECT id, weekday_balance, weekend_balance FROM users WHERE id = ANY(:ids)"
+            ), {"ids": owner_ids})
+        }
+        ledger = {
+            row.user_id: row for row in conn.execute(text(
+                "SELECT user_id, sum(weekday_change) AS weekday, sum(weekend_change) AS weekend, "
+                "sum(CASE WHEN transaction_type = 'booking' THEN weekday_change ELSE 0 END) AS weekday_debits, "
+                "sum(CASE WHEN transaction_type = 'booking' THEN weekend_change ELSE 0 END) AS weekend_debits, "
+                "count(*) FILTER (WHERE transaction_type = 'booking' AND booking_id IS NULL) AS unlinked_debits "
+                "FROM quota_transactions WHERE id > :max_id GROUP BY user_id"
+            ), {"max_id": before["max_ledger_id"]})
+        }
+        booked = {
+            row.user_id: (row.weekday, row.weekend) for row in conn.execute(text(
+                "SELECT user_id, sum(weekday_credits_used) AS weekday, sum(weekend_credits_used) AS weekend "
+                "FROM bookings WHERE id > :max_id GROUP BY user_id"
+            ), {"max_id": before["max_booking_id"]})
+        }
+    
+    balance_mismatches = []
+    debit_mismatches = []
+    for user_id in owner_ids:
+        entry = ledger.get(user_id)
+        ledger_delta = (entry.weekday, entry.weekend) if entry else (0, 0)
+        old, new = before["balances"][user_id], balances[user_id]
+        if (new[0] - old[0], new[1] - old[1]) != ledger_delta:
+            balance_mismatches.append({"user_id": user_id, "balance_before": old, "balance_after": new, "ledger_delta": ledger_delta})
+        debits = (-entry.weekday_debits, -entry.weekend_debits) if entry else (0, 0)
+        if debits != booked.get(user_id, (0, 0)):
+            debit_mismatches.append({"user_id": user_id, "booked_credits": booked.get(user_id, (0, 0)), "ledger_debits": debits})
+    return {
+        "new_bookings": {str(status): count for status, count in new_bookings.items()},
+        "double_bookings": [
+            {"cottage_id": row[0], "booking_ids": [row[1], row[2]], "stays": [f"{row[3]}..{row[4]}", f"{row[5]}..{row[6]}"]}
+            for row in double_bookings
+        ],
+        "balance_mismatches": balance_mismatches,
+        "debit_mismatches": debit_mismatches,
+        "unlinked_debits": sum(entry.unlinked_debits for entry in ledger.values()),
+    }
+
+def start_server(args) -> subprocess.Popen:
+    # Slow-request lines and the like go to a file rather than through the report
+    log = open(args.server_log, "w")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--workers", str(args.workers),
+         "--log-level", "warning"],
+        cwd=BACKEND_DIR, stdout=log, stderr=subprocess.STDOUT
+    )
+    log.close()
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit(f"❌ Server exited with code {server.returncode}; see {args.server_log}")
+        try:
+            if httpx.get(args.base_url + "/", timeout=1).status_code == 200:
+                return server
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    server.terminate()
+    raise SystemExit("❌ Server did not come up within 60s")
+
+async def run_load(args, owners: list, admins: list, window) -> tuple:
+    stats = Stats()
+    rng = random.Random(args.seed)
+    done = asyncio.Event()
+    limits = httpx.Limits(max_connections=args.connections, max_keepalive_connections=args.connections)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        admin_tasks = [
+            asyncio.create_task(admin_session(
+                client, stats, email, f"10.255.0.{n + 1}", random.Random(rng.random()), args, window, done
+            ))
+            for n, email in enumerate(admins)
+        ]
+        started = time.perf_counter()
+        owner_tasks = []
+        for n, (_, email) in enumerate(owners):
+            owner_tasks.append(asyncio.create_task(owner_session(
+                client, stats, email, f"10.{n // 65536 % 255}.{n // 256 % 256}.{n % 256}",
+                random.Random(rng.random()), args, window
+            )))
+            await asyncio.sleep(rng.expovariate(args.owner_rate))
+        arrivals_done = time.perf_counter() - started
+        await asyncio.gather(*owner_tasks)
+        elapsed = time.perf_counter() - started
+        done.set()
+        await asyncio.gather(*admin_tasks)
+    return stats, elapsed, arrivals_done
+
+def report(stats: Stats, elapsed: float, arrivals: float, checks: dict, args) -> dict:
+    endpoints = sorted(set(stats.statuses) | set(stats.transport_errors))
+    total = sum(sum(stats.statuses[e].values()) + stats.transport_errors[e] for e in endpoints)
+    errors = sum(
+        stats.transport_errors[e] + sum(n for code, n in stats.statuses[e].items() if code >= 500) for e in endpoints
+    )
+    summary = {
+        "duration_s": round(elapsed, 2),
+        "arrival_phase_s": round(arrivals, 2),
+        "requests": total,
+        "throughput_rps": round(total / elapsed, 1) if elapsed else 0.0,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "endpoints": {},
+        "owner_outcomes": dict(stats.outcomes),
+        "database": checks,
+    }
+    print(f"\nOwners: {args.owners} at {args.owner_rate}/s, admins: {args.admins}, window {args.window_days} days")
+    print(f"{total} requests in {elapsed:.1f}s ({summary['throughput_rps']} req/s), error rate {summary['error_rate']:.2%}\n")
+    print(f"{'endpoint':18} {'calls':>7} {'req/s':>7} {'4xx':>6} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for endpoint in endpoints:
+        latencies = sorted(stats.latencies[endpoint])
+        codes = stats.statuses[endpoint]
+        calls = sum(codes.values()) + stats.transport_errors[endpoint]
+        row = {
+            "calls": calls,
+            "status_codes": {str(code): n for code, n in sorted(codes.items())},
+            "client_errors": sum(n for code, n in codes.items() if 400 <= code < 500),
+            "errors": stats.transport_errors[endpoint] + sum(n for code, n in codes.items() if code >= 500),
+            "p50_ms": round(percentile(latencies, 0.50), 1),
+            "p95_ms": round(percentile(latencies, 0.95), 1),
+            "p99_ms": round(percentile(latencies, 0.99), 1),
+        }
+        summary["endpoints"][endpoint] = row
+        print(
+            f"{endpoint:18} {calls:7} {calls / elapsed:7.1f} {row['client_errors']:6} {row['errors']:7} "
+            f"{row['p50_ms']:8.1f} {row['p95_ms']:8.1f} {row['p99_ms']:8.1f}"
+        )
+    print("\nOwner outcomes: " + ", ".join(f"{name} {count}" for name, count in stats.outcomes.most_common()))
+    print("New bookings: " + (", ".join(f"{status} {count}" for status, count in checks["new_bookings"].items()) or "none"))
+    
+    print()
+    print(("❌" if checks["double_bookings"] else "✓") + f" Double bookings: {len(checks['double_bookings'])}")
+    for pair in checks["double_bookings"][:5]:
+        print(f"   cottage {pair['cottage_id']}: bookings {pair['booking_ids']} ({', '.join(pair['stays'])})")
+    print(("❌" if checks["balance_mismatches"] else "✓") + f" Balances not matching the ledger: {len(checks['balance_mismatches'])}")
+    for mismatch in checks["balance_mismatches"][:5]:
+        print(f"   {mismatch}")
+    print(("❌" if checks["debit_mismatches"] else "✓") + f" Booking debits not matching booked credits: {len(checks['debit_mismatches'])}")
+    for mismatch in checks["debit_mismatches"][:5]:
+        print(f"   {mismatch}")
+    if checks["unlinked_debits"]:
+        print(f"⚠️  Booking debits without a booking_id: {checks['unlinked_debits']}")
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--spawn-server", action="store_true", help="Start uvicorn for the run (on --port)")
+    parser.add_argument("--port", type=int, default=8765, help="Port for --spawn-server")
+    parser.add_argument("--workers", type=int, default=4, help="uvicorn workers for --spawn-server")
+    parser.add_argument("--server-log", default="season_opening_server.log", help="Output of the --spawn-server server")
+    parser.add_argument("--owners", type=int, default=1000, help="Owners taking part")
+    parser.add_argument("--owner-rate", type=float, default=20.0, help="Owner arrivals per second (Poisson)")
+    parser.add_argument("--admins", type=int, default=2, help="Administrators working the approval queue")
+    parser.add_argument("--admin-interval", type=float, default=2.0, help="Seconds between approval queue sweeps")
+    parser.add_argument("--reject-ratio", type=float, default=0.1, help="Share of requests the admins reject")
+    parser.add_argument("--polls", type=int, default=3, help="Cottages an owner checks per attempt")
+    parser.add_argument("--attempts", type=int, default=3, help="Booking attempts before an owner gives up")
+    parser.add_argument("--max-nights", type=int, default=4)
+    parser.add_argument("--window-start", type=date.fromisoformat, default=None,
+                        help="First night of the window (default: 400 days out, past generated bookings)")
+    parser.add_argument("--window-days", type=int, default=30)
+    parser.add_argument("--password", default="password123", help="Password of the generated accounts")
+    parser.add_argument("--connections", type=int, default=200, help="Client connection pool size")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    args = parser.parse_args()
+    if args.spawn_server:
+        args.base_url = f"http://127.0.0.1:{args.port}"
+    
+    if engine.dialect.name != "postgresql":
+        raise SystemExit("❌ The load test needs PostgreSQL (set DATABASE_URL); SQLite serialises every writer")
+    window_start = args.window_start or date.today() + timedelta(days=400)
+    window = (window_start, window_start + timedelta(days=args.window_days - 1))
+    owners, admins = pick_accounts(args)
+    before = snapshot([owner_id for owner_id, _ in owners])
+    
+    server = start_server(args) if args.spawn_server else None
+    try:
+        stats, elapsed, arrivals = asyncio.run(run_load(args, owners, admins, window))
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+    
+    checks = check_database(before, window)
+    summary = report(stats, elapsed, arrivals, checks, args)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2, default=str)
+        print(f"\n✓ Report written to {args.output}")
+    
+    failed = checks["double_bookings"] or checks["balance_mismatches"] or checks["debit_mismatches"]
+    if summary["error_rate"] > args.max_error_rate:
+        print(f"\n❌ Error rate {summary['error_rate']:.2%} is above {args.max_error_rate:.2%}")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("\n✅ No double bookings or ledger drift")
+
+if __name__ == "__main__":
+    main()
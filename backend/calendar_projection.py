@@ -0,0 +1,124 @@
+"""
+Materialized projection behind the admin bookings calendar
+
+booking_calendar holds one row per pending or confirmed booking with the
+member, cottage and property names already joined in, indexed on its dates,
+so a month view reads that month's rows instead of every active booking ever
+made. Rows are kept current by session hooks: after each flush, bookings that
+were added or changed are upserted (or removed once they stop being active),
+deleted bookings are removed, and renaming a member, cottage or property
+rewrites that member's/cottage's/property's rows, all in the same transaction.
+Writes that bypass the ORM (raw SQL, generate_dataset.py) are picked up by the
+scheduled full rebuild (CALENDAR_REBUILD_INTERVAL_MINUTES in tasks.py) or by
+running it by hand:
+    cd backend
+    python calendar_projection.py
+"""
+from sqlalchemy import delete, event, inspect, or_, select, true
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import Booking, BookingCalendarEntry, BookingStatus, Cottage, Property, User
+
+ACTIVE_STATUSES = (BookingStatus.PENDING, BookingStatus.CONFIRMED)
+PROJECTED_COLUMNS = [
+    "booking_id", "user_id", "cottage_id", "property_id", "check_in", "check_out", "status",
+    "user_name", "cottage_name", "property_name"
+]
+
+def projection_select(*conditions):
+    """Active bookings matching any of the conditions, shaped as booking_calendar rows"""
+    query = select(
+        Booking.id, Booking.user_id, Booking.cottage_id, Cottage.property_id, Booking.check_in,
+        Booking.check_out, Booking.status, User.name, Cottage.cottage_id, Property.name
+    ).outerjoin(User, User.id == Booking.user_id).outerjoin(
+        Cottage, Cottage.id == Booking.cottage_id
+    ).outerjoin(Property, Property.id == Cottage.property_id).where(Booking.status.in_(ACTIVE_STATUSES))
+    if conditions:
+        query = query.where(or_(*conditions))
+    return query
+
+def refresh(connection, booking_ids=(), user_ids=(), cottage_ids=(), property_ids=(), removed_ids=()):
+    """Upsert the projection rows of the given bookings/members/cottages/properties and drop removed bookings"""
+    table = BookingCalendarEntry.__table__
+    if removed_ids:
+        connection.execute(delete(table).where(table.c.booking_id.in_(list(removed_ids))))
+    conditions = [
+        column.in_(list(ids)) for column, ids in (
+            (Booking.id, booking_ids), (Booking.user_id, user_ids),
+            (Booking.cottage_id, cottage_ids), (Cottage.property_id, property_ids)
+        ) if ids
+    ]
+    if not conditions:
+        return
+    dialect = postgresql if connection.dialect.name == "postgresql" else sqlite
+    # The always-true WHERE keeps SQLite from reading ON CONFLICT as part of the SELECT's join
+    stmt = dialect.insert(table).from_select(PROJECTED_COLUMNS, projection_select(*conditions).where(true()))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["booking_id"],
+        set_={name: stmt.excluded[name] for name in PROJECTED_COLUMNS[1:]}
+    )
+    connection.execute(stmt)
+
+def _changed(obj, *attributes) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[attribute].history.has_changes() for attribute in attributes)
+
+@event.listens_for(Session, "after_flush")
+def _track_flush(session, flush_context):
+    # new/dirty/deleted and attribute history still describe this flush here
+    booking_ids, removed_ids, user_ids, cottage_ids, property_ids = set(), set(), set(), set(), set()
+    for obj in session.new:
+        if isinstance(obj, Booking) and obj.status in ACTIVE_STATUSES:
+            booking_ids.add(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, Booking):
+            removed_ids.add(obj.id)
+    for obj in session.dirty:
+        if isinstance(obj, Booking):
+            if not _changed(obj, "status", "check_in", "check_out", "cottage_id", "user_id"):
+                continue
+            if obj.status in ACTIVE_STATUSES:
+                booking_ids.add(obj.id)
+            else:
+                removed_ids.add(obj.id)
+        elif isinstance(obj, User) and _changed(obj, "name"):
+            user_ids.add(obj.id)
+        elif isinstance(obj, Cottage) and _changed(obj, "cottage_id", "property_id"):
+            cottage_ids.add(obj.id)
+        elif isinstance(obj, Property) and _changed(obj, "name"):
+            property_ids.add(obj.id)
+    if booking_ids or removed_ids or user_ids or cottage_ids or property_ids:
+        refresh(session.connection(), booking_ids, user_ids, cottage_ids, property_ids, removed_ids)
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_bulk_delete(orm_execute_state):
+    # Query(...).delete() skips the flush hooks; drop the rows of the bookings it is about to remove
+    if not orm_execute_state.is_delete or orm_execute_state.bind_mapper is None:
+        return
+    if orm_execute_state.bind_mapper.class_ is not Booking:
+        return
+    table = BookingCalendarEntry.__table__
+    doomed = select(Booking.id)
+    if orm_execute_state.statement.whereclause is not None:
+        doomed = doomed.where(orm_execute_state.statement.whereclause)
+    orm_execute_state.session.connection().execute(delete(table).where(table.c.booking_id.in_(doomed)))
+
+def rebuild_projection() -> int:
+    """Recompute every booking_calendar row in one transaction; returns the number of rows"""
+    db = SessionLocal()
+    try:
+        connection = db.connection()
+        table = BookingCalendarEntry.__table__
+        if connection.dialect.name == "postgresql":
+            # Waits for in-flight writers and holds off new refreshes until the rebuild commits
+            connection.exec_driver_sql("LOCK TABLE booking_calendar IN EXCLUSIVE MODE")
+        connection.execute(table.delete())
+        rows = connection.execute(table.insert().from_select(PROJECTED_COLUMNS, projection_select())).rowcount
+        db.commit()
+        return rows
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    print(f"✓ Rebuilt the bookings calendar projection ({rebuild_projection()} rows)")
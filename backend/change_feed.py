@@ -0,0 +1,207 @@
+"""
+Delta-sync change feed for bookings
+
+Every commit that adds, changes or deletes bookings appends one
+booking_changes row per booking, numbered just before the commit. On
+Postgres the numbers come from the booking_change_seq sequence, which takes
+no lock, so concurrent commits don't queue behind each other; the price is
+that a number can become visible after a higher one. Readers therefore stop
+short of the oldest change numbered in the last SYNC_CHANGE_SETTLE_SECONDS
+(which must exceed the time from numbering to commit), and a reader that is
+handed cursor N will still see every change below N. On SQLite, which only
+has one writer at a time, the numbers come from the sync_sequences counter
+row and every change is settled. Renaming a member, cottage or property logs
+its bookings too, since their display names change.
+
+Clients load the full list once, then poll GET .../changes?since=<cursor>
+and receive the current state of each booking changed since then (or a
+tombstone, {"id": ..., "deleted": true}, for deleted bookings) and the next
+cursor. Without `since` the feed returns just the current cursor, so fetch
+it before the full list. Changes older than SYNC_CHANGE_RETENTION_DAYS are
+purged by tasks.py; a cursor from before the purge gets 410 Gone and the
+client reloads the full list.
+"""
+from datetime import datetime, timedelta, timezone
+import os
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from sqlalchemy import Sequence, delete, event, func, insert, inspect, or_, select, true, update
+from sqlalchemy.orm import Session
+from database import SessionLocal, engine
+from models import Booking, BookingChange, Cottage, Property, SyncSequence, User
+
+load_dotenv()
+
+SYNC_CHANGE_RETENTION_DAYS = float(os.getenv("SYNC_CHANGE_RETENTION_DAYS", "30"))
+SYNC_CHANGE_SETTLE_SECONDS = float(os.getenv("SYNC_CHANGE_SETTLE_SECONDS", "5"))
+CHANGE_SEQUENCE = "booking_changes"  # sync_sequences row: purge watermark, and the counter on SQLite
+CHANGE_NUMBERS = Sequence("booking_change_seq")  # Postgres only
+MAX_SEQ = 2 ** 63 - 1
+PENDING_KEY = "pending_booking_changes"
+
+def _pending(session) -> dict:
+    return session.info.setdefault(PENDING_KEY, {"bookings": {}, "users": set(), "cottages": set(), "properties": set()})
+
+def _changed(obj, *attributes) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[attribute].history.has_changes() for attribute in attributes)
+
+@event.listens_for(Session, "after_flush")
+def _track_flush(session, flush_context):
+    # new/dirty/deleted and attribute history still describe this flush here
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, Booking):
+            _pending(session)["bookings"][obj.id] = obj.user_id
+    for obj in session.dirty:
+        if isinstance(obj, Booking):
+            if session.is_modified(obj, include_collections=False):
+                _pending(session)["bookings"][obj.id] = obj.user_id
+        elif isinstance(obj, User) and _changed(obj, "name"):
+            _pending(session)["users"].add(obj.id)
+        elif isinstance(obj, Cottage) and _changed(obj, "cottage_id", "property_id"):
+            _pending(session)["cottages"].add(obj.id)
+        elif isinstance(obj, Property) and _changed(obj, "name"):
+            _pending(session)["properties"].add(obj.id)
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_bulk_delete(orm_execute_state):
+    # Query(...).delete() skips the flush hooks; log the bookings it is about to remove
+    if not orm_execute_state.is_delete or orm_execute_state.bind_mapper is None:
+        return
+    if orm_execute_state.bind_mapper.class_ is not Booking:
+        return
+    doomed = select(Booking.id, Booking.user_id)
+    if orm_execute_state.statement.whereclause is not None:
+        doomed = doomed.where(orm_execute_state.statement.whereclause)
+    session = orm_execute_state.session
+    pending = _pending(session)
+    for booking_id, user_id in session.connection().execute(doomed):
+        pending["bookings"][booking_id] = user_id
+
+@event.listens_for(Session, "before_commit")
+def _write_changes(session):
+    # Flush first so the commit's own flush has nothing left for after_flush to collect
+    session.flush()
+    pending = session.info.pop(PENDING_KEY, None)
+    if not pending:
+        return
+    connection = session.connection()
+    changes = pending["bookings"]
+    renamed = [
+        condition for condition, ids in (
+            (Booking.user_id.in_(pending["users"]), pending["users"]),
+            (Booking.cottage_id.in_(pending["cottages"]), pending["cottages"]),
+            (Cottage.property_id.in_(pending["properties"]), pending["properties"])
+        ) if ids
+    ]
+    if renamed:
+        for booking_id, user_id in connection.execute(
+            select(Booking.id, Booking.user_id).outerjoin(Cottage, Cottage.id == Booking.cottage_id).where(or_(*renamed))
+        ):
+            changes.setdefault(booking_id, user_id)
+    if not changes:
+        return
+    rows = [{"booking_id": booking_id, "user_id": user_id} for booking_id, user_id in sorted(changes.items())]
+    if connection.dialect.name == "postgresql":
+        # clock_timestamp(), not now(): readers time the settle window from the numbering
+        connection.execute(
+            insert(BookingChange).values(seq=CHANGE_NUMBERS.next_value(), changed_at=func.clock_timestamp()), rows
+        )
+        return
+    last = connection.execute(
+        update(SyncSequence).where(SyncSequence.name == CHANGE_SEQUENCE)
+        .values(value=SyncSequence.value + len(changes)).returning(SyncSequence.value)
+    ).scalar_one()
+    first = last - len(changes) + 1
+    connection.execute(insert(BookingChange), [dict(row, seq=first + offset) for offset, row in enumerate(rows)])
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_pending(session, transaction):
+    # Changes collected in a transaction that rolled back never happened
+    if transaction.parent is None:
+        session.info.pop(PENDING_KEY, None)
+
+def _settled():
+    """Changes numbered before the oldest one still inside the settle window (all of them on SQLite)"""
+    if engine.dialect.name != "postgresql":
+        return true()
+    unsettled = select(func.min(BookingChange.seq)).where(
+        BookingChange.changed_at > func.now() - timedelta(seconds=SYNC_CHANGE_SETTLE_SECONDS)
+    ).scalar_subquery()
+    return BookingChange.seq < func.coalesce(unsettled, MAX_SEQ)
+
+def sequence_query():
+    """The current cursor (`value`: the last settled change) and `purged_through`"""
+    settled = select(func.max(BookingChange.seq)).where(_settled()).scalar_subquery()
+    return select(
+        func.coalesce(settled, SyncSequence.purged_through).label("value"), SyncSequence.purged_through
+    ).where(SyncSequence.name == CHANGE_SEQUENCE)
+
+def check_cursor(sequence, since: int):
+    """Reject cursors from before the last purge (a replica that is behind the cursor just has no changes yet)"""
+    if since < sequence.purged_through:
+        raise HTTPException(status_code=410, detail="Sync cursor expired; reload the full list and its cursor")
+
+def changes_query(since: int, limit: int, user_id: int = None):
+    query = select(BookingChange.seq, BookingChange.booking_id).where(BookingChange.seq > since, _settled())
+    if user_id is not None:
+        query = query.where(BookingChange.user_id == user_id)
+    return query.order_by(BookingChange.seq).limit(limit + 1)
+
+def bookings_query(booking_ids: list):
+    return select(
+        Booking, User.name.label("user_name"), Cottage.cottage_id.label("cottage_name"), Property.name.label("property_name")
+    ).outerjoin(User, User.id == Booking.user_id).outerjoin(
+        Cottage, Cottage.id == Booking.cottage_id
+    ).outerjoin(Property, Property.id == Cottage.property_id).where(Booking.id.in_(booking_ids))
+
+def latest_changes(rows: list, limit: int) -> tuple:
+    """Booking ids in order of their last change within the page, the next cursor and whether more remain"""
+    page = rows[:limit]
+    latest = {booking_id: seq for seq, booking_id in page}
+    return sorted(latest, key=latest.get), page[-1].seq if page else None, len(rows) > limit
+
+def feed_response(booking_ids: list, booking_rows, cursor: int, has_more: bool) -> dict:
+    current = {row.Booking.id: row for row in booking_rows}
+    changes = []
+    for booking_id in booking_ids:
+        row = current.get(booking_id)
+        if row is None:
+            changes.append({"id": booking_id, "deleted": True})
+            continue
+        booking = row.Booking
+        changes.append({
+            "id": booking.id,
+            "user_id": booking.user_id,
+            "user_name": row.user_name or "Unknown",
+            "cottage_id": booking.cottage_id,
+            "cottage_name": row.cottage_name or "Unknown",
+            "property_name": row.property_name,
+            "check_in": booking.check_in,
+            "check_out": booking.check_out,
+            "status": booking.status,
+            "weekday_credits_used": booking.weekday_credits_used,
+            "weekend_credits_used": booking.weekend_credits_used,
+            "decision_notes": booking.decision_notes,
+            "created_at": booking.created_at,
+            "updated_at": booking.updated_at
+        })
+    return {"changes": changes, "cursor": cursor, "has_more": has_more}
+
+def purge_booking_changes() -> int:
+    """Drop changes older than the retention window; returns the number of rows removed"""
+    db = SessionLocal()
+    try:
+        cutoff = datetime.now(timezone.utc) - timedelta(days=SYNC_CHANGE_RETENTION_DAYS)
+        through = db.execute(select(func.max(BookingChange.seq)).where(BookingChange.changed_at < cutoff)).scalar()
+        if through is None:
+            return 0
+        db.execute(
+            update(SyncSequence).where(SyncSequence.name == CHANGE_SEQUENCE, SyncSequence.purged_through < through)
+            .values(purged_through=through)
+        )
+        purged = db.execute(delete(BookingChange).where(BookingChange.seq <= through)).rowcount
+        db.commit()
+        return purged
+    finally:
+        db.close()
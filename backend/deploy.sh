@@ -74,10 +74,9 @@ EOF
     exit 1
 fi
 
-# Run database migrations (if using Alembic)
-# Uncomment if you have Alembic setup
-# echo -e "${YELLOW}🗄️  Running database migrations...${NC}"
-# alembic upgrade head
+# Run database migrations
+echo -e "${YELLOW}🗄️  Running database migrations...${NC}"
+alembic upgrade head
 
 # Restart service
 echo -e "${YELLOW}🔄 Restarting service...${NC}"
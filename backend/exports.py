@@ -0,0 +1,63 @@
+"""
+Streaming CSV / NDJSON exports
+
+Export endpoints pass stream_export a session factory and a function that runs
+their query and yields one dict per row. The rows are fetched through a
+server-side cursor (yield_per) and encoded in batches as they arrive, so a
+multi-year export holds one batch in memory rather than the whole result.
+
+The generator opens its own session: the body is sent after the handler has
+returned, when request-scoped dependencies may already have been closed.
+"""
+import csv
+import io
+import json
+import os
+from fastapi.responses import StreamingResponse
+from dotenv import load_dotenv
+
+load_dotenv()
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+EXPORT_FORMAT_PATTERN = "^(csv|ndjson)$"
+
+def stream_export(session_factory, fetch, columns: list, export_format: str, filename: str) -> StreamingResponse:
+    """
+    Stream fetch(db, batch_size)'s records as CSV (columns in the given order) or NDJSON.
+    
+    fetch should execute its statement with execution_options(yield_per=batch_size).
+    """
+    def generate():
+        db = session_factory()
+        try:
+            buffer = io.StringIO()
+            writer = None
+            if export_format == "csv":
+                writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+                writer.writeheader()
+            pending = 0
+            for record in fetch(db, EXPORT_BATCH_SIZE):
+                if writer:
+                    writer.writerow(record)
+                else:
+                    buffer.write(json.dumps(record, default=str) + "\n")
+                pending += 1
+                if pending >= EXPORT_BATCH_SIZE:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+                    pending = 0
+            if buffer.tell():
+                yield buffer.getvalue()
+        finally:
+            db.close()
+    
+    return StreamingResponse(
+        generate(),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{export_format}"'}
+    )
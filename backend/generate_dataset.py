@@ -0,0 +1,313 @@
+"""
+Script to populate a database with synthetic data for load tests and benchmarks
+
+Generates properties, cottages, owners with quotas, multi-year bookings in
+every status, maintenance blocks, holidays, peak seasons and the matching
+quota ledger. Active (pending/confirmed) stays never overlap on a cottage,
+past stays are confirmed, cancelled or rejected, and future ones are pending
+or confirmed. Rows are streamed with COPY on PostgreSQL and with batched
+executemany inserts elsewhere.
+
+All generated users share one password (--password). Admins are
+admin1@example.com, admin2@example.com, ...; owners are owner1@example.com, ...
+
+Run `alembic upgrade head` first. The target tables must be empty, or pass
+--truncate to wipe them (this deletes ALL users, bookings and ledger rows).
+
+Usage:
+    cd backend
+    python generate_dataset.py --users 50000 --bookings 5000000
+    python generate_dataset.py --users 500 --bookings 20000 --truncate
+"""
+import argparse
+import csv
+import io
+import random
+import time
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+from sqlalchemy import text
+from database import engine
+from rollups import rebuild_rollups
+from calendar_projection import rebuild_projection
+from auth import get_password_hash
+from models import (
+    Booking, Cottage, MaintenanceBlock, PeakSeason, Property, QuotaTransaction, SystemCalendar, User
+)
+
+# Load order; truncation runs in reverse
+TABLES = [Property, User, Cottage, MaintenanceBlock, Booking, SystemCalendar, PeakSeason, QuotaTransaction]
+
+WEEKDAY_QUOTA = 12
+WEEKEND_QUOTA = 6
+FIXED_HOLIDAYS = [(1, 1, "New Year's Day"), (1, 26, "Republic Day"), (8, 15, "Independence Day"),
+                  (10, 2, "Gandhi Jayanti"), (12, 25, "Christmas Day")]
+PEAK_SEASONS = [((5, 1), (6, 15), "Summer"), ((12, 20), (12, 31), "Year End")]
+
+class CopyWriter:
+    """Streams rows into PostgreSQL with COPY ... FROM STDIN (CSV)"""
+    
+    def __init__(self, connection):
+        self.connection = connection
+    
+    def write(self, table: str, columns: list, rows: list):
+        if not rows:
+            return
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        # Unquoted empty fields (None) load as NULL
+        sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+        cursor = self.connection.driver_connection.cursor()
+        if hasattr(cursor, "copy_expert"):  # psycopg2
+            buffer.seek(0)
+            cursor.copy_expert(sql, buffer)
+        else:  # psycopg 3
+            with cursor.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+
+class InsertWriter:
+    """Batched executemany INSERTs for databases without COPY"""
+    
+    def __init__(self, connection):
+        self.connection = connection
+        self.tables = {model.__tablename__: model.__table__ for model in TABLES}
+    
+    def write(self, table: str, columns: list, rows: list):
+        if rows:
+            self.connection.execute(self.tables[table].insert(), [dict(zip(columns, row)) for row in rows])
+
+class BufferedTable:
+    def __init__(self, writer, model, columns: list, batch_size: int):
+        self.writer = writer
+        self.table = model.__tablename__
+        self.columns = columns
+        self.batch_size = batch_size
+        self.rows = []
+        self.next_id = 1
+        self.count = 0
+    
+    def add(self, *values) -> int:
+        """Queue a row (id assigned here so other tables can reference it) and return its id"""
+        row_id = self.next_id
+        self.next_id += 1
+        self.rows.append((row_id,) + values)
+        self.count += 1
+        return row_id
+    
+    def full(self) -> bool:
+        return len(self.rows) >= self.batch_size
+    
+    def flush(self):
+        self.writer.write(self.table, ["id"] + self.columns, self.rows)
+        self.rows = []
+
+def at(day: date, hour: int = 10) -> datetime:
+    return datetime.combine(day, dt_time(hour), tzinfo=timezone.utc)
+
+def credits_for(check_in: date, nights: int, special_days: set) -> tuple:
+    weekend = sum(
+        1 for n in range(nights)
+        if (check_in + timedelta(days=n)).weekday() >= 5 or check_in + timedelta(days=n) in special_days
+    )
+    return nights - weekend, weekend
+
+def calendar_days(first_year: int, last_year: int):
+    """(holidays by date, peak season date ranges) for every year in the range"""
+    holidays = {}
+    seasons = []
+    for year in range(first_year, last_year + 1):
+        for month, day, name in FIXED_HOLIDAYS:
+            holidays[date(year, month, day)] = name
+        for (start_month, start_day), (end_month, end_day), name in PEAK_SEASONS:
+            seasons.append((f"{name} {year}", date(year, start_month, start_day), date(year, end_month, end_day)))
+    return holidays, seasons
+
+def check_empty(conn, truncate: bool):
+    if truncate:
+        if conn.dialect.name == "postgresql":
+            names = ", ".join(model.__tablename__ for model in TABLES)
+            conn.execute(text(f"TRUNCATE {names} RESTART IDENTITY CASCADE"))
+        else:
+            for model in reversed(TABLES):
+                conn.execute(model.__table__.delete())
+        return
+    for model in TABLES:
+        if conn.execute(text(f"SELECT 1 FROM {model.__tablename__} LIMIT 1")).first():
+            raise SystemExit(f"❌ Table {model.__tablename__} is not empty; re-run with --truncate to replace its data")
+
+def generate(args):
+    rng = random.Random(args.seed)
+    today = date.today()
+    now = datetime.now(timezone.utc)
+    first_day = date(today.year - args.years, 1, 1)
+    horizon = today + timedelta(days=365)
+    holidays, seasons = calendar_days(first_day.year, horizon.year)
+    special_days = set(holidays)
+    for _, season_start, season_end in seasons:
+        special_days.update(season_start + timedelta(days=n) for n in range((season_end - season_start).days + 1))
+    
+    print("Hashing the shared password...")
+    password_hash = get_password_hash(args.password)
+    started = time.perf_counter()
+    
+    with engine.begin() as conn:
+        check_empty(conn, args.truncate)
+        writer = CopyWriter(conn.connection) if conn.dialect.name == "postgresql" else InsertWriter(conn)
+        table = lambda model, columns: BufferedTable(writer, model, columns, args.batch_size)
+        properties = table(Property, ["name", "description", "created_at"])
+        users = table(User, [
+            "email", "phone", "name", "password_hash", "role", "status", "property_id", "weekday_quota",
+            "weekend_quota", "weekday_balance", "weekend_balance", "email_verified", "created_at"
+        ])
+        cottages = table(Cottage, ["property_id", "cottage_id", "capacity", "amenities", "created_at"])
+        blocks = table(MaintenanceBlock, ["cottage_id", "start_date", "end_date", "reason", "created_at"])
+        bookings = table(Booking, [
+            "user_id", "cottage_id", "check_in", "check_out", "status", "weekday_credits_used",
+            "weekend_credits_used", "decision_notes", "created_at", "updated_at"
+        ])
+        calendar_rows = table(SystemCalendar, ["date", "is_holiday", "is_peak_season", "holiday_name", "created_at"])
+        peak_seasons = table(PeakSeason, ["name", "start_date", "end_date", "created_at"])
+        ledger = table(QuotaTransaction, [
+            "user_id", "transaction_type", "weekday_change", "weekend_change", "description", "booking_id", "created_at"
+        ])
+        
+        # Calendar
+        for day in sorted(special_days):
+            calendar_rows.add(day, day in holidays, _in_season(day, seasons), holidays.get(day), at(first_day))
+        for name, season_start, season_end in seasons:
+            peak_seasons.add(name, season_start, season_end, at(first_day))
+        
+        # Properties and cottages
+        cottage_ids_by_property = {}
+        for p in range(1, args.properties + 1):
+            property_id = properties.add(f"Sanctuary {p}", f"Synthetic property {p}", at(first_day))
+            cottage_ids_by_property[property_id] = [
+                cottages.add(property_id, f"C-{c}", rng.choice([2, 4, 4, 6, 8]), "wifi,kitchen", at(first_day))
+                for c in range(1, args.cottages_per_property + 1)
+            ]
+        properties.flush()
+        cottages.flush()
+        
+        # Admins and owners; owners are spread evenly over the properties
+        for a in range(1, args.admins + 1):
+            users.add(f"admin{a}@example.com", "9000000000", f"Admin {a}", password_hash, "ADMIN", "ACTIVE",
+                      None, 0, 0, 0, 0, True, at(first_day))
+        owners_by_property = {property_id: [] for property_id in cottage_ids_by_property}
+        property_ids = list(cottage_ids_by_property)
+        for o in range(1, args.users + 1):
+            property_id = property_ids[o % len(property_ids)]
+            roll = rng.random()
+            status = "PENDING" if roll < 0.02 else "SUSPENDED" if roll < 0.03 else "ACTIVE"
+            joined = first_day + timedelta(days=rng.randrange(max(1, (today - first_day).days)))
+            owner_id = users.add(
+                f"owner{o}@example.com", f"9{o:09d}", f"Owner {o}", password_hash, "OWNER", status,
+                None if status == "PENDING" else property_id, WEEKDAY_QUOTA, WEEKEND_QUOTA,
+                WEEKDAY_QUOTA, WEEKEND_QUOTA, True, at(joined)
+            )
+            if status == "PENDING":
+                continue
+            owners_by_property[property_id].append(owner_id)
+            ledger.add(owner_id, "activation", WEEKDAY_QUOTA, WEEKEND_QUOTA, "Account activated with initial quota",
+                       None, at(joined, 12))
+            for year in range(joined.year + 1, today.year + 1):
+                ledger.add(owner_id, "reset", WEEKDAY_QUOTA, WEEKEND_QUOTA, "Annual quota reset", None, at(date(year, 1, 1), 0))
+            if rng.random() < 0.05:
+                ledger.add(owner_id, "manual_adjustment", rng.choice([-2, -1, 1, 2]), rng.choice([-1, 0, 1]),
+                           "Goodwill adjustment", None, at(joined + timedelta(days=rng.randrange(1, 365))))
+            if users.full() or ledger.full():
+                users.flush()
+                ledger.flush()
+        
+        # Everything bookings reference must be loaded before the first booking batch
+        for buffered in (calendar_rows, peak_seasons, users, ledger):
+            buffered.flush()
+        
+        # Bookings: walk each cottage's timeline so active stays never overlap
+        all_cottages = [(property_id, cottage_id) for property_id, ids in cottage_ids_by_property.items() for cottage_id in ids]
+        per_cottage, extra = divmod(args.bookings, len(all_cottages))
+        for index, (property_id, cottage_id) in enumerate(all_cottages):
+            guests = owners_by_property[property_id]
+            if not guests:
+                continue
+            cursor = first_day + timedelta(days=rng.randrange(14))
+            for _ in range(per_cottage + (1 if index < extra else 0)):
+                nights = rng.choice([1, 2, 2, 3, 3, 4, 5, 7])
+                check_in = cursor
+                on_timeline = check_in + timedelta(days=nights) <= horizon
+                if not on_timeline:
+                    # Timeline is full: the rest are requests that never held the dates
+                    check_in = first_day + timedelta(days=rng.randrange((horizon - first_day).days - nights))
+                    status = rng.choice(["REJECTED", "CANCELLED"])
+                elif check_in < today:
+                    status = rng.choices(["CONFIRMED", "CANCELLED", "REJECTED"], weights=[75, 15, 10])[0]
+                else:
+                    status = rng.choices(["CONFIRMED", "PENDING", "CANCELLED", "REJECTED"], weights=[50, 35, 10, 5])[0]
+                check_out = check_in + timedelta(days=nights)
+                if on_timeline:
+                    cursor = check_out + timedelta(days=rng.choice([0, 0, 1, 2, 3, 7]))
+                    if rng.random() < 0.01:
+                        block_days = rng.randrange(2, 10)
+                        blocks.add(cottage_id, cursor, cursor + timedelta(days=block_days - 1), "Scheduled maintenance",
+                                   at(cursor - timedelta(days=30)))
+                        cursor += timedelta(days=block_days)
+                
+                user_id = rng.choice(guests)
+                weekday, weekend = credits_for(check_in, nights, special_days)
+                # Stays far ahead were requested recently, never in the future
+                requested = min(at(check_in - timedelta(days=rng.randrange(1, 120)), rng.randrange(7, 22)),
+                                now - timedelta(hours=rng.randrange(1, 24 * 30)))
+                decided = None if status == "PENDING" else min(requested + timedelta(hours=rng.randrange(1, 72)), now)
+                notes = {"REJECTED": "Dates unavailable", "CANCELLED": "Cancelled by owner"}.get(status)
+                booking_id = bookings.add(user_id, cottage_id, check_in, check_out, status, weekday, weekend,
+                                          notes, requested, decided)
+                ledger.add(user_id, "booking", -weekday, -weekend, f"Booking request for C-{cottage_id}",
+                           booking_id, requested)
+                if status in ("REJECTED", "CANCELLED"):
+                    ledger.add(user_id, "refund", weekday, weekend, f"Booking {status.lower()} - quota refunded",
+                               booking_id, decided)
+                
+                if bookings.full() or ledger.full():
+                    # Parents first so the ledger's foreign keys resolve
+                    bookings.flush()
+                    ledger.flush()
+                    print(f"  {bookings.count:,} bookings / {ledger.count:,} ledger rows "
+                          f"({time.perf_counter() - started:.0f}s)", flush=True)
+        
+        for buffered in (properties, users, cottages, blocks, bookings, calendar_rows, peak_seasons, ledger):
+            buffered.flush()
+        for buffered in (properties, users, cottages, blocks, bookings, calendar_rows, peak_seasons, ledger):
+            print(f"✓ {buffered.table}: {buffered.count:,} rows")
+        
+        if conn.dialect.name == "postgresql":
+            # Ids were assigned here, so move the serial sequences past them
+            for model in TABLES:
+                name = model.__tablename__
+                conn.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{name}', 'id'), coalesce((SELECT max(id) FROM {name}), 0) + 1, false)"
+                ))
+    
+    # Rows were written below the ORM, so the report rollups and calendar projection are recomputed in one pass
+    print(f"✓ daily_statistics: {rebuild_rollups():,} rollup rows")
+    print(f"✓ booking_calendar: {rebuild_projection():,} rows")
+    
+    if engine.dialect.name == "postgresql":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("ANALYZE"))
+    print(f"\n✅ Dataset generated in {time.perf_counter() - started:.0f}s")
+    print(f"Log in as admin1@example.com or owner1@example.com with password: {args.password}")
+
+def _in_season(day: date, seasons) -> bool:
+    return any(season_start <= day <= season_end for _, season_start, season_end in seasons)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50_000, help="Owner accounts")
+    parser.add_argument("--bookings", type=int, default=5_000_000)
+    parser.add_argument("--properties", type=int, default=100)
+    parser.add_argument("--cottages-per-property", type=int, default=20)
+    parser.add_argument("--admins", type=int, default=5)
+    parser.add_argument("--years", type=int, default=10, help="Years of history before this year")
+    parser.add_argument("--password", default="password123")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed, for reproducible datasets")
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    parser.add_argument("--truncate", action="store_true", help="Delete existing data in the target tables first")
+    generate(parser.parse_args())
@@ -0,0 +1,325 @@
+"""
+Server-push booking and maintenance updates (Server-Sent Events)
+
+Owner availability screens and the admin approval queue subscribe through
+GET /api/owner/live and GET /api/admin/live instead of polling. Every commit
+that adds, changes or deletes bookings or maintenance blocks publishes one
+small diff per row: its id and cottage, the fields that changed (all of them
+for created/deleted rows) and their previous values. A diff goes to the
+subscribers of its cottage (the old and the new one when a booking moves) and,
+when the booking is or was pending, to the approval queue.
+
+On Postgres the diffs are sent with pg_notify inside the writing transaction,
+so they are delivered on commit (never on rollback) in commit order, and each
+worker LISTENs on one dedicated connection and fans them out to its own
+subscribers. Without Postgres (SQLite in development, a single worker) the
+diffs go straight to the local subscribers after the commit.
+
+Push is best effort. The stream opens with a `ready` event carrying the
+change-feed cursor (see change_feed.py); a subscriber that falls too far
+behind, or whose worker lost its LISTEN connection, gets a `resync` event and
+the stream ends, and the client reconnects and catches up from that cursor
+or by reloading.
+"""
+import asyncio
+from datetime import date, datetime
+from enum import Enum
+from functools import partial
+import json
+import os
+import signal
+import threading
+from dotenv import load_dotenv
+from fastapi.responses import StreamingResponse
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+from database import ASYNC_DATABASE_URL, engine
+from models import Booking, BookingStatus, MaintenanceBlock
+
+load_dotenv()
+
+LIVE_UPDATES_CHANNEL = os.getenv("LIVE_UPDATES_CHANNEL", "live_updates")
+LIVE_UPDATES_KEEPALIVE_SECONDS = float(os.getenv("LIVE_UPDATES_KEEPALIVE_SECONDS", "15"))
+LIVE_UPDATES_QUEUE_SIZE = int(os.getenv("LIVE_UPDATES_QUEUE_SIZE", "1000"))
+
+APPROVALS_TOPIC = "approvals"
+PENDING_KEY = "pending_live_updates"
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+NOTIFY_PAYLOAD_BYTES = 7500
+RESYNC_FRAME = "event: resync\ndata: {}\n\n"
+
+# Published type and the columns a diff carries for each tracked model
+TRACKED = {
+    Booking: ("booking", ("cottage_id", "check_in", "check_out", "status")),
+    MaintenanceBlock: ("maintenance", ("cottage_id", "start_date", "end_date")),
+}
+
+def cottage_topic(cottage_id: int) -> str:
+    return f"cottage:{cottage_id}"
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def _frame(event_type: str, data) -> str:
+    return f"event: {event_type}\ndata: {json.dumps(data, default=_json_default)}\n\n"
+
+def _topics(diff: dict, previous: dict) -> set:
+    topics = {cottage_topic(cottage_id) for cottage_id in (diff["cottage_id"], previous.get("cottage_id")) if cottage_id}
+    if diff["type"] == "booking" and BookingStatus.PENDING in (diff.get("status"), previous.get("status")):
+        topics.add(APPROVALS_TOPIC)
+    return topics
+
+def _record(session, diff: dict, previous: dict, created: bool = False, deleted: bool = False):
+    """Merge one row's diff into the transaction's pending updates (a row can be flushed more than once)"""
+    pending = session.info.setdefault(PENDING_KEY, {})
+    key = (diff["type"], diff["id"])
+    entry = pending.get(key)
+    if entry is None:
+        pending[key] = {"diff": diff, "previous": previous, "created": created, "deleted": deleted}
+        return
+    if deleted and entry["created"]:
+        del pending[key]  # never visible outside the transaction
+        return
+    entry["diff"].update(diff)
+    for field, value in previous.items():
+        entry["previous"].setdefault(field, value)
+    entry["deleted"] = deleted
+
+@event.listens_for(Session, "after_flush")
+def _track_flush(session, flush_context):
+    # new/dirty/deleted and attribute history still describe this flush here
+    for objects, created, deleted in ((session.new, True, False), (session.deleted, False, True), (session.dirty, False, False)):
+        for obj in objects:
+            tracked = TRACKED.get(type(obj))
+            if tracked is None:
+                continue
+            event_type, fields = tracked
+            state = inspect(obj)
+            # Deleted rows can't be refreshed, so read what was loaded
+            current = state.dict.get if deleted else lambda field: getattr(obj, field)
+            diff = {"type": event_type, "id": obj.id, "cottage_id": current("cottage_id")}
+            previous = {}
+            changed = created or deleted
+            for field in fields:
+                history = state.attrs[field].history
+                if created or deleted:
+                    diff[field] = current(field)
+                elif history.has_changes():
+                    changed = True
+                    diff[field] = current(field)
+                    if history.deleted and history.deleted[0] is not None:
+                        previous[field] = history.deleted[0]
+            if not changed:
+                continue  # nothing a subscriber shows has changed
+            if event_type == "booking" and "status" not in diff:
+                diff["status"] = current("status")  # decides whether the approval queue hears of it
+            _record(session, diff, previous, created, deleted)
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_bulk_delete(orm_execute_state):
+    # Query(...).delete() skips the flush hooks; describe the rows it is about to remove
+    if not orm_execute_state.is_delete or orm_execute_state.bind_mapper is None:
+        return
+    model = orm_execute_state.bind_mapper.class_
+    tracked = TRACKED.get(model)
+    if tracked is None:
+        return
+    event_type, fields = tracked
+    doomed = select(model.id, *[getattr(model, field) for field in fields])
+    if orm_execute_state.statement.whereclause is not None:
+        doomed = doomed.where(orm_execute_state.statement.whereclause)
+    session = orm_execute_state.session
+    for row in session.connection().execute(doomed):
+        _record(session, {"type": event_type, "id": row.id, **{field: getattr(row, field) for field in fields}}, {}, deleted=True)
+
+def _messages(pending: dict) -> list:
+    """[topics, diff] pairs in a JSON-ready shape"""
+    messages = []
+    for entry in pending.values():
+        diff = dict(entry["diff"])
+        if entry["created"]:
+            diff["created"] = True
+        if entry["deleted"]:
+            diff["deleted"] = True
+        if entry["previous"]:
+            diff["previous"] = entry["previous"]
+        messages.append([sorted(_topics(entry["diff"], entry["previous"])), diff])
+    return messages
+
+def _payloads(messages: list) -> list:
+    """NOTIFY payloads, each a JSON list of [topics, diff] under the size limit"""
+    payloads, batch, size = [], [], 2
+    for message in messages:
+        encoded = json.dumps(message, default=_json_default)
+        if batch and size + len(encoded) + 1 > NOTIFY_PAYLOAD_BYTES:
+            payloads.append("[" + ",".join(batch) + "]")
+            batch, size = [], 2
+        batch.append(encoded)
+        size += len(encoded) + 1
+    if batch:
+        payloads.append("[" + ",".join(batch) + "]")
+    return payloads
+
+@event.listens_for(Session, "before_commit")
+def _notify(session):
+    # Flush first so the commit's own flush has nothing left for after_flush to collect
+    session.flush()
+    if not session.info.get(PENDING_KEY):
+        return
+    connection = session.connection()
+    if connection.dialect.name != "postgresql":
+        return  # published locally once the commit succeeds
+    for payload in _payloads(_messages(session.info.pop(PENDING_KEY))):
+        connection.execute(select(func.pg_notify(LIVE_UPDATES_CHANNEL, payload)))
+
+@event.listens_for(Session, "after_commit")
+def _publish_local(session):
+    pending = session.info.pop(PENDING_KEY, None)
+    if pending:
+        broker.publish(json.loads(json.dumps(_messages(pending), default=_json_default)))
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_pending(session, transaction):
+    # Diffs collected in a transaction that rolled back never happened
+    if transaction.parent is None:
+        session.info.pop(PENDING_KEY, None)
+
+class Subscription:
+    """One SSE client: the topics it follows and its queue of rendered frames"""
+    
+    def __init__(self, topics):
+        self.topics = frozenset(topics)
+        self.queue = asyncio.Queue(maxsize=LIVE_UPDATES_QUEUE_SIZE)
+
+class LiveBroker:
+    """Fans published diffs out to this worker's subscribers; publish() may be called from any thread"""
+    
+    def __init__(self):
+        self._subscriptions = set()
+        self._loop = None
+        self._listener = None
+    
+    def start(self):
+        """Bind to the running event loop and, on Postgres, start listening for other workers' diffs"""
+        self._loop = asyncio.get_running_loop()
+        if threading.current_thread() is threading.main_thread():
+            # uvicorn waits for open responses before running shutdown handlers, so end the streams on the signal itself
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                previous = signal.getsignal(signum)
+                if callable(previous):
+                    signal.signal(signum, partial(self._on_exit_signal, previous))
+        if engine.dialect.name == "postgresql":
+            self._listener = asyncio.create_task(self._listen())
+    
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+        self._end_streams()
+    
+    def _on_exit_signal(self, previous, signum, frame):
+        self._loop.call_soon_threadsafe(self._end_streams)
+        previous(signum, frame)
+    
+    def _end_streams(self, last_frame=None):
+        for subscription in list(self._subscriptions):
+            self._close(subscription, last_frame)
+    
+    def subscribe(self, topics) -> Subscription:
+        subscription = Subscription(topics)
+        self._subscriptions.add(subscription)
+        return subscription
+    
+    def unsubscribe(self, subscription: Subscription):
+        self._subscriptions.discard(subscription)
+    
+    def publish(self, messages: list):
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._dispatch, messages)
+    
+    def _dispatch(self, messages: list):
+        for topics, diff in messages:
+            topics = set(topics)
+            frame = None
+            for subscription in list(self._subscriptions):
+                if subscription.topics.isdisjoint(topics):
+                    continue
+                frame = frame or _frame(diff["type"], diff)
+                try:
+                    subscription.queue.put_nowait(frame)
+                except asyncio.QueueFull:
+                    self._close(subscription, RESYNC_FRAME)
+    
+    def _close(self, subscription: Subscription, last_frame):
+        # Replace whatever is queued with the final frame (None just ends the stream)
+        self._subscriptions.discard(subscription)
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(last_frame)
+    
+    def _on_notify(self, connection, pid, channel, payload):
+        self._dispatch(json.loads(payload))
+    
+    async def _listen(self):
+        delay = 1
+        while True:
+            listen_engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=NullPool)
+            try:
+                async with listen_engine.connect() as connection:
+                    raw = (await connection.get_raw_connection()).driver_connection
+                    closed = asyncio.Event()
+                    raw.add_termination_listener(lambda _: closed.set())
+                    await raw.add_listener(LIVE_UPDATES_CHANNEL, self._on_notify)
+                    delay = 1
+                    while not closed.is_set():
+                        try:
+                            await asyncio.wait_for(closed.wait(), LIVE_UPDATES_KEEPALIVE_SECONDS)
+                        except asyncio.TimeoutError:
+                            await raw.fetchval("SELECT 1")  # notices a silently dropped connection
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Live updates listener failed: {str(e)}")
+            else:
+                print("⚠️ Live updates listener lost its connection")
+            finally:
+                await listen_engine.dispose()
+            # Diffs published while nobody was listening are lost; have every client catch up
+            self._end_streams(RESYNC_FRAME)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30)
+
+broker = LiveBroker()
+
+def event_stream(topics: set, ready: dict) -> StreamingResponse:
+    """SSE response: a `ready` event, then the diffs for the topics, with keepalive comments in between"""
+    
+    async def frames():
+        subscription = broker.subscribe(topics)
+        try:
+            yield _frame("ready", ready)
+            while True:
+                try:
+                    frame = await asyncio.wait_for(subscription.queue.get(), LIVE_UPDATES_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if frame is None:
+                    return
+                yield frame
+                if frame is RESYNC_FRAME:
+                    return
+        finally:
+            broker.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        frames(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
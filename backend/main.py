@@ -1,10 +1,21 @@
-from fastapi import FastAPI
+import os
+import time
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from database import engine, Base
+from fastapi.responses import PlainTextResponse
+from database import engine
 from routers import auth, admin, owner
-
-# Create database tables
-Base.metadata.create_all(bind=engine)
+from starlette.concurrency import run_in_threadpool
+from tasks import start_scheduler
+from token_revocation import sync_revocations
+from replica import record_write
+from metrics import start_request_stats, record_request, route_metrics, require_metrics_token
+import rollups  # noqa: F401 - registers the session hooks that keep daily_statistics current
+import calendar_projection  # noqa: F401 - registers the session hooks that keep booking_calendar current
+import live_updates
 
 app = FastAPI(title="Vanatvam API", version="1.0.0")
 
@@ -17,11 +28,63 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Keep a client's reads on the primary briefly after it writes (read-your-writes with a replica)
+@app.middleware("http")
+async def pin_writes_to_primary(request: Request, call_next):
+    response = await call_next(request)
+    record_write(request, response.status_code)
+    return response
+
+# Per-route latency, SQL statement count and DB time (served at /metrics)
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    stats = start_request_stats()
+    started = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        record_request(request, status_code, time.perf_counter() - started, stats)
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
 app.include_router(owner.router, prefix="/api/owner", tags=["Owner"])
 
+def alembic_config() -> Config:
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    config = Config(os.path.join(backend_dir, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(backend_dir, "migrations"))
+    return config
+
+def check_schema_version():
+    """Refuse to start against a database that hasn't been migrated to the latest revision"""
+    head = ScriptDirectory.from_config(alembic_config()).get_current_head()
+    with engine.connect() as conn:
+        current = MigrationContext.configure(conn).get_current_revision()
+    if current != head:
+        raise RuntimeError(
+            f"Database schema is at revision {current or 'none'}, expected {head}. "
+            "Run: cd backend && alembic upgrade head"
+        )
+
+@app.on_event("startup")
+async def start_background_jobs():
+    await run_in_threadpool(check_schema_version)
+    await run_in_threadpool(sync_revocations)
+    start_scheduler()
+    live_updates.broker.start()
+
+@app.on_event("shutdown")
+async def close_live_streams():
+    await live_updates.broker.stop()
+
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(require_metrics_token)])
+def metrics():
+    return PlainTextResponse(route_metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/")
 def root():
     return {"message": "Vanatvam API is running"}
@@ -0,0 +1,189 @@
+"""
+Per-request latency and SQL instrumentation
+
+The middleware in main.py opens a RequestStats for every request; SQLAlchemy
+cursor events on every engine (sync, async and replica) add each statement and
+its duration to the stats of the request that issued it. When the request
+finishes the totals are recorded per route template and exposed in Prometheus
+text format at GET /metrics. Requests slower than SLOW_REQUEST_MS or issuing
+more than SLOW_REQUEST_STATEMENTS statements also get a JSON log line.
+
+GET /metrics answers only requests carrying `Authorization: Bearer
+<METRICS_TOKEN>` (the scraper's bearer_token); without METRICS_TOKEN set the
+endpoint is disabled and returns 404.
+"""
+import json
+import os
+import secrets
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+from fastapi import HTTPException, Request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+SLOW_REQUEST_STATEMENTS = int(os.getenv("SLOW_REQUEST_STATEMENTS", "100"))
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000)
+
+class RequestStats:
+    """SQL totals for one request; mutated from whichever thread runs its queries"""
+    
+    def __init__(self):
+        self.statements = 0
+        self.db_seconds = 0.0
+        self._lock = threading.Lock()
+    
+    def add(self, seconds: float):
+        with self._lock:
+            self.statements += 1
+            self.db_seconds += seconds
+
+_current_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+def start_request_stats() -> RequestStats:
+    """Attach a fresh RequestStats to the current context (copied into threadpool calls and tasks)"""
+    stats = RequestStats()
+    _current_stats.set(stats)
+    return stats
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    if stats is None or context is None:
+        return
+    stats.add(time.perf_counter() - getattr(context, "_metrics_started", time.perf_counter()))
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+    
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.count += 1
+        self.total += value
+
+class RouteMetrics:
+    """Per (method, route) histograms and counters for this worker"""
+    
+    def __init__(self):
+        self._latency = {}
+        self._statements = {}
+        self._db_seconds = {}
+        self._responses = {}
+        self._lock = threading.Lock()
+    
+    def record(self, method: str, route: str, status_code: int, seconds: float, stats: RequestStats):
+        key = (method, route)
+        with self._lock:
+            self._latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(seconds)
+            self._statements.setdefault(key, Histogram(STATEMENT_BUCKETS)).observe(stats.statements)
+            self._db_seconds[key] = self._db_seconds.get(key, 0.0) + stats.db_seconds
+            response_key = (method, route, str(status_code))
+            self._responses[response_key] = self._responses.get(response_key, 0) + 1
+    
+    def statement_total(self, method: str, route: str) -> int:
+        """SQL statements issued by all recorded requests to a route"""
+        histogram = self._statements.get((method, route))
+        return int(histogram.total) if histogram else 0
+    
+    def reset(self):
+        with self._lock:
+            self._latency.clear()
+            self._statements.clear()
+            self._db_seconds.clear()
+            self._responses.clear()
+    
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        with self._lock:
+            lines += [
+                "# HELP http_requests_total Requests handled, by route and status code",
+                "# TYPE http_requests_total counter",
+            ]
+            for (method, route, code), count in sorted(self._responses.items()):
+                lines.append(f"http_requests_total{_labels(method=method, route=route, status=code)} {count}")
+            lines += _histogram_lines(
+                "http_request_duration_seconds", "Request latency in seconds", self._latency
+            )
+            lines += _histogram_lines(
+                "http_request_sql_statements", "SQL statements issued per request", self._statements
+            )
+            lines += [
+                "# HELP http_request_db_seconds_total Time spent executing SQL, by route",
+                "# TYPE http_request_db_seconds_total counter",
+            ]
+            for (method, route), seconds in sorted(self._db_seconds.items()):
+                lines.append(f"http_request_db_seconds_total{_labels(method=method, route=route)} {seconds:.6f}")
+        return "\n".join(lines) + "\n"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+def _histogram_lines(name: str, help_text: str, histograms: dict):
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for (method, route), histogram in sorted(histograms.items()):
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            lines.append(f"{name}_bucket{_labels(method=method, route=route, le=repr(float(bound)))} {count}")
+        lines.append(f"{name}_bucket{_labels(method=method, route=route, le='+Inf')} {histogram.count}")
+        lines.append(f"{name}_sum{_labels(method=method, route=route)} {histogram.total:.6f}")
+        lines.append(f"{name}_count{_labels(method=method, route=route)} {histogram.count}")
+    return lines
+
+route_metrics = RouteMetrics()
+
+def route_template(request) -> str:
+    # Label by the matched path template, not the raw URL, to keep label cardinality bounded
+    route = request.scope.get("route")
+    if route is None or not hasattr(route, "path_regex"):
+        return "unmatched"
+    # Depending on the FastAPI version an included route's path may or may not carry the router prefix
+    path = request.url.path
+    for i, char in enumerate(path):
+        if char == "/" and route.path_regex.match(path[i:]):
+            return path[:i] + route.path
+    return route.path
+
+def record_request(request, status_code: int, seconds: float, stats: RequestStats):
+    route = route_template(request)
+    route_metrics.record(request.method, route, status_code, seconds, stats)
+    if seconds * 1000 >= SLOW_REQUEST_MS or stats.statements > SLOW_REQUEST_STATEMENTS:
+        print(json.dumps({
+            "event": "slow_request",
+            "method": request.method,
+            "route": route,
+            "path": request.url.path,
+            "status": status_code,
+            "duration_ms": round(seconds * 1000, 1),
+            "sql_statements": stats.statements,
+            "db_ms": round(stats.db_seconds * 1000, 1),
+        }), flush=True)
+
+def require_metrics_token(request: Request):
+    """Dependency for GET /metrics: route paths, latencies and query counts are not public"""
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(token.encode(), METRICS_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid metrics token", headers={"WWW-Authenticate": "Bearer"})
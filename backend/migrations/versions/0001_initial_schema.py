@@ -0,0 +1,177 @@
+"""Initial schema (tables previously created by create_all and the add_email_* scripts)
+
+Databases set up before migrations already have some or all of these tables.
+Existing tables are kept and only get the columns they are missing (e.g. when
+add_email_columns.py was never run), and indexes are created if absent, so
+`alembic upgrade head` works on them as it does on an empty database.
+
+Revision ID: 0001_initial_schema
+Revises:
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001_initial_schema"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+user_role = sa.Enum("ADMIN", "OWNER", name="userrole")
+user_status = sa.Enum("PENDING", "ACTIVE", "SUSPENDED", name="userstatus")
+booking_status = sa.Enum("PENDING", "CONFIRMED", "REJECTED", "CANCELLED", name="bookingstatus")
+
+def _has_table(name: str) -> bool:
+    return sa.inspect(op.get_bind()).has_table(name)
+
+def _create_table(name: str, *columns):
+    """Create the table, or add whichever of its columns an existing one lacks"""
+    if not _has_table(name):
+        op.create_table(name, *columns)
+        return
+    existing = {column["name"] for column in sa.inspect(op.get_bind()).get_columns(name)}
+    for column in columns:
+        if column.name not in existing and not column.primary_key:
+            op.add_column(name, column)
+
+def upgrade():
+    _create_table(
+        "properties",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False, unique=True),
+        sa.Column("description", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_properties_id", "properties", ["id"], if_not_exists=True)
+    
+    _create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("phone", sa.String(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("password_hash", sa.String(), nullable=False),
+        sa.Column("role", user_role, nullable=True),
+        sa.Column("status", user_status, nullable=True),
+        sa.Column("property_id", sa.Integer(), sa.ForeignKey("properties.id"), nullable=True),
+        sa.Column("weekday_quota", sa.Integer(), nullable=True),
+        sa.Column("weekend_quota", sa.Integer(), nullable=True),
+        sa.Column("weekday_balance", sa.Integer(), nullable=True),
+        sa.Column("weekend_balance", sa.Integer(), nullable=True),
+        sa.Column("email_verified", sa.Boolean(), nullable=True),
+        sa.Column("verification_token", sa.String(), nullable=True),
+        sa.Column("verification_token_expires", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("reset_token", sa.String(), nullable=True),
+        sa.Column("reset_token_expires", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_users_id", "users", ["id"], if_not_exists=True)
+    op.create_index("ix_users_email", "users", ["email"], unique=True, if_not_exists=True)
+    
+    _create_table(
+        "cottages",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("property_id", sa.Integer(), sa.ForeignKey("properties.id"), nullable=False),
+        sa.Column("cottage_id", sa.String(), nullable=False),
+        sa.Column("capacity", sa.Integer(), nullable=False),
+        sa.Column("amenities", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_cottages_id", "cottages", ["id"], if_not_exists=True)
+    
+    _create_table(
+        "maintenance_blocks",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("cottage_id", sa.Integer(), sa.ForeignKey("cottages.id"), nullable=False),
+        sa.Column("start_date", sa.Date(), nullable=False),
+        sa.Column("end_date", sa.Date(), nullable=False),
+        sa.Column("reason", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_maintenance_blocks_id", "maintenance_blocks", ["id"], if_not_exists=True)
+    
+    _create_table(
+        "bookings",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("cottage_id", sa.Integer(), sa.ForeignKey("cottages.id"), nullable=False),
+        sa.Column("check_in", sa.Date(), nullable=False),
+        sa.Column("check_out", sa.Date(), nullable=False),
+        sa.Column("status", booking_status, nullable=True),
+        sa.Column("weekday_credits_used", sa.Integer(), nullable=True),
+        sa.Column("weekend_credits_used", sa.Integer(), nullable=True),
+        sa.Column("decision_notes", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_bookings_id", "bookings", ["id"], if_not_exists=True)
+    
+    _create_table(
+        "system_calendars",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("date", sa.Date(), nullable=False, unique=True),
+        sa.Column("is_holiday", sa.Boolean(), nullable=True),
+        sa.Column("is_peak_season", sa.Boolean(), nullable=True),
+        sa.Column("holiday_name", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_system_calendars_id", "system_calendars", ["id"], if_not_exists=True)
+    
+    _create_table(
+        "peak_seasons",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("start_date", sa.Date(), nullable=False),
+        sa.Column("end_date", sa.Date(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_peak_seasons_id", "peak_seasons", ["id"], if_not_exists=True)
+    
+    _create_table(
+        "quota_transactions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("transaction_type", sa.String(), nullable=False),
+        sa.Column("weekday_change", sa.Integer(), nullable=True),
+        sa.Column("weekend_change", sa.Integer(), nullable=True),
+        sa.Column("description", sa.String(), nullable=True),
+        sa.Column("booking_id", sa.Integer(), sa.ForeignKey("bookings.id"), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_quota_transactions_id", "quota_transactions", ["id"], if_not_exists=True)
+    
+    _create_table(
+        "email_config",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("smtp_server", sa.String(), nullable=False),
+        sa.Column("smtp_port", sa.Integer(), nullable=False),
+        sa.Column("smtp_username", sa.String(), nullable=True),
+        sa.Column("smtp_password", sa.String(), nullable=True),
+        sa.Column("from_email", sa.String(), nullable=True),
+        sa.Column("frontend_url", sa.String(), nullable=False),
+        sa.Column("enabled", sa.Boolean(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_email_config_id", "email_config", ["id"], if_not_exists=True)
+    
+    _create_table(
+        "email_templates",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("template_type", sa.String(), nullable=False, unique=True),
+        sa.Column("subject", sa.String(), nullable=False),
+        sa.Column("html_body", sa.Text(), nullable=False),
+        sa.Column("text_body", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_email_templates_id", "email_templates", ["id"], if_not_exists=True)
+
+def downgrade():
+    for table in ("email_templates", "email_config", "quota_transactions", "peak_seasons", "system_calendars",
+                  "bookings", "maintenance_blocks", "cottages", "users", "properties"):
+        op.drop_table(table)
+    bind = op.get_bind()
+    for enum in (booking_status, user_status, user_role):
+        enum.drop(bind, checkfirst=True)
@@ -0,0 +1,72 @@
+"""Digest-based verification/reset tokens, login rate-limit buckets and token revocations
+
+Revision ID: 0002_auth_tokens
+Revises: 0001_initial_schema
+Create Date: 2026-10-19
+"""
+import hashlib
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002_auth_tokens"
+down_revision = "0001_initial_schema"
+branch_labels = None
+depends_on = None
+
+def _has_table(name: str) -> bool:
+    return sa.inspect(op.get_bind()).has_table(name)
+
+def upgrade():
+    # Outstanding tokens were stored in plaintext; store their SHA-256 digests instead
+    bind = op.get_bind()
+    users = sa.table("users", sa.column("id"), sa.column("verification_token"), sa.column("reset_token"))
+    for column in ("verification_token", "reset_token"):
+        token_column = users.c[column]
+        rows = bind.execute(
+            sa.select(users.c.id, token_column).where(token_column.isnot(None), sa.func.length(token_column) != 64)
+        ).all()
+        for user_id, token in rows:
+            bind.execute(
+                users.update().where(users.c.id == user_id).values({column: hashlib.sha256(token.encode("utf-8")).hexdigest()})
+            )
+    
+    # users is live; CONCURRENTLY cannot run inside the migration transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_users_verification_token", "users", ["verification_token"],
+            if_not_exists=True, postgresql_concurrently=True
+        )
+        op.create_index(
+            "ix_users_reset_token", "users", ["reset_token"],
+            if_not_exists=True, postgresql_concurrently=True
+        )
+    
+    if not _has_table("rate_limit_buckets"):
+        op.create_table(
+            "rate_limit_buckets",
+            sa.Column("key", sa.String(), primary_key=True),
+            sa.Column("tokens", sa.Float(), nullable=False),
+            sa.Column("updated_at", sa.Float(), nullable=False),
+        )
+    
+    if not _has_table("token_revocations"):
+        op.create_table(
+            "token_revocations",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("jti", sa.String(), nullable=True, unique=True),
+            sa.Column("user_id", sa.Integer(), nullable=True),
+            sa.Column("revoked_at", sa.Float(), nullable=False),
+            sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        )
+    op.create_index("ix_token_revocations_id", "token_revocations", ["id"], if_not_exists=True)
+    op.create_index("ix_token_revocations_user_id", "token_revocations", ["user_id"], if_not_exists=True)
+    op.create_index("ix_token_revocations_expires_at", "token_revocations", ["expires_at"], if_not_exists=True)
+
+def downgrade():
+    op.drop_table("token_revocations")
+    op.drop_table("rate_limit_buckets")
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_users_reset_token", table_name="users", postgresql_concurrently=True)
+        op.drop_index("ix_users_verification_token", table_name="users", postgresql_concurrently=True)
+    # Digests cannot be turned back into tokens; outstanding links stop working
+    op.execute("UPDATE users SET verification_token = NULL, reset_token = NULL")
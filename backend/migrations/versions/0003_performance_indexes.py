@@ -0,0 +1,48 @@
+"""Composite and partial indexes for booking overlap, escrow, ledger and report queries
+
+Built with CREATE INDEX CONCURRENTLY on PostgreSQL so writes are not blocked.
+If a concurrent build fails it leaves an INVALID index behind; drop it and
+re-run the upgrade.
+
+Revision ID: 0003_performance_indexes
+Revises: 0002_auth_tokens
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003_performance_indexes"
+down_revision = "0002_auth_tokens"
+branch_labels = None
+depends_on = None
+
+ACTIVE_BOOKINGS = sa.text("status IN ('PENDING', 'CONFIRMED')")
+HOLIDAYS = sa.text("is_holiday = true")
+PEAK_SEASON = sa.text("is_peak_season = true")
+
+# (name, table, columns, partial index predicate)
+INDEXES = [
+    ("ix_users_role_status", "users", ["role", "status"], None),
+    ("ix_bookings_cottage_status_dates", "bookings", ["cottage_id", "status", "check_in", "check_out"], None),
+    ("ix_bookings_active_cottage_dates", "bookings", ["cottage_id", "check_in", "check_out"], ACTIVE_BOOKINGS),
+    ("ix_bookings_user_status", "bookings", ["user_id", "status"], None),
+    ("ix_maintenance_blocks_cottage_dates", "maintenance_blocks", ["cottage_id", "start_date", "end_date"], None),
+    ("ix_system_calendars_holidays", "system_calendars", ["date"], HOLIDAYS),
+    ("ix_system_calendars_peak_season", "system_calendars", ["date"], PEAK_SEASON),
+    ("ix_quota_transactions_user_created", "quota_transactions", ["user_id", "created_at"], None),
+    ("ix_quota_transactions_type_created", "quota_transactions", ["transaction_type", "created_at"], None),
+]
+
+def upgrade():
+    # CONCURRENTLY cannot run inside the migration transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name, table, columns, if_not_exists=True,
+                postgresql_concurrently=True, postgresql_where=where, sqlite_where=where
+            )
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
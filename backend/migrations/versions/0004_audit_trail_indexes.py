@@ -0,0 +1,39 @@
+"""Keyset indexes for the paginated audit trail
+
+Built with CREATE INDEX CONCURRENTLY on PostgreSQL so writes are not blocked.
+If a concurrent build fails it leaves an INVALID index behind; drop it and
+re-run the upgrade.
+
+Revision ID: 0004_audit_trail_indexes
+Revises: 0003_performance_indexes
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004_audit_trail_indexes"
+down_revision = "0003_performance_indexes"
+branch_labels = None
+depends_on = None
+
+DECIDED_BOOKINGS = sa.text("status IN ('CONFIRMED', 'REJECTED', 'CANCELLED')")
+
+# (name, table, columns, partial index predicate)
+INDEXES = [
+    ("ix_quota_transactions_created_id", "quota_transactions", ["created_at", "id"], None),
+    ("ix_bookings_decided_timestamp", "bookings", [sa.text("coalesce(updated_at, created_at)"), "id"], DECIDED_BOOKINGS),
+]
+
+def upgrade():
+    # CONCURRENTLY cannot run inside the migration transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name, table, columns, if_not_exists=True,
+                postgresql_concurrently=True, postgresql_where=where, sqlite_where=where
+            )
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
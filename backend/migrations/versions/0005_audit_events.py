@@ -0,0 +1,58 @@
+"""Append-only audit_events table
+
+Triggers reject UPDATE and DELETE so the log can only grow; retention is done
+by truncating or (on PostgreSQL, after converting the table to one partitioned
+by occurred_at) detaching old partitions.
+
+Revision ID: 0005_audit_events
+Revises: 0004_audit_trail_indexes
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005_audit_events"
+down_revision = "0004_audit_trail_indexes"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "audit_events",
+        sa.Column("id", sa.BigInteger().with_variant(sa.Integer(), "sqlite"), primary_key=True),
+        sa.Column("occurred_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("actor_id", sa.Integer(), nullable=True),
+        sa.Column("actor_email", sa.String(), nullable=True),
+        sa.Column("action", sa.String(), nullable=False),
+        sa.Column("subject_type", sa.String(), nullable=False),
+        sa.Column("subject_id", sa.String(), nullable=True),
+        sa.Column("details", sa.JSON(), nullable=True),
+    )
+    op.create_index("ix_audit_events_occurred_at", "audit_events", ["occurred_at", "id"])
+    op.create_index("ix_audit_events_subject", "audit_events", ["subject_type", "subject_id", "occurred_at"])
+    
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("""
+            CREATE FUNCTION audit_events_append_only() RETURNS trigger AS $$
+            BEGIN
+                RAISE EXCEPTION 'audit_events is append-only';
+            END;
+            $$ LANGUAGE plpgsql
+        """)
+        op.execute("""
+            CREATE TRIGGER audit_events_append_only BEFORE UPDATE OR DELETE ON audit_events
+            FOR EACH ROW EXECUTE FUNCTION audit_events_append_only()
+        """)
+    else:
+        for operation in ("UPDATE", "DELETE"):
+            op.execute(f"""
+                CREATE TRIGGER audit_events_no_{operation.lower()} BEFORE {operation} ON audit_events
+                BEGIN
+                    SELECT RAISE(ABORT, 'audit_events is append-only');
+                END
+            """)
+
+def downgrade():
+    op.drop_table("audit_events")
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP FUNCTION IF EXISTS audit_events_append_only()")
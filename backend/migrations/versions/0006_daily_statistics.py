@@ -0,0 +1,45 @@
+"""Daily statistics rollups for the reports endpoint
+
+Creates daily_statistics and fills it from the existing users and bookings;
+after this the rows are maintained by rollups.py.
+
+Revision ID: 0006_daily_statistics
+Revises: 0005_audit_events
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006_daily_statistics"
+down_revision = "0005_audit_events"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "daily_statistics",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("entity", sa.String(), primary_key=True),
+        sa.Column("role", sa.String(), primary_key=True),
+        sa.Column("status", sa.String(), primary_key=True),
+        sa.Column("count", sa.Integer(), nullable=False),
+    )
+    
+    # Same grouping as rollups.rebuild_sql(): UTC creation day, role and status names
+    if op.get_bind().dialect.name == "postgresql":
+        day = "date(timezone('UTC', created_at))"
+    else:
+        day = "date(created_at)"
+    op.execute(f"""
+        INSERT INTO daily_statistics (day, entity, role, status, count)
+        SELECT {day}, 'user', coalesce(CAST(role AS VARCHAR), 'OWNER'), CAST(status AS VARCHAR), count(*)
+        FROM users GROUP BY {day}, role, status
+    """)
+    op.execute(f"""
+        INSERT INTO daily_statistics (day, entity, role, status, count)
+        SELECT {day}, 'booking', '', CAST(status AS VARCHAR), count(*)
+        FROM bookings GROUP BY {day}, status
+    """)
+
+def downgrade():
+    op.drop_table("daily_statistics")
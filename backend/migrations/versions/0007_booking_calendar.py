@@ -0,0 +1,59 @@
+"""Materialized booking_calendar projection for the admin calendar
+
+Creates booking_calendar and fills it from the active bookings; after this the
+rows are maintained by calendar_projection.py.
+
+Revision ID: 0007_booking_calendar
+Revises: 0006_daily_statistics
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0007_booking_calendar"
+down_revision = "0006_daily_statistics"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # The bookingstatus type already exists on PostgreSQL (0001)
+    booking_status = sa.Enum("PENDING", "CONFIRMED", "REJECTED", "CANCELLED", name="bookingstatus").with_variant(
+        postgresql.ENUM("PENDING", "CONFIRMED", "REJECTED", "CANCELLED", name="bookingstatus", create_type=False),
+        "postgresql"
+    )
+    op.create_table(
+        "booking_calendar",
+        sa.Column("booking_id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column("cottage_id", sa.Integer(), nullable=True),
+        sa.Column("property_id", sa.Integer(), nullable=True),
+        sa.Column("check_in", sa.Date(), nullable=False),
+        sa.Column("check_out", sa.Date(), nullable=False),
+        sa.Column("status", booking_status, nullable=False),
+        sa.Column("user_name", sa.String(), nullable=True),
+        sa.Column("cottage_name", sa.String(), nullable=True),
+        sa.Column("property_name", sa.String(), nullable=True),
+    )
+    op.create_index("ix_booking_calendar_dates", "booking_calendar", ["check_out", "check_in"])
+    op.create_index("ix_booking_calendar_property_dates", "booking_calendar", ["property_id", "check_out", "check_in"])
+    op.create_index("ix_booking_calendar_user", "booking_calendar", ["user_id"])
+    op.create_index("ix_booking_calendar_cottage", "booking_calendar", ["cottage_id"])
+    
+    # Same rows as calendar_projection.projection_select()
+    op.execute("""
+        INSERT INTO booking_calendar (
+            booking_id, user_id, cottage_id, property_id, check_in, check_out, status,
+            user_name, cottage_name, property_name
+        )
+        SELECT b.id, b.user_id, b.cottage_id, c.property_id, b.check_in, b.check_out, b.status,
+               u.name, c.cottage_id, p.name
+        FROM bookings b
+        LEFT JOIN users u ON u.id = b.user_id
+        LEFT JOIN cottages c ON c.id = b.cottage_id
+        LEFT JOIN properties p ON p.id = c.property_id
+        WHERE b.status IN ('PENDING', 'CONFIRMED')
+    """)
+
+def downgrade():
+    op.drop_table("booking_calendar")
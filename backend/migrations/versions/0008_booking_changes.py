@@ -0,0 +1,37 @@
+"""Booking change log and sequence counter for the delta-sync feeds
+
+Revision ID: 0008_booking_changes
+Revises: 0007_booking_calendar
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008_booking_changes"
+down_revision = "0007_booking_calendar"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "booking_changes",
+        sa.Column("seq", sa.BigInteger(), primary_key=True, autoincrement=False),
+        sa.Column("booking_id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column("changed_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index("ix_booking_changes_user_seq", "booking_changes", ["user_id", "seq"])
+    op.create_index("ix_booking_changes_changed_at", "booking_changes", ["changed_at"])
+    
+    sync_sequences = op.create_table(
+        "sync_sequences",
+        sa.Column("name", sa.String(), primary_key=True),
+        sa.Column("value", sa.BigInteger(), nullable=False),
+        sa.Column("purged_through", sa.BigInteger(), nullable=False),
+    )
+    # Existing bookings are not logged; clients start from a full load
+    op.bulk_insert(sync_sequences, [{"name": "booking_changes", "value": 0, "purged_through": 0}])
+
+def downgrade():
+    op.drop_table("sync_sequences")
+    op.drop_table("booking_changes")
@@ -0,0 +1,50 @@
+"""Shard the daily statistics rollups so concurrent writers don't queue on one row
+
+daily_statistics is derived data, so it is recreated with the shard column in
+its key and refilled from users and bookings (into shard 0).
+
+Revision ID: 0009_daily_statistics_shards
+Revises: 0008_booking_changes
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009_daily_statistics_shards"
+down_revision = "0008_booking_changes"
+branch_labels = None
+depends_on = None
+
+def _recreate(sharded: bool):
+    op.drop_table("daily_statistics")
+    op.create_table(
+        "daily_statistics",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("entity", sa.String(), primary_key=True),
+        sa.Column("role", sa.String(), primary_key=True),
+        sa.Column("status", sa.String(), primary_key=True),
+        *([sa.Column("shard", sa.SmallInteger(), primary_key=True, server_default="0")] if sharded else []),
+        sa.Column("count", sa.Integer(), nullable=False),
+    )
+    
+    # Same grouping as rollups.rebuild_sql(): UTC creation day, role and status names
+    if op.get_bind().dialect.name == "postgresql":
+        day = "date(timezone('UTC', created_at))"
+    else:
+        day = "date(created_at)"
+    op.execute(f"""
+        INSERT INTO daily_statistics (day, entity, role, status, count)
+        SELECT {day}, 'user', coalesce(CAST(role AS VARCHAR), 'OWNER'), CAST(status AS VARCHAR), count(*)
+        FROM users GROUP BY {day}, role, status
+    """)
+    op.execute(f"""
+        INSERT INTO daily_statistics (day, entity, role, status, count)
+        SELECT {day}, 'booking', '', CAST(status AS VARCHAR), count(*)
+        FROM bookings GROUP BY {day}, status
+    """)
+
+def upgrade():
+    _recreate(sharded=True)
+
+def downgrade():
+    _recreate(sharded=False)
@@ -0,0 +1,34 @@
+"""Number booking changes from a Postgres sequence instead of the sync_sequences row
+
+Continues from the counter's current value. SQLite keeps using the counter row.
+
+Revision ID: 0010_booking_change_sequence
+Revises: 0009_daily_statistics_shards
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0010_booking_change_sequence"
+down_revision = "0009_daily_statistics_shards"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute(sa.schema.CreateSequence(sa.Sequence("booking_change_seq")))
+    op.execute("""
+        SELECT setval('booking_change_seq', value + 1, false)
+        FROM sync_sequences WHERE name = 'booking_changes'
+    """)
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("""
+        UPDATE sync_sequences
+        SET value = greatest(value, (SELECT coalesce(max(seq), 0) FROM booking_changes))
+        WHERE name = 'booking_changes'
+    """)
+    op.execute(sa.schema.DropSequence(sa.Sequence("booking_change_seq")))
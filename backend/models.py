@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Date, Enum as SQLEnum, Numeric, Text
+from sqlalchemy import Column, Integer, BigInteger, SmallInteger, String, Boolean, DateTime, ForeignKey, Date, Enum as SQLEnum, Numeric, Text, Float, Index, JSON
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -35,15 +35,19 @@ class User(Base):
     weekday_balance = Column(Integer, default=0)
     weekend_balance = Column(Integer, default=0)
     email_verified = Column(Boolean, default=False)
-    verification_token = Column(String, nullable=True)  # For email verification
+    verification_token = Column(String, nullable=True, index=True)  # SHA-256 digest of the email verification token
     verification_token_expires = Column(DateTime(timezone=True), nullable=True)  # Verification token expiration
-    reset_token = Column(String, nullable=True)  # For password reset
+    reset_token = Column(String, nullable=True, index=True)  # SHA-256 digest of the password reset token
     reset_token_expires = Column(DateTime(timezone=True), nullable=True)  # Token expiration
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     property = relationship("Property", back_populates="owners")
     bookings = relationship("Booking", back_populates="user")
+    
+    __table_args__ = (
+        Index("ix_users_role_status", "role", "status"),
+    )
 
 class Property(Base):
     __tablename__ = "properties"
@@ -81,6 +85,10 @@ class MaintenanceBlock(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     cottage = relationship("Cottage", back_populates="maintenance_blocks")
+    
+    __table_args__ = (
+        Index("ix_maintenance_blocks_cottage_dates", "cottage_id", "start_date", "end_date"),
+    )
 
 class Booking(Base):
     __tablename__ = "bookings"
@@ -99,6 +107,25 @@ class Booking(Base):
     
     user = relationship("User", back_populates="bookings")
     cottage = relationship("Cottage", back_populates="bookings")
+    
+    __table_args__ = (
+        # Overlap checks: cottage + status + date range
+        Index("ix_bookings_cottage_status_dates", "cottage_id", "status", "check_in", "check_out"),
+        # Availability only ever looks at pending/confirmed bookings, a small slice of history
+        Index(
+            "ix_bookings_active_cottage_dates", "cottage_id", "check_in", "check_out",
+            postgresql_where=status.in_([BookingStatus.PENDING, BookingStatus.CONFIRMED]),
+            sqlite_where=status.in_([BookingStatus.PENDING, BookingStatus.CONFIRMED])
+        ),
+        # Escrow and quota-status sums per owner
+        Index("ix_bookings_user_status", "user_id", "status"),
+        # Audit trail pages: decided bookings newest first
+        Index(
+            "ix_bookings_decided_timestamp", func.coalesce(updated_at, created_at), id,
+            postgresql_where=status.in_([BookingStatus.CONFIRMED, BookingStatus.REJECTED, BookingStatus.CANCELLED]),
+            sqlite_where=status.in_([BookingStatus.CONFIRMED, BookingStatus.REJECTED, BookingStatus.CANCELLED])
+        ),
+    )
 
 class SystemCalendar(Base):
     __tablename__ = "system_calendars"
@@ -109,6 +136,11 @@ class SystemCalendar(Base):
     is_peak_season = Column(Boolean, default=False)
     holiday_name = Column(String, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        Index("ix_system_calendars_holidays", "date", postgresql_where=is_holiday == True, sqlite_where=is_holiday == True),
+        Index("ix_system_calendars_peak_season", "date", postgresql_where=is_peak_season == True, sqlite_where=is_peak_season == True),
+    )
 
 class PeakSeason(Base):
     __tablename__ = "peak_seasons"
@@ -132,6 +164,13 @@ class QuotaTransaction(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     user = relationship("User")
+    
+    __table_args__ = (
+        Index("ix_quota_transactions_user_created", "user_id", "created_at"),
+        Index("ix_quota_transactions_type_created", "transaction_type", "created_at"),
+        # Audit trail pages: newest first, id breaks timestamp ties
+        Index("ix_quota_transactions_created_id", "created_at", "id"),
+    )
 
 class EmailConfig(Base):
     __tablename__ = "email_config"
@@ -157,3 +196,96 @@ class EmailTemplate(Base):
     text_body = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+class RateLimitBucket(Base):
+    __tablename__ = "rate_limit_buckets"
+    
+    key = Column(String, primary_key=True)  # e.g. "login:email:someone@example.com"
+    tokens = Column(Float, nullable=False)
+    updated_at = Column(Float, nullable=False)  # Unix timestamp of the last refill
+
+class TokenRevocation(Base):
+    __tablename__ = "token_revocations"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    jti = Column(String, unique=True, nullable=True)  # Set for a single revoked refresh token
+    user_id = Column(Integer, nullable=True, index=True)  # Set alone to revoke all of a user's tokens
+    revoked_at = Column(Float, nullable=False)  # Unix timestamp; tokens issued before it are revoked
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)  # Row can be purged after this
+
+class AuditEvent(Base):
+    """Append-only record of a state change, written in the same transaction (see audit.py)"""
+    __tablename__ = "audit_events"
+    
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    occurred_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    # No foreign keys: events outlive the users and records they mention
+    actor_id = Column(Integer, nullable=True)  # None for changes no user made (scheduled jobs)
+    actor_email = Column(String, nullable=True)
+    action = Column(String, nullable=False)  # e.g. "booking.approved", "member.activated"
+    subject_type = Column(String, nullable=False)  # e.g. "booking", "user", "holiday"
+    subject_id = Column(String, nullable=True)  # a date for holidays, a template type for email templates
+    details = Column(JSON, nullable=True)
+    
+    __table_args__ = (
+        Index("ix_audit_events_occurred_at", "occurred_at", "id"),
+        Index("ix_audit_events_subject", "subject_type", "subject_id", "occurred_at"),
+    )
+
+class DailyStatistic(Base):
+    """Users and bookings created per day, by current status (and role, for users); see rollups.py"""
+    __tablename__ = "daily_statistics"
+    
+    day = Column(Date, primary_key=True)  # UTC date of created_at
+    entity = Column(String, primary_key=True)  # "user" or "booking"
+    role = Column(String, primary_key=True, default="")  # UserRole name for users, "" for bookings
+    status = Column(String, primary_key=True)  # UserStatus / BookingStatus name
+    shard = Column(SmallInteger, primary_key=True, default=0, server_default="0")  # spreads concurrent writers; readers sum over shards
+    count = Column(Integer, nullable=False, default=0)
+
+class BookingCalendarEntry(Base):
+    """Active booking with its display names, for the admin calendar; see calendar_projection.py"""
+    __tablename__ = "booking_calendar"
+    
+    # No foreign keys: rows are replaced or removed by the projection hooks, never by cascades
+    booking_id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=True)
+    cottage_id = Column(Integer, nullable=True)
+    property_id = Column(Integer, nullable=True)
+    check_in = Column(Date, nullable=False)
+    check_out = Column(Date, nullable=False)
+    status = Column(SQLEnum(BookingStatus), nullable=False)  # pending or confirmed only
+    user_name = Column(String, nullable=True)
+    cottage_name = Column(String, nullable=True)
+    property_name = Column(String, nullable=True)
+    
+    __table_args__ = (
+        # Date-range views: stays ending on or after the first day, starting on or before the last
+        Index("ix_booking_calendar_dates", "check_out", "check_in"),
+        Index("ix_booking_calendar_property_dates", "property_id", "check_out", "check_in"),
+        # Refreshes after a member, cottage or property is renamed
+        Index("ix_booking_calendar_user", "user_id"),
+        Index("ix_booking_calendar_cottage", "cottage_id"),
+    )
+
+class BookingChange(Base):
+    """One row per booking write, numbered at commit, for the delta-sync feeds; see change_feed.py"""
+    __tablename__ = "booking_changes"
+    
+    seq = Column(BigInteger, primary_key=True, autoincrement=False)  # assigned at commit (booking_change_seq; sync_sequences on SQLite)
+    booking_id = Column(Integer, nullable=False)  # no foreign key: deleted bookings keep their tombstones
+    user_id = Column(Integer, nullable=True)
+    changed_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())  # when seq was assigned, on Postgres
+    
+    __table_args__ = (
+        Index("ix_booking_changes_user_seq", "user_id", "seq"),
+        Index("ix_booking_changes_changed_at", "changed_at"),
+    )
+
+class SyncSequence(Base):
+    """Named change counter (used on SQLite; Postgres numbers changes from a sequence) and its purge watermark"""
+    __tablename__ = "sync_sequences"
+    
+    name = Column(String, primary_key=True)  # e.g. "booking_changes"
+    value = Column(BigInteger, nullable=False, default=0)  # last sequence number handed out (SQLite)
+    purged_through = Column(BigInteger, nullable=False, default=0)  # changes up to here have been purged
@@ -0,0 +1,264 @@
+"""
+Occupancy and utilization analytics for the admin reports
+
+Every figure comes from one bulk fetch of the confirmed bookings, maintenance
+blocks and holiday/peak calendar rows overlapping the requested range. Each
+cottage's nights are laid out as bits of a Python int (bit i = envelope day i):
+a stay sets one run of bits, so booked, blocked and weekend nights for any
+month are popcounts of ANDed masks rather than a loop over days and bookings.
+
+Nights are weekend nights when they fall on a Saturday/Sunday, a holiday or a
+peak-season day, the same rule the booking credits use. Lead time is the gap
+between a booking's creation and its check-in, counted in the month of check-in.
+
+Closed months (ended before today) are cached per worker process for every
+cottage at once, since their bookings no longer change; ranges are split into
+months so only the open or partial ones are recomputed.
+"""
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+import os
+import threading
+from dotenv import load_dotenv
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+from models import Booking, BookingStatus, Cottage, MaintenanceBlock, Property, SystemCalendar
+
+load_dotenv()
+
+OCCUPANCY_CACHE_MONTHS = int(os.getenv("OCCUPANCY_CACHE_MONTHS", "120"))
+
+# Upper bounds (inclusive) of the lead-time buckets in days; the last bucket is open-ended
+LEAD_TIME_BUCKETS = [(0, 7), (8, 30), (31, 90), (91, 180), (181, None)]
+
+# Per-cottage counters: nights, maintenance nights, weekday available/booked,
+# weekend available/booked, bookings checked in, their total lead days, then one per bucket
+NIGHTS, MAINTENANCE, WEEKDAY_AVAILABLE, WEEKDAY_BOOKED, WEEKEND_AVAILABLE, WEEKEND_BOOKED, ARRIVALS, LEAD_DAYS = range(8)
+COUNTERS = 8 + len(LEAD_TIME_BUCKETS)
+
+class MonthCache:
+    """Size-bounded LRU of month start -> {cottage id: counters} for closed months"""
+    
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, month: date):
+        with self._lock:
+            entry = self._entries.get(month)
+            if entry is not None:
+                self._entries.move_to_end(month)
+            return entry
+    
+    def set(self, month: date, counters: dict):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[month] = counters
+            self._entries.move_to_end(month)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+month_cache = MonthCache(OCCUPANCY_CACHE_MONTHS)
+
+def _segments(start: date, end: date) -> list:
+    """Split [start, end] into (first day, last day, whole month) pieces at month boundaries"""
+    segments = []
+    current = start
+    while current <= end:
+        next_month = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
+        last = min(end, next_month - timedelta(days=1))
+        segments.append((current, last, current.day == 1 and last == next_month - timedelta(days=1)))
+        current = next_month
+    return segments
+
+def _run(first: int, last: int) -> int:
+    """Mask with bits first..last-1 set"""
+    return ((1 << (last - first)) - 1) << first if last > first else 0
+
+def _lead_bucket(days: int) -> int:
+    for index, (_, upper) in enumerate(LEAD_TIME_BUCKETS):
+        if upper is None or days <= upper:
+            return index
+
+def _created_day(created_at: datetime) -> date:
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc)
+    return created_at.date()
+
+def _compute(db: Session, cottage_ids: list, segments: list) -> list:
+    """Counters per segment ({cottage id: list}) from one fetch over the segments' envelope"""
+    envelope_start, envelope_end = segments[0][0], segments[-1][1]
+    days = (envelope_end - envelope_start).days + 1
+    
+    def offset(day: date) -> int:
+        return min(max((day - envelope_start).days, 0), days)
+    
+    booked = dict.fromkeys(cottage_ids, 0)
+    blocked = dict.fromkeys(cottage_ids, 0)
+    arrivals = []
+    for cottage_id, check_in, check_out, created_at in db.execute(
+        select(Booking.cottage_id, Booking.check_in, Booking.check_out, Booking.created_at).where(
+            Booking.cottage_id.in_(cottage_ids),
+            Booking.status == BookingStatus.CONFIRMED,
+            Booking.check_in <= envelope_end,
+            Booking.check_out > envelope_start
+        )
+    ):
+        booked[cottage_id] |= _run(offset(check_in), offset(check_out))
+        if check_in >= envelope_start and created_at is not None:
+            arrivals.append((cottage_id, offset(check_in), max((check_in - _created_day(created_at)).days, 0)))
+    
+    for cottage_id, block_start, block_end in db.execute(
+        select(MaintenanceBlock.cottage_id, MaintenanceBlock.start_date, MaintenanceBlock.end_date).where(
+            MaintenanceBlock.cottage_id.in_(cottage_ids),
+            MaintenanceBlock.start_date <= envelope_end,
+            MaintenanceBlock.end_date >= envelope_start
+        )
+    ):
+        blocked[cottage_id] |= _run(offset(block_start), offset(block_end + timedelta(days=1)))
+    
+    # Saturdays and Sundays, then every holiday or peak-season day on top
+    weekend = 0
+    first_saturday = (5 - envelope_start.weekday()) % 7
+    for index in range(first_saturday, days, 7):
+        weekend |= _run(index, min(index + 2, days))
+    if first_saturday == 6:
+        weekend |= 1  # the envelope starts on a Sunday
+    for (day,) in db.execute(
+        select(SystemCalendar.date).where(
+            SystemCalendar.date >= envelope_start,
+            SystemCalendar.date <= envelope_end,
+            or_(SystemCalendar.is_holiday == True, SystemCalendar.is_peak_season == True)
+        )
+    ):
+        weekend |= 1 << offset(day)
+    
+    results = []
+    for first, last, _ in segments:
+        span = _run(offset(first), offset(last) + 1)
+        weekend_span = span & weekend
+        weekday_span = span & ~weekend
+        counters = {}
+        for cottage_id in cottage_ids:
+            open_nights = ~blocked[cottage_id]
+            stays = booked[cottage_id] & open_nights
+            values = [0] * COUNTERS
+            values[NIGHTS] = (last - first).days + 1
+            values[MAINTENANCE] = (blocked[cottage_id] & span).bit_count()
+            values[WEEKDAY_AVAILABLE] = (weekday_span & open_nights).bit_count()
+            values[WEEKDAY_BOOKED] = (stays & weekday_span).bit_count()
+            values[WEEKEND_AVAILABLE] = (weekend_span & open_nights).bit_count()
+            values[WEEKEND_BOOKED] = (stays & weekend_span).bit_count()
+            counters[cottage_id] = values
+        first_index, last_index = offset(first), offset(last)
+        for cottage_id, index, lead_days in arrivals:
+            if first_index <= index <= last_index:
+                values = counters[cottage_id]
+                values[ARRIVALS] += 1
+                values[LEAD_DAYS] += lead_days
+                values[8 + _lead_bucket(lead_days)] += 1
+        results.append(counters)
+    return results
+
+def _rate(part: int, whole: int) -> float:
+    return round(part / whole, 4) if whole else 0.0
+
+def _summary(values: list) -> dict:
+    available = values[WEEKDAY_AVAILABLE] + values[WEEKEND_AVAILABLE]
+    booked = values[WEEKDAY_BOOKED] + values[WEEKEND_BOOKED]
+    return {
+        "nights": values[NIGHTS],
+        "maintenance_nights": values[MAINTENANCE],
+        "available_nights": available,
+        "booked_nights": booked,
+        "occupancy_rate": _rate(booked, available),
+        "weekday": {
+            "available_nights": values[WEEKDAY_AVAILABLE],
+            "booked_nights": values[WEEKDAY_BOOKED],
+            "utilization": _rate(values[WEEKDAY_BOOKED], values[WEEKDAY_AVAILABLE])
+        },
+        "weekend": {
+            "available_nights": values[WEEKEND_AVAILABLE],
+            "booked_nights": values[WEEKEND_BOOKED],
+            "utilization": _rate(values[WEEKEND_BOOKED], values[WEEKEND_AVAILABLE])
+        },
+        "lead_time": {
+            "bookings": values[ARRIVALS],
+            "average_days": round(values[LEAD_DAYS] / values[ARRIVALS], 1) if values[ARRIVALS] else None,
+            "distribution": [
+                {"bucket": f"{lower}+" if upper is None else f"{lower}-{upper}", "count": values[8 + index]}
+                for index, (lower, upper) in enumerate(LEAD_TIME_BUCKETS)
+            ]
+        }
+    }
+
+def _add(total: list, values: list):
+    for index, value in enumerate(values):
+        total[index] += value
+
+def occupancy_report(db: Session, start_date: date, end_date: date, property_id: int = None) -> dict:
+    """Per-cottage and per-property occupancy, weekday/weekend utilization and lead times for [start_date, end_date]"""
+    cottages = db.execute(
+        select(Cottage.id, Cottage.cottage_id, Cottage.property_id, Property.name)
+        .join(Property, Property.id == Cottage.property_id)
+        .order_by(Cottage.property_id, Cottage.id)
+    ).all()
+    all_ids = [cottage.id for cottage in cottages]
+    if property_id:
+        cottages = [cottage for cottage in cottages if cottage.property_id == property_id]
+    
+    # Closed whole months come from the cache (computed for every cottage); the rest is fetched in one pass
+    today = date.today()
+    segments = _segments(start_date, end_date)
+    counters, missing = [None] * len(segments), []
+    for position, segment in enumerate(segments):
+        cached = month_cache.get(segment[0]) if segment[2] and segment[1] < today else None
+        if cached is not None and all(cottage_id in cached for cottage_id in all_ids):
+            counters[position] = cached
+        else:
+            missing.append(position)
+    if missing and all_ids:
+        computed = _compute(db, all_ids, [segments[position] for position in missing])
+        for position, result in zip(missing, computed):
+            counters[position] = result
+            first, last, whole_month = segments[position]
+            if whole_month and last < today:
+                month_cache.set(first, result)
+    
+    properties = {}
+    grand_total = [0] * COUNTERS
+    for cottage in cottages:
+        values = [0] * COUNTERS
+        for segment_counters in counters:
+            _add(values, segment_counters[cottage.id])
+        entry = properties.setdefault(cottage.property_id, {
+            "property_id": cottage.property_id,
+            "property_name": cottage.name,
+            "totals": [0] * COUNTERS,
+            "cottages": []
+        })
+        _add(entry["totals"], values)
+        _add(grand_total, values)
+        entry["cottages"].append({"cottage_id": cottage.id, "cottage_name": cottage.cottage_id, **_summary(values)})
+    
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "days": (end_date - start_date).days + 1,
+        "totals": {"cottages": len(cottages), **_summary(grand_total)},
+        "properties": [
+            {
+                "property_id": entry["property_id"],
+                "property_name": entry["property_name"],
+                **_summary(entry["totals"]),
+                "cottages": entry["cottages"]
+            }
+            for entry in properties.values()
+        ]
+    }
@@ -0,0 +1,128 @@
+"""
+Token-bucket rate limiting for the login endpoint
+
+Each attempt takes one token from a bucket keyed by email and one keyed by client
+IP; when either bucket is empty the attempt is rejected with 429 before any user
+lookup or bcrypt work. Buckets live in a pluggable backend:
+    memory   - per-process dict (default, single worker)
+    database - rate_limit_buckets table shared by all workers
+"""
+import os
+import threading
+import time
+from typing import Optional, Tuple
+from fastapi import HTTPException, Request, status
+from sqlalchemy.exc import IntegrityError
+from database import SessionLocal
+from models import RateLimitBucket
+from dotenv import load_dotenv
+
+load_dotenv()
+
+LOGIN_RATE_LIMIT_BACKEND = os.getenv("LOGIN_RATE_LIMIT_BACKEND", "memory")
+LOGIN_RATE_LIMIT_EMAIL_BURST = int(os.getenv("LOGIN_RATE_LIMIT_EMAIL_BURST", "5"))
+LOGIN_RATE_LIMIT_EMAIL_PER_MINUTE = float(os.getenv("LOGIN_RATE_LIMIT_EMAIL_PER_MINUTE", "1"))
+LOGIN_RATE_LIMIT_IP_BURST = int(os.getenv("LOGIN_RATE_LIMIT_IP_BURST", "20"))
+LOGIN_RATE_LIMIT_IP_PER_MINUTE = float(os.getenv("LOGIN_RATE_LIMIT_IP_PER_MINUTE", "10"))
+
+def _refill(tokens: float, updated_at: float, now: float, capacity: int, rate: float) -> float:
+    return min(capacity, tokens + max(0.0, now - updated_at) * rate)
+
+def _take(tokens: float, rate: float) -> Tuple[bool, float, float]:
+    """Returns (allowed, remaining tokens, seconds until a token is available)"""
+    if tokens >= 1:
+        return True, tokens - 1, 0.0
+    return False, tokens, (1 - tokens) / rate if rate > 0 else float("inf")
+
+class MemoryBackend:
+    """Buckets in a dict guarded by a lock; only limits attempts seen by this process"""
+    
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+    
+    def take(self, key: str, capacity: int, rate: float) -> Tuple[bool, float]:
+        now = time.time()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (capacity, now))
+            tokens = _refill(tokens, updated_at, now, capacity, rate)
+            allowed, tokens, retry_after = _take(tokens, rate)
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now, capacity, rate)
+            return allowed, retry_after
+    
+    def _prune(self, now: float, capacity: int, rate: float):
+        # Buckets that have fully refilled carry no state worth keeping
+        full_after = capacity / rate if rate > 0 else float("inf")
+        for key, (_, updated_at) in list(self._buckets.items()):
+            if now - updated_at >= full_after:
+                del self._buckets[key]
+    
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+class DatabaseBackend:
+    """Buckets in the rate_limit_buckets table, row-locked per key, shared across workers"""
+    
+    def take(self, key: str, capacity: int, rate: float) -> Tuple[bool, float]:
+        for _ in range(2):
+            db = SessionLocal()
+            try:
+                now = time.time()
+                bucket = db.query(RateLimitBucket).filter(RateLimitBucket.key == key).with_for_update().first()
+                if bucket is None:
+                    bucket = RateLimitBucket(key=key, tokens=capacity, updated_at=now)
+                    db.add(bucket)
+                tokens = _refill(bucket.tokens, bucket.updated_at, now, capacity, rate)
+                allowed, bucket.tokens, retry_after = _take(tokens, rate)
+                bucket.updated_at = now
+                db.commit()
+                return allowed, retry_after
+            except IntegrityError:
+                # Another worker created the bucket first; retry against its row
+                db.rollback()
+            finally:
+                db.close()
+        return True, 0.0
+    
+    def reset(self):
+        db = SessionLocal()
+        try:
+            db.query(RateLimitBucket).delete()
+            db.commit()
+        finally:
+            db.close()
+
+def create_backend(name: str):
+    if name == "memory":
+        return MemoryBackend()
+    if name == "database":
+        return DatabaseBackend()
+    raise ValueError(f"Unknown rate limit backend: {name}")
+
+login_limiter_backend = create_backend(LOGIN_RATE_LIMIT_BACKEND)
+
+def client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+def check_login_rate_limit(request: Request, email: Optional[str]):
+    """Raise 429 if this email or client IP has run out of login attempts"""
+    checks = [(f"login:ip:{client_ip(request)}", LOGIN_RATE_LIMIT_IP_BURST, LOGIN_RATE_LIMIT_IP_PER_MINUTE)]
+    if email:
+        checks.append((f"login:email:{email.lower()}", LOGIN_RATE_LIMIT_EMAIL_BURST, LOGIN_RATE_LIMIT_EMAIL_PER_MINUTE))
+    
+    retry_after = 0.0
+    for key, capacity, per_minute in checks:
+        allowed, wait = login_limiter_backend.take(key, capacity, per_minute / 60)
+        if not allowed:
+            retry_after = max(retry_after, wait)
+    
+    if retry_after > 0:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts. Please try again later.",
+            headers={"Retry-After": str(int(retry_after) + 1)},
+        )
@@ -0,0 +1,79 @@
+"""
+Read-replica routing
+
+Read-only handlers depend on get_read_db / get_async_read_db instead of get_db.
+Those sessions go to DATABASE_REPLICA_URL unless the caller wrote something in
+the last REPLICA_PIN_SECONDS, in which case they stay on the primary so the
+caller sees their own write despite replication lag. Pins are kept per worker,
+keyed by token subject, and set by the middleware in main.py after any
+successful POST/PUT/PATCH/DELETE.
+"""
+import os
+import threading
+import time
+from typing import Optional
+from fastapi import Request
+from jose import JWTError, jwt
+from auth import SECRET_KEY, ALGORITHM
+from database import SessionLocal, AsyncSessionLocal, ReplicaSessionLocal, AsyncReplicaSessionLocal
+from dotenv import load_dotenv
+
+load_dotenv()
+
+REPLICA_PIN_SECONDS = float(os.getenv("REPLICA_PIN_SECONDS", "5"))
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+class WritePins:
+    """Token subject -> time until which its reads must use the primary"""
+    
+    def __init__(self, max_size: int = 100000):
+        self.max_size = max_size
+        self._pins = {}
+        self._lock = threading.Lock()
+    
+    def pin(self, subject: str, seconds: float):
+        now = time.monotonic()
+        with self._lock:
+            self._pins[subject] = now + seconds
+            if len(self._pins) > self.max_size:
+                self._pins = {key: until for key, until in self._pins.items() if until > now}
+    
+    def is_pinned(self, subject: Optional[str]) -> bool:
+        if subject is None:
+            return False
+        until = self._pins.get(subject)
+        return until is not None and until > time.monotonic()
+
+write_pins = WritePins()
+
+def request_subject(request: Request) -> Optional[str]:
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+    except JWTError:
+        return None
+
+def record_write(request: Request, status_code: int):
+    if request.method in WRITE_METHODS and status_code < 400 and REPLICA_PIN_SECONDS > 0:
+        subject = request_subject(request)
+        if subject:
+            write_pins.pin(subject, REPLICA_PIN_SECONDS)
+
+def read_session_factory(request: Request):
+    """Session factory a read-only handler should use for this caller"""
+    return SessionLocal if write_pins.is_pinned(request_subject(request)) else ReplicaSessionLocal
+
+def get_read_db(request: Request):
+    db = read_session_factory(request)()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_read_db(request: Request):
+    factory = AsyncSessionLocal if write_pins.is_pinned(request_subject(request)) else AsyncReplicaSessionLocal
+    async with factory() as db:
+        yield db
@@ -0,0 +1,169 @@
+"""
+Daily statistics rollups for the admin reports
+
+daily_statistics holds, per UTC creation day, how many users (by role and
+status) and bookings (by status) exist, so the reports endpoint sums a few
+hundred rollup rows instead of scanning users and bookings. The counts are
+kept current by session hooks: every flush that inserts, deletes or changes
+the status/role of a User or Booking upserts the matching +1/-1 deltas in the
+same transaction, and bulk query deletes subtract the rows they remove.
+Each upsert goes to one of STATISTICS_SHARDS randomly chosen rows per key, so
+concurrent bookings don't all wait on today's row until the first one commits;
+readers sum the shards.
+Writes that bypass the ORM (raw SQL, generate_dataset.py) are picked up by the
+scheduled full rebuild (STATISTICS_REBUILD_INTERVAL_MINUTES in tasks.py) or by
+running it by hand:
+    cd backend
+    python rollups.py
+"""
+import os
+import random
+from collections import Counter
+from datetime import datetime, timezone
+from sqlalchemy import String, cast, event, func, inspect, literal, literal_column, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import Booking, BookingStatus, DailyStatistic, User, UserRole, UserStatus
+from dotenv import load_dotenv
+
+load_dotenv()
+
+STATISTICS_SHARDS = max(1, int(os.getenv("STATISTICS_SHARDS", "8")))
+
+TRACKED = {User: "user", Booking: "booking"}
+
+def created_day(column, dialect_name: str):
+    """SQL expression for the UTC date of a timestamp column (matches the incremental hooks)"""
+    if dialect_name == "postgresql":
+        # Inline literal: a bound parameter would make the GROUP BY expression differ from the SELECT one
+        return func.date(func.timezone(literal_column("'UTC'"), column))
+    return func.date(column)
+
+def _name(value, enum_cls, default) -> str:
+    # Attributes may hold the enum, its value ("pending") or its stored name ("PENDING")
+    if value is None:
+        return default.name
+    if isinstance(value, enum_cls):
+        return value.name
+    try:
+        return enum_cls(value).name
+    except ValueError:
+        return enum_cls[value].name
+
+def _key(obj, day, status=None, role=None) -> tuple:
+    if isinstance(obj, User):
+        return (
+            day, "user",
+            _name(role if role is not None else obj.role, UserRole, UserRole.OWNER),
+            _name(status if status is not None else obj.status, UserStatus, UserStatus.PENDING)
+        )
+    return (day, "booking", "", _name(status if status is not None else obj.status, BookingStatus, BookingStatus.PENDING))
+
+def _day(obj):
+    created_at = obj.created_at
+    if created_at is None:
+        return datetime.now(timezone.utc).date()
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc)
+    return created_at.date()
+
+def _previous(obj, attribute: str):
+    history = inspect(obj).attrs[attribute].history
+    return history.deleted[0] if history.deleted else None
+
+def apply_deltas(connection, deltas: Counter):
+    """Upsert count changes keyed by (day, entity, role, status) into one shard"""
+    shard = random.randrange(STATISTICS_SHARDS)
+    # Sorted so transactions touching the same rows lock them in the same order
+    rows = [
+        {"day": day, "entity": entity, "role": role, "status": status, "shard": shard, "count": delta}
+        for (day, entity, role, status), delta in sorted(deltas.items()) if delta
+    ]
+    if not rows:
+        return
+    dialect = postgresql if connection.dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(DailyStatistic.__table__).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["day", "entity", "role", "status", "shard"],
+        set_={"count": DailyStatistic.__table__.c.count + stmt.excluded.count}
+    )
+    connection.execute(stmt)
+
+@event.listens_for(Session, "before_flush")
+def _track_flush(session, flush_context, instances):
+    deltas = Counter()
+    for obj in session.new:
+        if type(obj) in TRACKED:
+            deltas[_key(obj, _day(obj))] += 1
+    for obj in session.deleted:
+        if type(obj) in TRACKED:
+            deltas[_key(obj, _day(obj), _previous(obj, "status"), _previous(obj, "role") if isinstance(obj, User) else None)] -= 1
+    for obj in session.dirty:
+        if type(obj) not in TRACKED:
+            continue
+        previous_status = _previous(obj, "status")
+        previous_role = _previous(obj, "role") if isinstance(obj, User) else None
+        if previous_status is None and previous_role is None:
+            continue
+        day = _day(obj)
+        old, new = _key(obj, day, previous_status, previous_role), _key(obj, day)
+        if old != new:
+            deltas[old] -= 1
+            deltas[new] += 1
+    apply_deltas(session.connection(), deltas)
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_bulk_delete(orm_execute_state):
+    # Query(...).delete() skips the flush hooks; count what it is about to remove
+    if not orm_execute_state.is_delete or orm_execute_state.bind_mapper is None:
+        return
+    model = orm_execute_state.bind_mapper.class_
+    if model not in TRACKED:
+        return
+    connection = orm_execute_state.session.connection()
+    day = created_day(model.created_at, connection.dialect.name)
+    role = cast(model.role, String) if model is User else literal("")
+    grouping = [day, model.status] + ([model.role] if model is User else [])
+    query = select(day, role, cast(model.status, String), func.count()).group_by(*grouping)
+    if orm_execute_state.statement.whereclause is not None:
+        query = query.where(orm_execute_state.statement.whereclause)
+    deltas = Counter()
+    for row_day, row_role, row_status, count in connection.execute(query):
+        if isinstance(row_day, str):
+            row_day = datetime.strptime(row_day, "%Y-%m-%d").date()
+        deltas[(row_day, TRACKED[model], row_role or ("" if model is Booking else UserRole.OWNER.name), row_status)] -= count
+    apply_deltas(connection, deltas)
+
+def rebuild_sql(dialect_name: str) -> list:
+    """Statements that replace daily_statistics with counts recomputed from users and bookings"""
+    table = DailyStatistic.__table__
+    statements = [table.delete()]
+    for model in TRACKED:
+        day = created_day(model.created_at, dialect_name)
+        role = func.coalesce(cast(model.role, String), UserRole.OWNER.name) if model is User else literal("")
+        grouping = [day, model.status] + ([model.role] if model is User else [])
+        statements.append(table.insert().from_select(
+            ["day", "entity", "role", "status", "count"],
+            select(day, literal(TRACKED[model]), role, cast(model.status, String), func.count()).group_by(*grouping)
+        ))
+    return statements
+
+def rebuild_rollups() -> int:
+    """Recompute every rollup row in one transaction; returns the number of rows"""
+    db = SessionLocal()
+    try:
+        connection = db.connection()
+        if connection.dialect.name == "postgresql":
+            # Waits for in-flight writers and holds off new deltas until the rebuild commits
+            connection.exec_driver_sql("LOCK TABLE daily_statistics IN EXCLUSIVE MODE")
+        for statement in rebuild_sql(connection.dialect.name):
+            connection.execute(statement)
+        rows = connection.execute(select(func.count()).select_from(DailyStatistic)).scalar()
+        db.commit()
+        return rows
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    print(f"✓ Rebuilt daily statistics ({rebuild_rollups()} rollup rows)")
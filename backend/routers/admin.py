@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
+import base64
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import Date, String, and_, cast, func, literal, literal_column, null, or_, select, type_coerce, union_all
 from typing import List
 from datetime import date, datetime, timedelta
-from database import get_db
-from models import User, Property, Cottage, Booking, MaintenanceBlock, SystemCalendar, PeakSeason, QuotaTransaction, BookingStatus, UserStatus, UserRole, EmailConfig, EmailTemplate
+from database import get_db, AsyncSessionLocal, engine, async_engine, replica_engine, async_replica_engine, pool_status
+from replica import get_read_db, read_session_factory
+from exports import stream_export, EXPORT_FORMAT_PATTERN
+from models import User, Property, Cottage, Booking, MaintenanceBlock, SystemCalendar, PeakSeason, QuotaTransaction, AuditEvent, DailyStatistic, BookingCalendarEntry, BookingStatus, UserStatus, UserRole, EmailConfig, EmailTemplate
 from schemas import (
     UserResponse, PropertyCreate, PropertyResponse, CottageCreate, CottageResponse,
     MaintenanceBlockCreate, MaintenanceBlockResponse, BookingResponse, MemberActivation,
@@ -13,7 +17,12 @@ from schemas import (
     EmailConfigCreate, EmailConfigResponse, EmailTemplateCreate, EmailTemplateUpdate,
     EmailTemplateResponse, TestEmailRequest
 )
-from auth import get_current_admin_user, get_password_hash
+from auth import CurrentUser, get_current_admin_user, get_current_user_async, oauth2_scheme, get_password_hash, invalidate_cached_user, REFRESH_TOKEN_EXPIRE_DAYS
+from token_revocation import revoke_user_tokens
+from audit import record_event
+from occupancy import occupancy_report
+import change_feed
+import live_updates
 from email_service import send_approval_email, send_rejection_email
 import calendar
 
@@ -23,7 +32,7 @@ router = APIRouter()
 @router.get("/pending-members", response_model=List[UserResponse])
 def get_pending_members(
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     # Only show users who have verified their email and are pending admin approval
     pending_users = db.query(User).filter(
@@ -37,7 +46,7 @@ def get_pending_members(
 def activate_member(
     activation: MemberActivation,
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     user = db.query(User).filter(User.id == activation.user_id).first()
     if not user:
@@ -69,7 +78,14 @@ def activate_member(
         description=f"Account activated with initial quota"
     )
     db.add(transaction)
+    record_event(
+        db, admin, "member.activated", "user", user.id,
+        property_id=activation.property_id,
+        weekday_quota=activation.weekday_quota,
+        weekend_quota=activation.weekend_quota
+    )
     db.commit()
+    invalidate_cached_user(user.email)
     db.refresh(user)
     
     # Send approval email
@@ -100,7 +116,7 @@ def activate_member(
 def reject_member(
     rejection: MemberRejection,
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     """Reject a pending member registration"""
     user = db.query(User).filter(User.id == rejection.user_id).first()
@@ -119,7 +135,9 @@ def reject_member(
     
     # Delete the user record
     db.delete(user)
+    record_event(db, admin, "member.rejected", "user", rejection.user_id, email=user_email, reason=rejection_reason)
     db.commit()
+    invalidate_cached_user(user_email)
     
     # Send rejection email
     try:
@@ -147,7 +165,7 @@ def reject_member(
 def get_member_details(
     user_id: int,
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
@@ -166,7 +184,7 @@ def get_member_details(
 def search_members(
     query: str,
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     # Search by user fields and property name
     users = db.query(User).join(
@@ -184,7 +202,7 @@ def search_members(
 @router.get("/all-members", response_model=List[UserResponse])
 def get_all_members(
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     """Get all active owner members (excluding admins) with their property information"""
     users = db.query(User).filter(
@@ -199,12 +217,14 @@ def edit_member(
     user_id: int,
     member_data: MemberEdit,
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
+    old_email = user.email
+    
     # Update fields if provided
     if member_data.name is not None:
         user.name = member_data.name
@@ -219,7 +239,12 @@ def edit_member(
     if member_data.password is not None:
         user.password_hash = get_password_hash(member_data.password)
     
+    changed = member_data.dict(exclude_none=True, exclude={"password"})
+    if member_data.password is not None:
+        changed["password"] = "changed"
+    record_event(db, admin, "member.updated", "user", user.id, changes=changed)
     db.commit()
+    invalidate_cached_user(old_email, user.email)
     db.refresh(user)
     return user
 
@@ -228,7 +253,7 @@ def edit_member(
 def adjust_quota(
     adjustment: QuotaAdjustment,
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     user = db.query(User).filter(User.id == adjustment.user_id).first()
     if not user:
@@ -249,6 +274,12 @@ def adjust_quota(
         description=adjustment.description or "Manual quota adjustment by admin"
     )
     db.add(transaction)
+    record_event(
+        db, admin, "quota.adjusted", "user", user.id,
+        weekday_change=adjustment.weekday_change,
+        weekend_change=adjustment.weekend_change,
+        description=transaction.description
+    )
     db.commit()
     db.refresh(user)
     return user
@@ -256,19 +287,19 @@ def adjust_quota(
 @router.get("/quota-adjustments")
 def get_quota_adjustments(
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     """Get all manual quota adjustments"""
-    adjustments = db.query(QuotaTransaction).filter(
+    adjustments = db.query(QuotaTransaction).options(
+        joinedload(QuotaTransaction.user).joinedload(User.property)
+    ).filter(
         QuotaTransaction.transaction_type == "manual_adjustment"
     ).order_by(QuotaTransaction.created_at.desc()).all()
     
     result = []
     for adj in adjustments:
-        user = db.query(User).filter(User.id == adj.user_id).first()
-        property_obj = None
-        if user and user.property_id:
-            property_obj = db.query(Property).filter(Property.id == user.property_id).first()
+        user = adj.user
+        property_obj = user.property if user else None
         
         result.append({
             "id": adj.id,
@@ -288,7 +319,7 @@ def get_quota_adjustments(
 def deactivate_member(
     user_id: int,
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
@@ -298,7 +329,10 @@ def deactivate_member(
         raise HTTPException(status_code=403, detail="Cannot deactivate admin users")
     
     user.status = UserStatus.SUSPENDED
+    revoke_user_tokens(db, user.id, timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
+    record_event(db, admin, "member.deactivated", "user", user.id)
     db.commit()
+    invalidate_cached_user(user.email)
     db.refresh(user)
     return user
 
@@ -307,7 +341,7 @@ def deactivate_member(
 def reactivate_member(
     user_id: int,
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
@@ -317,7 +351,9 @@ def reactivate_member(
         raise HTTPException(status_code=400, detail="User is not suspended")
     
     user.status = UserStatus.ACTIVE
+    record_event(db, admin, "member.reactivated", "user", user.id)
     db.commit()
+    invalidate_cached_user(user.email)
     db.refresh(user)
     return user
 
@@ -326,7 +362,7 @@ def reactivate_member(
 def delete_member(
     user_id: int,
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
@@ -336,6 +372,7 @@ def delete_member(
         raise HTTPException(status_code=403, detail="Cannot delete admin users")
     
     user_name = user.name
+    user_email = user.email
     
     # Delete related records in correct order (respecting foreign key constraints)
     # 1. Delete quota transactions (references user_id)
@@ -346,7 +383,9 @@ def delete_member(
     
     # 3. Delete the user
     db.delete(user)
+    record_event(db, admin, "member.deleted", "user", user_id, email=user_email, name=user_name)
     db.commit()
+    invalidate_cached_user(user_email)
     
     return {"message": f"User {user_name} and all related records (bookings, transactions) deleted successfully"}
 
@@ -355,10 +394,12 @@ def delete_member(
 def create_property(
     property_data: PropertyCreate,
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     db_property = Property(**property_data.dict())
     db.add(db_property)
+    db.flush()
+    record_event(db, admin, "property.created", "property", db_property.id, **property_data.dict())
     db.commit()
     db.refresh(db_property)
     return db_property
@@ -366,7 +407,7 @@ def create_property(
 @router.get("/properties", response_model=List[PropertyResponse])
 def get_properties(
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     return db.query(Property).all()
 
@@ -375,7 +416,7 @@ def update_property(
     property_id: int,
     property_data: PropertyCreate,
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     db_property = db.query(Property).filter(Property.id == property_id).first()
     if not db_property:
@@ -384,6 +425,7 @@ def update_property(
     for key, value in property_data.dict().items():
         setattr(db_property, key, value)
     
+    record_event(db, admin, "property.updated", "property", db_property.id, **property_data.dict())
     db.commit()
     db.refresh(db_property)
     return db_property
@@ -393,10 +435,12 @@ def update_property(
 def create_cottage(
     cottage_data: CottageCreate,
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     db_cottage = Cottage(**cottage_data.dict())
     db.add(db_cottage)
+    db.flush()
+    record_event(db, admin, "cottage.created", "cottage", db_cottage.id, **cottage_data.dict())
     db.commit()
     db.refresh(db_cottage)
     return db_cottage
@@ -405,7 +449,7 @@ def create_cottage(
 def get_cottages(
     property_id: int = None,
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     query = db.query(Cottage)
     if property_id:
@@ -417,7 +461,7 @@ def update_cottage(
     cottage_id: int,
     cottage_data: CottageCreate,
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     db_cottage = db.query(Cottage).filter(Cottage.id == cottage_id).first()
     if not db_cottage:
@@ -426,6 +470,7 @@ def update_cottage(
     for key, value in cottage_data.dict().items():
         setattr(db_cottage, key, value)
     
+    record_event(db, admin, "cottage.updated", "cottage", db_cottage.id, **cottage_data.dict())
     db.commit()
     db.refresh(db_cottage)
     return db_cottage
@@ -435,7 +480,7 @@ def update_cottage(
 def create_maintenance_block(
     block_data: MaintenanceBlockCreate,
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     # Check for overlapping bookings and reject pending ones
     pending_bookings = db.query(Booking).filter(
@@ -455,6 +500,12 @@ def create_maintenance_block(
     
     db_block = MaintenanceBlock(**block_data.dict())
     db.add(db_block)
+    db.flush()
+    record_event(
+        db, admin, "maintenance_block.created", "maintenance_block", db_block.id,
+        rejected_booking_ids=[booking.id for booking in pending_bookings],
+        **block_data.dict()
+    )
     db.commit()
     db.refresh(db_block)
     return db_block
@@ -462,7 +513,7 @@ def create_maintenance_block(
 @router.get("/maintenance-blocks", response_model=List[MaintenanceBlockResponse])
 def get_maintenance_blocks(
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     return db.query(MaintenanceBlock).all()
 
@@ -470,7 +521,7 @@ def get_maintenance_blocks(
 def get_maintenance_block_bookings(
     block_id: int,
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     """Get all bookings that overlap with a maintenance block date range"""
     block = db.query(MaintenanceBlock).filter(MaintenanceBlock.id == block_id).first()
@@ -478,7 +529,10 @@ def get_maintenance_block_bookings(
         raise HTTPException(status_code=404, detail="Maintenance block not found")
     
     # Find bookings that overlap with maintenance block dates
-    bookings = db.query(Booking).filter(
+    bookings = db.query(Booking).options(
+        joinedload(Booking.user),
+        joinedload(Booking.cottage).joinedload(Cottage.property)
+    ).filter(
         Booking.cottage_id == block.cottage_id,
         Booking.check_in < block.end_date,
         Booking.check_out > block.start_date,
@@ -487,11 +541,9 @@ def get_maintenance_block_bookings(
     
     result = []
     for booking in bookings:
-        user = db.query(User).filter(User.id == booking.user_id).first()
-        cottage = db.query(Cottage).filter(Cottage.id == booking.cottage_id).first()
-        property_obj = None
-        if cottage and cottage.property_id:
-            property_obj = db.query(Property).filter(Property.id == cottage.property_id).first()
+        user = booking.user
+        cottage = booking.cottage
+        property_obj = cottage.property if cottage else None
         
         result.append({
             "id": booking.id,
@@ -516,7 +568,7 @@ def update_maintenance_block(
     block_id: int,
     block_data: MaintenanceBlockCreate,
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     block = db.query(MaintenanceBlock).filter(MaintenanceBlock.id == block_id).first()
     if not block:
@@ -545,6 +597,11 @@ def update_maintenance_block(
     block.end_date = block_data.end_date
     block.reason = block_data.reason
     
+    record_event(
+        db, admin, "maintenance_block.updated", "maintenance_block", block.id,
+        rejected_booking_ids=[booking.id for booking in pending_bookings],
+        **block_data.dict()
+    )
     db.commit()
     db.refresh(block)
     return block
@@ -553,13 +610,17 @@ def update_maintenance_block(
 def delete_maintenance_block(
     block_id: int,
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     block = db.query(MaintenanceBlock).filter(MaintenanceBlock.id == block_id).first()
     if not block:
         raise HTTPException(status_code=404, detail="Maintenance block not found")
     
     db.delete(block)
+    record_event(
+        db, admin, "maintenance_block.deleted", "maintenance_block", block_id,
+        cottage_id=block.cottage_id, start_date=block.start_date, end_date=block.end_date
+    )
     db.commit()
     return {"message": "Maintenance block deleted successfully"}
 
@@ -569,32 +630,46 @@ def get_inventory_health(
     start_date: date,
     end_date: date,
     property_id: int = None,
-    db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    db: Session = Depends(get_read_db),
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
-    query = db.query(Cottage)
+    query = db.query(Cottage).options(joinedload(Cottage.property))
     if property_id:
         query = query.filter(Cottage.property_id == property_id)
     cottages = query.all()
+    cottage_ids = [cottage.id for cottage in cottages]
+    
+    # Fetch everything overlapping the range once instead of querying per cottage per day
+    bookings_by_cottage = {}
+    for booking in db.query(Booking.cottage_id, Booking.check_in, Booking.check_out).filter(
+        Booking.cottage_id.in_(cottage_ids),
+        Booking.check_in <= end_date,
+        Booking.check_out > start_date,
+        Booking.status == BookingStatus.CONFIRMED
+    ):
+        bookings_by_cottage.setdefault(booking.cottage_id, []).append(booking)
+    
+    blocks_by_cottage = {}
+    for block in db.query(MaintenanceBlock.cottage_id, MaintenanceBlock.start_date, MaintenanceBlock.end_date).filter(
+        MaintenanceBlock.cottage_id.in_(cottage_ids),
+        MaintenanceBlock.start_date <= end_date,
+        MaintenanceBlock.end_date >= start_date
+    ):
+        blocks_by_cottage.setdefault(block.cottage_id, []).append(block)
     
     result = []
     current_date = start_date
     while current_date <= end_date:
         for cottage in cottages:
             # Check if booked
-            booking = db.query(Booking).filter(
-                Booking.cottage_id == cottage.id,
-                Booking.check_in <= current_date,
-                Booking.check_out > current_date,
-                Booking.status == BookingStatus.CONFIRMED
-            ).first()
+            booking = any(
+                b.check_in <= current_date < b.check_out for b in bookings_by_cottage.get(cottage.id, [])
+            )
             
             # Check if maintenance
-            maintenance = db.query(MaintenanceBlock).filter(
-                MaintenanceBlock.cottage_id == cottage.id,
-                MaintenanceBlock.start_date <= current_date,
-                MaintenanceBlock.end_date >= current_date
-            ).first()
+            maintenance = any(
+                m.start_date <= current_date <= m.end_date for m in blocks_by_cottage.get(cottage.id, [])
+            )
             
             status = "available"
             if maintenance:
@@ -603,10 +678,7 @@ def get_inventory_health(
                 status = "booked"
             
             # Get property name
-            property_name = None
-            if cottage.property_id:
-                property = db.query(Property).filter(Property.id == cottage.property_id).first()
-                property_name = property.name if property else None
+            property_name = cottage.property.name if cottage.property else None
             
             result.append({
                 "date": current_date,
@@ -625,20 +697,21 @@ def get_inventory_health(
 # ADM-10: The Approval Queue
 @router.get("/approval-queue")
 def get_approval_queue(
-    db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    db: Session = Depends(get_read_db),
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
-    pending_bookings = db.query(Booking).filter(
+    pending_bookings = db.query(Booking).options(
+        joinedload(Booking.user),
+        joinedload(Booking.cottage).joinedload(Cottage.property)
+    ).filter(
         Booking.status == BookingStatus.PENDING
     ).order_by(Booking.created_at).all()
     
     result = []
     for booking in pending_bookings:
-        user = db.query(User).filter(User.id == booking.user_id).first()
-        cottage = db.query(Cottage).filter(Cottage.id == booking.cottage_id).first()
-        property_obj = None
-        if cottage and cottage.property_id:
-            property_obj = db.query(Property).filter(Property.id == cottage.property_id).first()
+        user = booking.user
+        cottage = booking.cottage
+        property_obj = cottage.property if cottage else None
         
         result.append({
             "id": booking.id,
@@ -662,7 +735,7 @@ def get_approval_queue(
 def make_booking_decision(
     decision: BookingDecision,
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     booking = db.query(Booking).filter(Booking.id == decision.booking_id).first()
     if not booking:
@@ -693,6 +766,10 @@ def make_booking_decision(
     else:
         raise HTTPException(status_code=400, detail="Invalid action. Use 'approve' or 'reject'")
     
+    record_event(
+        db, admin, "booking.approved" if decision.action == "approve" else "booking.rejected",
+        "booking", booking.id, user_id=booking.user_id, notes=decision.notes
+    )
     db.commit()
     db.refresh(booking)
     return booking
@@ -703,7 +780,7 @@ def revoke_booking(
     booking_id: int,
     request: RevokeBookingRequest,
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     booking = db.query(Booking).filter(Booking.id == booking_id).first()
     if not booking:
@@ -732,6 +809,7 @@ def revoke_booking(
         )
         db.add(transaction)
     
+    record_event(db, admin, "booking.revoked", "booking", booking.id, user_id=booking.user_id, reason=reason)
     db.commit()
     db.refresh(booking)
     return booking
@@ -741,7 +819,7 @@ def revoke_all_maintenance_bookings(
     block_id: int,
     request: RevokeBookingRequest,
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     """Revoke all bookings that overlap with a maintenance block"""
     block = db.query(MaintenanceBlock).filter(MaintenanceBlock.id == block_id).first()
@@ -762,7 +840,7 @@ def revoke_all_maintenance_bookings(
     for booking in bookings:
         if booking.status == BookingStatus.CANCELLED:
             continue
-            
+        
         booking.status = BookingStatus.CANCELLED
         booking.decision_notes = reason
         
@@ -783,6 +861,13 @@ def revoke_all_maintenance_bookings(
             db.add(transaction)
             revoked_count += 1
     
+    # Added after the loop so the per-row autoflush doesn't split them into one INSERT each
+    for booking in bookings:
+        record_event(
+            db, admin, "booking.revoked", "booking", booking.id,
+            user_id=booking.user_id, reason=reason, maintenance_block_id=block_id
+        )
+    
     db.commit()
     return {"message": f"Successfully revoked {revoked_count} booking(s)", "revoked_count": revoked_count}
 
@@ -791,19 +876,27 @@ def revoke_all_maintenance_bookings(
 def create_override_booking(
     booking_data: dict,  # Will accept full booking details
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     # Create booking bypassing standard checks
     db_booking = Booking(
         user_id=booking_data["user_id"],
         cottage_id=booking_data["cottage_id"],
-        check_in=booking_data["check_in"],
-        check_out=booking_data["check_out"],
+        check_in=date.fromisoformat(str(booking_data["check_in"])),
+        check_out=date.fromisoformat(str(booking_data["check_out"])),
         status=BookingStatus.CONFIRMED,
         weekday_credits_used=booking_data.get("weekday_credits_used", 0),
         weekend_credits_used=booking_data.get("weekend_credits_used", 0)
     )
     db.add(db_booking)
+    db.flush()
+    record_event(
+        db, admin, "booking.override_created", "booking", db_booking.id,
+        user_id=db_booking.user_id, cottage_id=db_booking.cottage_id,
+        check_in=db_booking.check_in, check_out=db_booking.check_out,
+        weekday_credits_used=db_booking.weekday_credits_used,
+        weekend_credits_used=db_booking.weekend_credits_used
+    )
     db.commit()
     db.refresh(db_booking)
     return db_booking
@@ -812,7 +905,7 @@ def create_override_booking(
 @router.get("/holidays")
 def get_holidays(
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     """Get all configured holidays"""
     holidays = db.query(SystemCalendar).filter(
@@ -830,7 +923,7 @@ def get_holidays(
 def set_holidays(
     holidays: List[HolidayDate],
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     created = []
     for holiday in holidays:
@@ -847,6 +940,8 @@ def set_holidays(
             db.add(calendar_entry)
             created.append(calendar_entry)
     
+    for holiday in holidays:
+        record_event(db, admin, "holiday.set", "holiday", holiday.date, holiday_name=holiday.holiday_name)
     db.commit()
     return {"message": f"Set {len(holidays)} holiday dates", "holidays": created}
 
@@ -854,7 +949,7 @@ def set_holidays(
 def delete_holiday(
     date: date,
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     """Delete a holiday by date"""
     calendar_entry = db.query(SystemCalendar).filter(
@@ -865,6 +960,8 @@ def delete_holiday(
     if not calendar_entry:
         raise HTTPException(status_code=404, detail="Holiday not found")
     
+    holiday_name = calendar_entry.holiday_name
+    
     # If it's only a holiday (not peak season), delete the entry
     # Otherwise, just remove the holiday flag
     if calendar_entry.is_peak_season:
@@ -873,6 +970,7 @@ def delete_holiday(
     else:
         db.delete(calendar_entry)
     
+    record_event(db, admin, "holiday.deleted", "holiday", date, holiday_name=holiday_name)
     db.commit()
     return {"message": f"Holiday on {date} deleted successfully"}
 
@@ -881,7 +979,7 @@ def update_holiday(
     date: date,
     holiday_data: HolidayDate,
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     """Update a holiday"""
     calendar_entry = db.query(SystemCalendar).filter(
@@ -920,6 +1018,10 @@ def update_holiday(
         # Just update the name
         calendar_entry.holiday_name = holiday_data.holiday_name
     
+    record_event(
+        db, admin, "holiday.updated", "holiday", date,
+        new_date=holiday_data.date, holiday_name=holiday_data.holiday_name
+    )
     db.commit()
     return {"message": "Holiday updated successfully"}
 
@@ -927,7 +1029,7 @@ def update_holiday(
 @router.get("/peak-seasons")
 def get_peak_seasons(
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     """Get all configured peak seasons"""
     peak_seasons = db.query(PeakSeason).order_by(PeakSeason.start_date).all()
@@ -946,7 +1048,7 @@ def get_peak_seasons(
 def create_peak_season(
     peak_season: PeakSeasonCreate,
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     # Mark all dates in range as peak season
     current_date = peak_season.start_date
@@ -966,6 +1068,8 @@ def create_peak_season(
     # Also create peak season record
     db_peak_season = PeakSeason(**peak_season.dict())
     db.add(db_peak_season)
+    db.flush()
+    record_event(db, admin, "peak_season.created", "peak_season", db_peak_season.id, **peak_season.dict())
     db.commit()
     db.refresh(db_peak_season)
     return db_peak_season
@@ -975,7 +1079,7 @@ def update_peak_season(
     season_id: int,
     peak_season: PeakSeasonCreate,
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     """Update a peak season"""
     db_season = db.query(PeakSeason).filter(PeakSeason.id == season_id).first()
@@ -1017,6 +1121,10 @@ def update_peak_season(
             db.add(calendar_entry)
         current_date += timedelta(days=1)
     
+    record_event(
+        db, admin, "peak_season.updated", "peak_season", db_season.id,
+        old_start_date=old_start, old_end_date=old_end, **peak_season.dict()
+    )
     db.commit()
     db.refresh(db_season)
     return db_season
@@ -1025,7 +1133,7 @@ def update_peak_season(
 def delete_peak_season(
     season_id: int,
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     """Delete a peak season"""
     db_season = db.query(PeakSeason).filter(PeakSeason.id == season_id).first()
@@ -1047,45 +1155,108 @@ def delete_peak_season(
         current_date += timedelta(days=1)
     
     db.delete(db_season)
+    record_event(
+        db, admin, "peak_season.deleted", "peak_season", season_id,
+        name=db_season.name, start_date=db_season.start_date, end_date=db_season.end_date
+    )
     db.commit()
     return {"message": "Peak season deleted successfully"}
 
-# Calendar View - All Bookings
+# Calendar View - Bookings in a date range (read from the booking_calendar projection)
 @router.get("/bookings-calendar")
 def get_bookings_calendar(
-    db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    start: date = None,
+    end: date = None,
+    property_id: int = None,
+    db: Session = Depends(get_read_db),
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
-    """Get all bookings with cottage names for calendar display"""
-    from sqlalchemy.orm import joinedload
+    """Pending and confirmed bookings whose stay touches [start, end] (check-out day included), for calendar display"""
+    if start and end and end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    query = select(BookingCalendarEntry)
+    if start:
+        query = query.where(BookingCalendarEntry.check_out >= start)
+    if end:
+        query = query.where(BookingCalendarEntry.check_in <= end)
+    if property_id:
+        query = query.where(BookingCalendarEntry.property_id == property_id)
+    entries = db.execute(query.order_by(BookingCalendarEntry.check_in, BookingCalendarEntry.booking_id)).scalars()
     
-    bookings = db.query(Booking).options(
-        joinedload(Booking.cottage).joinedload(Cottage.property),
-        joinedload(Booking.user)
-    ).filter(
-        Booking.status.in_([BookingStatus.CONFIRMED, BookingStatus.PENDING])
-    ).all()
+    return [
+        {
+            "id": entry.booking_id,
+            "cottage_name": entry.cottage_name or "Unknown",
+            "cottage_id": entry.cottage_id,
+            "check_in": str(entry.check_in),
+            "check_out": str(entry.check_out),
+            "status": entry.status.value,
+            "user_name": entry.user_name or "Unknown",
+            "property_name": entry.property_name
+        }
+        for entry in entries
+    ]
+
+# Delta sync for the calendar and approval queue (see change_feed.py)
+@router.get("/bookings/changes")
+def get_booking_changes(
+    since: int = Query(None, ge=0),
+    limit: int = Query(500, ge=1, le=5000),
+    db: Session = Depends(get_read_db),
+    admin: CurrentUser = Depends(get_current_admin_user)
+):
+    """
+    Bookings created, updated or deleted after the `since` cursor, oldest change first.
     
-    result = []
-    for booking in bookings:
-        result.append({
-            "id": booking.id,
-            "cottage_name": booking.cottage.cottage_id if booking.cottage else "Unknown",
-            "cottage_id": booking.cottage.id if booking.cottage else None,
-            "check_in": str(booking.check_in),
-            "check_out": str(booking.check_out),
-            "status": booking.status.value,
-            "user_name": booking.user.name if booking.user else "Unknown",
-            "property_name": booking.cottage.property.name if booking.cottage and booking.cottage.property else None
-        })
+    Deleted bookings come back as {"id": ..., "deleted": true}. Without `since`, returns only
+    the current cursor: fetch it before loading the full lists, then poll with it.
+    """
+    sequence = db.execute(change_feed.sequence_query()).one()
+    if since is None:
+        return {"changes": [], "cursor": sequence.value, "has_more": False}
+    change_feed.check_cursor(sequence, since)
+    booking_ids, cursor, has_more = change_feed.latest_changes(
+        db.execute(change_feed.changes_query(since, limit)).all(), limit
+    )
+    if not booking_ids:
+        return {"changes": [], "cursor": since, "has_more": False}
+    rows = db.execute(change_feed.bookings_query(booking_ids)).all()
+    return change_feed.feed_response(booking_ids, rows, cursor, has_more)
+
+# Push updates for the calendar and approval queue (see live_updates.py)
+@router.get("/live")
+async def stream_booking_updates(
+    cottages: List[int] = Query(None),
+    approvals: bool = False,
+    token: str = Depends(oauth2_scheme)
+):
+    """
+    Server-Sent Events stream of booking and maintenance changes.
     
-    return result
+    Follows the given `cottages` (repeatable) and, with approvals=true, bookings entering or
+    leaving the approval queue. Opens with a `ready` event carrying the change-feed cursor.
+    """
+    if not cottages and not approvals:
+        raise HTTPException(status_code=400, detail="Subscribe to at least one cottage or to approvals")
+    # A short-lived session: the stream itself must not hold a database connection
+    async with AsyncSessionLocal() as db:
+        get_current_admin_user(await get_current_user_async(token, db))
+        followed = set(cottages or [])
+        if followed:
+            found = set((await db.execute(select(Cottage.id).filter(Cottage.id.in_(followed)))).scalars())
+            if found != followed:
+                raise HTTPException(status_code=404, detail="Cottage not found")
+        cursor = (await db.execute(change_feed.sequence_query())).one().value
+    topics = {live_updates.cottage_topic(cottage_id) for cottage_id in followed}
+    if approvals:
+        topics.add(live_updates.APPROVALS_TOPIC)
+    return live_updates.event_stream(topics, {"cursor": cursor, "cottages": sorted(followed), "approvals": approvals})
 
 # Get all rejected and revoked bookings
 @router.get("/rejected-bookings")
 def get_rejected_bookings(
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     """Get all rejected and cancelled (revoked) bookings with owner, sanctuary, and cottage details"""
     from sqlalchemy.orm import joinedload
@@ -1117,7 +1288,7 @@ def get_rejected_bookings(
 @router.post("/reset-all-quotas")
 def reset_all_quotas(
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     users = db.query(User).filter(User.status == UserStatus.ACTIVE).all()
     
@@ -1135,134 +1306,373 @@ def reset_all_quotas(
         )
         db.add(transaction)
     
+    record_event(db, admin, "quota.reset_all", "quota", None, user_count=len(users))
     db.commit()
     return {"message": f"Reset quotas for {len(users)} users"}
 
 # Audit Trail - Get all system activities
+AUDIT_TYPES = ("Transaction", "Booking", "Activation")
+BOOKING_AUDIT_ACTIONS = {
+    BookingStatus.REJECTED: "Booking Rejected",
+    BookingStatus.CANCELLED: "Booking Revoked",
+    BookingStatus.CONFIRMED: "Booking Confirmed"
+}
+
+def _encode_audit_cursor(timestamp: datetime, rank: int, entry_id: int) -> str:
+    payload = json.dumps([timestamp.isoformat(), rank, entry_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii")
+
+def _decode_audit_cursor(cursor: str) -> tuple:
+    try:
+        timestamp, rank, entry_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(timestamp), int(rank), int(entry_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _encode_name_cursor(name: str, entry_id: int) -> str:
+    payload = json.dumps([name, entry_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii")
+
+def _decode_name_cursor(cursor: str) -> tuple:
+    try:
+        name, entry_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return str(name), int(entry_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _audit_branch(rank: int, timestamp, id_column, columns: list, joins: list, filters: list, cursor, limit):
+    """One source of the audit timeline, newest first, limited to the rows a page can use (None: all)"""
+    if cursor:
+        after_timestamp, after_rank, after_id = cursor
+        # Timeline order is (timestamp, rank, id) descending and rank is constant within a branch
+        if rank < after_rank:
+            filters.append(timestamp <= after_timestamp)
+        elif rank > after_rank:
+            filters.append(timestamp < after_timestamp)
+        else:
+            filters.append(or_(timestamp < after_timestamp, and_(timestamp == after_timestamp, id_column < after_id)))
+    query = select(
+        timestamp.label("timestamp"), literal_column(str(rank)).label("rank"), id_column.label("id"), *columns
+    )
+    for target, on in joins:
+        query = query.outerjoin(target, on)
+    return select(
+        query.where(*filters).order_by(timestamp.desc(), id_column.desc()).limit(limit).subquery()
+    )
+
+def _audit_timeline(start_date, end_date, type, action, user_id, property_id, after, limit):
+    """
+    Merged audit timeline (timestamp, rank, id, ...) ordered newest first, or None if the
+    filters exclude every source. Rank identifies the source: 0 transaction, 1 booking, 2 activation.
+    """
+    types = AUDIT_TYPES if type is None else [t for t in AUDIT_TYPES if t.lower() == type.lower()]
+    start = datetime.combine(start_date, datetime.min.time()) if start_date else None
+    end = datetime.combine(end_date, datetime.max.time()) if end_date else None
+    
+    def common_filters(created_column, user_column, property_column):
+        filters = []
+        if start:
+            filters.append(created_column >= start)
+        if end:
+            filters.append(created_column <= end)
+        if user_id:
+            filters.append(user_column == user_id)
+        if property_id:
+            filters.append(property_column == property_id)
+        return filters
+    
+    transaction_columns = [
+        cast(QuotaTransaction.transaction_type, String).label("code"),
+        User.name.label("user_name"),
+        User.email.label("user_email"),
+        Property.name.label("property_name"),
+        QuotaTransaction.description.label("description"),
+        QuotaTransaction.weekday_change.label("weekday"),
+        QuotaTransaction.weekend_change.label("weekend"),
+        QuotaTransaction.booking_id.label("booking_id"),
+        cast(null(), String).label("cottage_name"),
+        cast(null(), Date).label("check_in"),
+        cast(null(), Date).label("check_out"),
+    ]
+    transaction_joins = [(User, User.id == QuotaTransaction.user_id), (Property, Property.id == User.property_id)]
+    
+    branches = []
+    if "Transaction" in types:
+        filters = common_filters(QuotaTransaction.created_at, QuotaTransaction.user_id, User.property_id)
+        if action:
+            filters.append(QuotaTransaction.transaction_type == action.lower())
+        branches.append(_audit_branch(
+            0, QuotaTransaction.created_at, QuotaTransaction.id,
+            transaction_columns, transaction_joins, filters, after, limit
+        ))
+    
+    booking_statuses = [
+        status for status, label in BOOKING_AUDIT_ACTIONS.items() if not action or label.lower() == action.lower()
+    ]
+    if "Booking" in types and booking_statuses:
+        filters = common_filters(Booking.created_at, Booking.user_id, Cottage.property_id)
+        filters.append(Booking.status.in_(booking_statuses))
+        branches.append(_audit_branch(
+            1, func.coalesce(Booking.updated_at, Booking.created_at), Booking.id,
+            [
+                cast(Booking.status, String).label("code"),
+                User.name.label("user_name"),
+                User.email.label("user_email"),
+                Property.name.label("property_name"),
+                Booking.decision_notes.label("description"),
+                Booking.weekday_credits_used.label("weekday"),
+                Booking.weekend_credits_used.label("weekend"),
+                Booking.id.label("booking_id"),
+                Cottage.cottage_id.label("cottage_name"),
+                Booking.check_in.label("check_in"),
+                Booking.check_out.label("check_out"),
+            ],
+            [
+                (User, User.id == Booking.user_id),
+                (Cottage, Cottage.id == Booking.cottage_id),
+                (Property, Property.id == Cottage.property_id),
+            ],
+            filters, after, limit
+        ))
+    
+    # Activations are also listed as ACTIVATION transactions, as they always have been
+    if "Activation" in types and (not action or action.lower() == "member activated"):
+        filters = common_filters(QuotaTransaction.created_at, QuotaTransaction.user_id, User.property_id)
+        filters.append(QuotaTransaction.transaction_type == "activation")
+        branches.append(_audit_branch(
+            2, QuotaTransaction.created_at, QuotaTransaction.id,
+            transaction_columns, transaction_joins, filters, after, limit
+        ))
+    
+    if not branches:
+        return None
+    timeline = (union_all(*branches) if len(branches) > 1 else branches[0]).subquery()
+    return select(timeline).order_by(
+        timeline.c.timestamp.desc(), timeline.c.rank.desc(), timeline.c.id.desc()
+    ).limit(limit)
+
+def _audit_entry(row) -> dict:
+    """API representation of one _audit_timeline row"""
+    common = {
+        "timestamp": row.timestamp.isoformat() if row.timestamp else datetime.now().isoformat(),
+        "user_name": row.user_name or "Unknown",
+        "user_email": row.user_email or "Unknown",
+        "property_name": row.property_name or "N/A",
+    }
+    if row.rank == 0:
+        return {
+            "id": row.id,
+            "type": "Transaction",
+            "action": row.code.upper(),
+            **common,
+            "description": row.description or f"{row.code} transaction",
+            "weekday_change": row.weekday,
+            "weekend_change": row.weekend,
+            "booking_id": row.booking_id,
+            "details": f"Weekday: {row.weekday:+d}, Weekend: {row.weekend:+d}"
+        }
+    if row.rank == 1:
+        status = BookingStatus[row.code]
+        sign = -1 if status == BookingStatus.CONFIRMED else 1
+        return {
+            "id": row.id,
+            "type": "Booking",
+            "action": BOOKING_AUDIT_ACTIONS[status],
+            **common,
+            "description": row.description or f"Booking {status.value}",
+            "weekday_change": sign * row.weekday,
+            "weekend_change": sign * row.weekend,
+            "booking_id": row.booking_id,
+            "details": f"Cottage: {row.cottage_name or 'Unknown'}, Dates: {row.check_in} to {row.check_out}"
+        }
+    return {
+        "id": f"act_{row.id}",
+        "type": "Activation",
+        "action": "Member Activated",
+        **common,
+        "description": row.description or "Member account activated",
+        "weekday_change": row.weekday,
+        "weekend_change": row.weekend,
+        "booking_id": None,
+        "details": f"Initial quota: Weekday {row.weekday}, Weekend {row.weekend}"
+    }
+
 @router.get("/audit-trail")
 def get_audit_trail(
     start_date: date = None,
     end_date: date = None,
-    db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    type: str = None,
+    action: str = None,
+    user_id: int = None,
+    property_id: int = None,
+    cursor: str = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_read_db),
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
-    """Get comprehensive audit trail including transactions, bookings, activations, etc."""
-    from sqlalchemy.orm import joinedload
-    from sqlalchemy import or_
+    """
+    Audit trail (quota transactions, booking decisions and member activations), newest first.
     
-    audit_entries = []
+    Returns up to `limit` entries; pass the returned `next_cursor` to get the next page.
+    Filters: type (Transaction, Booking or Activation), action as displayed (e.g. RESET,
+    Booking Rejected, Member Activated), user_id and property_id.
+    """
+    after = _decode_audit_cursor(cursor) if cursor else None
+    query = _audit_timeline(start_date, end_date, type, action, user_id, property_id, after, limit + 1)
+    if query is None:
+        return {"entries": [], "next_cursor": None}
+    rows = db.execute(query).all()
+    entries = [_audit_entry(row) for row in rows[:limit]]
+    
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = _encode_audit_cursor(last.timestamp, last.rank, last.id)
+    return {"entries": entries, "next_cursor": next_cursor}
+
+# Append-only event log written by every mutating endpoint (see audit.py)
+@router.get("/audit-events")
+def get_audit_events(
+    start_date: date = None,
+    end_date: date = None,
+    action: str = None,
+    subject_type: str = None,
+    subject_id: str = None,
+    actor_id: int = None,
+    cursor: str = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_read_db),
+    admin: CurrentUser = Depends(get_current_admin_user)
+):
+    """
+    Recorded state changes, newest first: who did what to which record, and when.
     
-    # Get all quota transactions
-    transaction_query = db.query(QuotaTransaction).options(
-        joinedload(QuotaTransaction.user)
-    )
+    Returns up to `limit` events; pass the returned `next_cursor` to get the next page.
+    Filter by subject_type and subject_id (e.g. booking 42) for the full history of one record.
+    """
+    query = select(AuditEvent)
     if start_date:
-        transaction_query = transaction_query.filter(QuotaTransaction.created_at >= datetime.combine(start_date, datetime.min.time()))
+        query = query.where(AuditEvent.occurred_at >= datetime.combine(start_date, datetime.min.time()))
     if end_date:
-        transaction_query = transaction_query.filter(QuotaTransaction.created_at <= datetime.combine(end_date, datetime.max.time()))
-    
-    transactions = transaction_query.order_by(QuotaTransaction.created_at.desc()).all()
+        query = query.where(AuditEvent.occurred_at < datetime.combine(end_date + timedelta(days=1), datetime.min.time()))
+    if action:
+        query = query.where(AuditEvent.action == action)
+    if subject_type:
+        query = query.where(AuditEvent.subject_type == subject_type)
+    if subject_id:
+        query = query.where(AuditEvent.subject_id == subject_id)
+    if actor_id:
+        query = query.where(AuditEvent.actor_id == actor_id)
+    if cursor:
+        # Events are a single source, so the timeline rank in the cursor is always 0
+        after_timestamp, _, after_id = _decode_audit_cursor(cursor)
+        query = query.where(or_(
+            AuditEvent.occurred_at < after_timestamp,
+            and_(AuditEvent.occurred_at == after_timestamp, AuditEvent.id < after_id)
+        ))
+    query = query.order_by(AuditEvent.occurred_at.desc(), AuditEvent.id.desc()).limit(limit + 1)
+    events = db.execute(query).scalars().all()
+    
+    next_cursor = None
+    if len(events) > limit:
+        last = events[limit - 1]
+        next_cursor = _encode_audit_cursor(last.occurred_at, 0, last.id)
+    return {
+        "events": [
+            {
+                "id": event.id,
+                "occurred_at": event.occurred_at,
+                "actor_id": event.actor_id,
+                "actor_email": event.actor_email,
+                "action": event.action,
+                "subject_type": event.subject_type,
+                "subject_id": event.subject_id,
+                "details": event.details
+            }
+            for event in events[:limit]
+        ],
+        "next_cursor": next_cursor
+    }
+
+# Streaming exports for accountants: the full history without paging
+AUDIT_EXPORT_COLUMNS = [
+    "timestamp", "type", "action", "user_name", "user_email", "property_name", "description",
+    "weekday_change", "weekend_change", "booking_id", "details", "id"
+]
+BOOKING_EXPORT_COLUMNS = [
+    "id", "status", "property_name", "cottage_name", "user_name", "user_email", "check_in", "check_out",
+    "nights", "weekday_credits_used", "weekend_credits_used", "decision_notes", "created_at", "updated_at"
+]
+
+@router.get("/export/audit-trail")
+def export_audit_trail(
+    request: Request,
+    format: str = Query("csv", pattern=EXPORT_FORMAT_PATTERN),
+    start_date: date = None,
+    end_date: date = None,
+    type: str = None,
+    action: str = None,
+    user_id: int = None,
+    property_id: int = None,
+    admin: CurrentUser = Depends(get_current_admin_user)
+):
+    """Whole audit trail for the filters (as in GET /audit-trail), newest first, streamed as CSV or NDJSON"""
+    query = _audit_timeline(start_date, end_date, type, action, user_id, property_id, None, None)
     
-    for trans in transactions:
-        user = trans.user
-        property_name = "N/A"
-        if user and user.property_id:
-            property_obj = db.query(Property).filter(Property.id == user.property_id).first()
-            property_name = property_obj.name if property_obj else "N/A"
-        
-        audit_entries.append({
-            "id": trans.id,
-            "timestamp": trans.created_at.isoformat() if trans.created_at else datetime.now().isoformat(),
-            "type": "Transaction",
-            "action": trans.transaction_type.upper(),
-            "user_name": user.name if user else "Unknown",
-            "user_email": user.email if user else "Unknown",
-            "property_name": property_name,
-            "description": trans.description or f"{trans.transaction_type} transaction",
-            "weekday_change": trans.weekday_change,
-            "weekend_change": trans.weekend_change,
-            "booking_id": trans.booking_id,
-            "details": f"Weekday: {trans.weekday_change:+d}, Weekend: {trans.weekend_change:+d}"
-        })
+    def fetch(db: Session, batch_size: int):
+        if query is None:
+            return
+        for row in db.execute(query.execution_options(yield_per=batch_size)):
+            yield _audit_entry(row)
     
-    # Get all bookings with status changes (rejected, cancelled, confirmed)
-    booking_query = db.query(Booking).options(
-        joinedload(Booking.user),
-        joinedload(Booking.cottage).joinedload(Cottage.property)
-    ).filter(
-        Booking.status.in_([BookingStatus.REJECTED, BookingStatus.CANCELLED, BookingStatus.CONFIRMED])
-    )
+    filename = f"audit-trail_{start_date or 'start'}_to_{end_date or date.today()}"
+    return stream_export(read_session_factory(request), fetch, AUDIT_EXPORT_COLUMNS, format, filename)
+
+@router.get("/export/bookings")
+def export_bookings(
+    request: Request,
+    format: str = Query("csv", pattern=EXPORT_FORMAT_PATTERN),
+    start_date: date = None,
+    end_date: date = None,
+    status: BookingStatus = None,
+    property_id: int = None,
+    admin: CurrentUser = Depends(get_current_admin_user)
+):
+    """Booking history (every status) with check-in in the date range, by check-in date, streamed as CSV or NDJSON"""
+    query = select(
+        Booking.id, Booking.status, Property.name.label("property_name"), Cottage.cottage_id.label("cottage_name"),
+        User.name.label("user_name"), User.email.label("user_email"), Booking.check_in, Booking.check_out,
+        Booking.weekday_credits_used, Booking.weekend_credits_used, Booking.decision_notes,
+        Booking.created_at, Booking.updated_at
+    ).outerjoin(User, User.id == Booking.user_id).outerjoin(
+        Cottage, Cottage.id == Booking.cottage_id
+    ).outerjoin(Property, Property.id == Cottage.property_id)
     if start_date:
-        booking_query = booking_query.filter(Booking.created_at >= datetime.combine(start_date, datetime.min.time()))
+        query = query.where(Booking.check_in >= start_date)
     if end_date:
-        booking_query = booking_query.filter(Booking.created_at <= datetime.combine(end_date, datetime.max.time()))
-    
-    bookings = booking_query.order_by(Booking.created_at.desc()).all()
-    
-    for booking in bookings:
-        user = booking.user
-        cottage = booking.cottage
-        property_name = cottage.property.name if cottage and cottage.property else "N/A"
-        
-        action_map = {
-            BookingStatus.REJECTED: "Booking Rejected",
-            BookingStatus.CANCELLED: "Booking Revoked",
-            BookingStatus.CONFIRMED: "Booking Confirmed"
-        }
-        
-        timestamp = booking.updated_at or booking.created_at
-        audit_entries.append({
-            "id": booking.id,
-            "timestamp": timestamp.isoformat() if timestamp else datetime.now().isoformat(),
-            "type": "Booking",
-            "action": action_map.get(booking.status, booking.status.value.upper()),
-            "user_name": user.name if user else "Unknown",
-            "user_email": user.email if user else "Unknown",
-            "property_name": property_name,
-            "description": booking.decision_notes or f"Booking {booking.status.value}",
-            "weekday_change": -booking.weekday_credits_used if booking.status == BookingStatus.CONFIRMED else booking.weekday_credits_used,
-            "weekend_change": -booking.weekend_credits_used if booking.status == BookingStatus.CONFIRMED else booking.weekend_credits_used,
-            "booking_id": booking.id,
-            "details": f"Cottage: {cottage.cottage_id if cottage else 'Unknown'}, Dates: {booking.check_in} to {booking.check_out}"
-        })
-    
-    # Get member activations (from transactions with type "activation")
-    activation_transactions = [t for t in transactions if t.transaction_type == "activation"]
-    for trans in activation_transactions:
-        user = trans.user
-        property_name = "N/A"
-        if user and user.property_id:
-            property_obj = db.query(Property).filter(Property.id == user.property_id).first()
-            property_name = property_obj.name if property_obj else "N/A"
-        
-        # Check if this activation entry already exists (might be duplicate with transaction)
-        if not any(e["id"] == trans.id and e["type"] == "Activation" for e in audit_entries):
-            audit_entries.append({
-                "id": f"act_{trans.id}",
-                "timestamp": trans.created_at.isoformat() if trans.created_at else datetime.now().isoformat(),
-                "type": "Activation",
-                "action": "Member Activated",
-                "user_name": user.name if user else "Unknown",
-                "user_email": user.email if user else "Unknown",
-                "property_name": property_name,
-                "description": trans.description or "Member account activated",
-                "weekday_change": trans.weekday_change,
-                "weekend_change": trans.weekend_change,
-                "booking_id": None,
-                "details": f"Initial quota: Weekday {trans.weekday_change}, Weekend {trans.weekend_change}"
-            })
-    
-    # Sort all entries by timestamp
-    audit_entries.sort(key=lambda x: x["timestamp"], reverse=True)
-    
-    return audit_entries
+        query = query.where(Booking.check_in <= end_date)
+    if status:
+        query = query.where(Booking.status == status)
+    if property_id:
+        query = query.where(Cottage.property_id == property_id)
+    query = query.order_by(Booking.check_in, Booking.id)
+    
+    def fetch(db: Session, batch_size: int):
+        for row in db.execute(query.execution_options(yield_per=batch_size)):
+            record = row._asdict()
+            record["status"] = row.status.value
+            record["nights"] = (row.check_out - row.check_in).days
+            yield record
+    
+    filename = f"bookings_{start_date or 'start'}_to_{end_date or 'end'}"
+    return stream_export(read_session_factory(request), fetch, BOOKING_EXPORT_COLUMNS, format, filename)
 
 # Create Admin User
 @router.post("/create-admin", response_model=UserResponse)
 def create_admin_user(
     admin_data: AdminCreate,
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     """Create a new admin user. Only existing admins can create other admins."""
     # Check if user with this email already exists
@@ -1286,6 +1696,8 @@ def create_admin_user(
     )
     
     db.add(admin_user)
+    db.flush()
+    record_event(db, admin, "admin.created", "user", admin_user.id, email=admin_user.email, name=admin_user.name)
     db.commit()
     db.refresh(admin_user)
     
@@ -1295,7 +1707,7 @@ def create_admin_user(
 @router.get("/admins", response_model=List[UserResponse])
 def get_all_admins(
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     """Get all admin users"""
     admins = db.query(User).filter(User.role == UserRole.ADMIN).order_by(User.created_at.desc()).all()
@@ -1306,7 +1718,7 @@ def get_all_admins(
 def deactivate_admin(
     admin_id: int,
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     """Deactivate an admin user. Cannot deactivate yourself."""
     if admin_id == admin.id:
@@ -1317,7 +1729,10 @@ def deactivate_admin(
         raise HTTPException(status_code=404, detail="Admin user not found")
     
     admin_user.status = UserStatus.SUSPENDED
+    revoke_user_tokens(db, admin_user.id, timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
+    record_event(db, admin, "admin.deactivated", "user", admin_user.id)
     db.commit()
+    invalidate_cached_user(admin_user.email)
     db.refresh(admin_user)
     return admin_user
 
@@ -1326,7 +1741,7 @@ def deactivate_admin(
 def reactivate_admin(
     admin_id: int,
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     """Reactivate a suspended admin user"""
     admin_user = db.query(User).filter(User.id == admin_id, User.role == UserRole.ADMIN).first()
@@ -1337,7 +1752,9 @@ def reactivate_admin(
         raise HTTPException(status_code=400, detail="Admin user is not suspended")
     
     admin_user.status = UserStatus.ACTIVE
+    record_event(db, admin, "admin.reactivated", "user", admin_user.id)
     db.commit()
+    invalidate_cached_user(admin_user.email)
     db.refresh(admin_user)
     return admin_user
 
@@ -1346,7 +1763,7 @@ def reactivate_admin(
 def delete_admin(
     admin_id: int,
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     """Delete an admin user. Cannot delete yourself."""
     if admin_id == admin.id:
@@ -1357,6 +1774,7 @@ def delete_admin(
         raise HTTPException(status_code=404, detail="Admin user not found")
     
     admin_name = admin_user.name
+    admin_email = admin_user.email
     
     # Delete related records in correct order (respecting foreign key constraints)
     # 1. Delete quota transactions (references user_id)
@@ -1367,79 +1785,103 @@ def delete_admin(
     
     # 3. Delete the admin user
     db.delete(admin_user)
+    record_event(db, admin, "admin.deleted", "user", admin_id, email=admin_email, name=admin_name)
     db.commit()
+    invalidate_cached_user(admin_email)
     
     return {"message": f"Admin {admin_name} and all related records deleted successfully"}
 
+# Database connection pool metrics (per API worker process)
+@router.get("/metrics/db-pool")
+def get_db_pool_metrics(
+    admin: CurrentUser = Depends(get_current_admin_user)
+):
+    """Connection pool usage, waits and timeouts for the sync and async engines of this worker"""
+    import os
+    metrics = {
+        "pid": os.getpid(),
+        "sync": pool_status(engine.pool),
+        "async": pool_status(async_engine.sync_engine.pool)
+    }
+    if replica_engine is not engine:
+        metrics["replica_sync"] = pool_status(replica_engine.pool)
+        metrics["replica_async"] = pool_status(async_replica_engine.sync_engine.pool)
+    return metrics
+
 # Reports and Statistics
+def _month_start(db: Session, column):
+    """First day of the month of a date column"""
+    if db.get_bind().dialect.name == "postgresql":
+        return cast(func.date_trunc("month", column), Date)
+    return type_coerce(func.date(column, "start of month"), Date)
+
+def _month_series(db: Session, start: date, end: date):
+    """One row per month start from start's month through end's month"""
+    first, last = start.replace(day=1), end.replace(day=1)
+    if db.get_bind().dialect.name == "postgresql":
+        series = func.generate_series(first, last, literal_column("interval '1 month'"))
+        return select(cast(series.column_valued(), Date).label("month")).subquery("months")
+    months = select(literal(first, Date).label("month")).cte("months", recursive=True)
+    months = months.union_all(
+        select(type_coerce(func.date(months.c.month, "+1 month"), Date)).where(months.c.month < last)
+    )
+    return months
+
 @router.get("/reports/statistics")
 def get_reports_statistics(
-    db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    db: Session = Depends(get_read_db),
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
-    """Get statistics data for reports and graphs"""
-    from sqlalchemy import func, extract
-    
-    # Total users by status
-    total_users = db.query(User).filter(User.role == UserRole.OWNER).count()
-    active_users = db.query(User).filter(User.role == UserRole.OWNER, User.status == UserStatus.ACTIVE).count()
-    pending_users = db.query(User).filter(User.role == UserRole.OWNER, User.status == UserStatus.PENDING).count()
-    suspended_users = db.query(User).filter(User.role == UserRole.OWNER, User.status == UserStatus.SUSPENDED).count()
-    
-    # Total bookings by status
-    total_bookings = db.query(Booking).count()
-    confirmed_bookings = db.query(Booking).filter(Booking.status == BookingStatus.CONFIRMED).count()
-    pending_bookings = db.query(Booking).filter(Booking.status == BookingStatus.PENDING).count()
-    rejected_bookings = db.query(Booking).filter(Booking.status == BookingStatus.REJECTED).count()
-    cancelled_bookings = db.query(Booking).filter(Booking.status == BookingStatus.CANCELLED).count()
-    
-    # Users registered over last 12 months
-    twelve_months_ago = datetime.now() - timedelta(days=365)
-    users_over_time = db.query(
-        extract('year', User.created_at).label('year'),
-        extract('month', User.created_at).label('month'),
-        func.count(User.id).label('count')
-    ).filter(
-        User.created_at >= twelve_months_ago,
-        User.role == UserRole.OWNER
-    ).group_by(
-        extract('year', User.created_at),
-        extract('month', User.created_at)
-    ).order_by(
-        extract('year', User.created_at),
-        extract('month', User.created_at)
+    """Get statistics data for reports and graphs (read from the daily rollups, see rollups.py)"""
+    is_owner = and_(DailyStatistic.entity == "user", DailyStatistic.role == UserRole.OWNER.name)
+    is_booking = DailyStatistic.entity == "booking"
+    
+    def total(*conditions):
+        return func.coalesce(func.sum(DailyStatistic.count).filter(and_(*conditions)), 0)
+    
+    # Owners and bookings by status in one pass over the rollups
+    totals = db.execute(
+        select(
+            total(is_owner).label("users"),
+            total(is_owner, DailyStatistic.status == UserStatus.ACTIVE.name).label("active_users"),
+            total(is_owner, DailyStatistic.status == UserStatus.PENDING.name).label("pending_users"),
+            total(is_owner, DailyStatistic.status == UserStatus.SUSPENDED.name).label("suspended_users"),
+            total(is_booking).label("bookings"),
+            total(is_booking, DailyStatistic.status == BookingStatus.CONFIRMED.name).label("confirmed_bookings"),
+            total(is_booking, DailyStatistic.status == BookingStatus.PENDING.name).label("pending_bookings"),
+            total(is_booking, DailyStatistic.status == BookingStatus.REJECTED.name).label("rejected_bookings"),
+            total(is_booking, DailyStatistic.status == BookingStatus.CANCELLED.name).label("cancelled_bookings")
+        ).where(or_(is_owner, is_booking))
+    ).one()
+    total_users = totals.users
+    active_users = totals.active_users
+    pending_users = totals.pending_users
+    suspended_users = totals.suspended_users
+    total_bookings = totals.bookings
+    confirmed_bookings = totals.confirmed_bookings
+    pending_bookings = totals.pending_bookings
+    rejected_bookings = totals.rejected_bookings
+    cancelled_bookings = totals.cancelled_bookings
+    
+    # Owners registered and bookings created per month over the last 12 months, empty months included
+    twelve_months_ago = (datetime.now() - timedelta(days=365)).date()
+    months = _month_series(db, twelve_months_ago, date.today())
+    over_time = db.execute(
+        select(
+            months.c.month,
+            total(is_owner).label("users"),
+            total(is_booking).label("bookings")
+        ).select_from(
+            months.outerjoin(DailyStatistic, and_(
+                _month_start(db, DailyStatistic.day) == months.c.month,
+                DailyStatistic.day >= twelve_months_ago,
+                or_(is_owner, is_booking)
+            ))
+        ).group_by(months.c.month).order_by(months.c.month)
     ).all()
     
-    users_timeline = []
-    for row in users_over_time:
-        month_name = datetime(int(row.year), int(row.month), 1).strftime('%b %Y')
-        users_timeline.append({
-            'month': month_name,
-            'count': row.count
-        })
-    
-    # Bookings created over last 12 months
-    bookings_over_time = db.query(
-        extract('year', Booking.created_at).label('year'),
-        extract('month', Booking.created_at).label('month'),
-        func.count(Booking.id).label('count')
-    ).filter(
-        Booking.created_at >= twelve_months_ago
-    ).group_by(
-        extract('year', Booking.created_at),
-        extract('month', Booking.created_at)
-    ).order_by(
-        extract('year', Booking.created_at),
-        extract('month', Booking.created_at)
-    ).all()
-    
-    bookings_timeline = []
-    for row in bookings_over_time:
-        month_name = datetime(int(row.year), int(row.month), 1).strftime('%b %Y')
-        bookings_timeline.append({
-            'month': month_name,
-            'count': row.count
-        })
+    users_timeline = [{'month': row.month.strftime('%b %Y'), 'count': row.users} for row in over_time]
+    bookings_timeline = [{'month': row.month.strftime('%b %Y'), 'count': row.bookings} for row in over_time]
     
     # Bookings by status for pie chart
     bookings_by_status = [
@@ -1476,11 +1918,163 @@ def get_reports_statistics(
         }
     }
 
+# Occupancy and utilization analytics (see occupancy.py)
+@router.get("/reports/occupancy")
+def get_occupancy_report(
+    start_date: date,
+    end_date: date,
+    property_id: int = None,
+    db: Session = Depends(get_read_db),
+    admin: CurrentUser = Depends(get_current_admin_user)
+):
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    return occupancy_report(db, start_date, end_date, property_id)
+
+# Owner credit utilization: quota, balance and the period's credit flows for every owner
+CREDIT_UTILIZATION_COLUMNS = [
+    "user_id", "name", "email", "status", "property_id", "property_name",
+    "weekday_quota", "weekend_quota", "weekday_balance", "weekend_balance",
+    "weekday_escrowed", "weekend_escrowed", "weekday_consumed", "weekend_consumed",
+    "weekday_refunded", "weekend_refunded", "burn_rate", "quota_consumed"
+]
+CREDIT_FLOWS = (
+    "weekday_escrowed", "weekend_escrowed", "weekday_consumed", "weekend_consumed", "weekday_refunded", "weekend_refunded"
+)
+
+def _credit_period(start_date: date, end_date: date) -> tuple:
+    """Report period, defaulting to the current quota year up to today"""
+    start_date = start_date or date.today().replace(month=1, day=1)
+    end_date = end_date or date.today()
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    return start_date, end_date
+
+def _credit_utilization_query(start_date: date, end_date: date, property_id: int, status: UserStatus):
+    """
+    One row per owner with their credit flows for the period, plus window columns carrying
+    the owner count and flow totals across every owner matching the filters.
+    
+    Flows are counted from the period's quota transactions: credits of bookings requested in
+    the period that are now confirmed (consumed) or still pending (escrowed), and refunds.
+    """
+    is_request = QuotaTransaction.transaction_type == "booking"
+    
+    def flow(column, *conditions):
+        return func.coalesce(func.sum(column).filter(and_(*conditions)), 0)
+    
+    credits = select(
+        QuotaTransaction.user_id,
+        flow(-QuotaTransaction.weekday_change, is_request, Booking.status == BookingStatus.PENDING).label("weekday_escrowed"),
+        flow(-QuotaTransaction.weekend_change, is_request, Booking.status == BookingStatus.PENDING).label("weekend_escrowed"),
+        flow(-QuotaTransaction.weekday_change, is_request, Booking.status == BookingStatus.CONFIRMED).label("weekday_consumed"),
+        flow(-QuotaTransaction.weekend_change, is_request, Booking.status == BookingStatus.CONFIRMED).label("weekend_consumed"),
+        flow(QuotaTransaction.weekday_change, QuotaTransaction.transaction_type == "refund").label("weekday_refunded"),
+        flow(QuotaTransaction.weekend_change, QuotaTransaction.transaction_type == "refund").label("weekend_refunded")
+    ).outerjoin(Booking, Booking.id == QuotaTransaction.booking_id).where(
+        QuotaTransaction.transaction_type.in_(["booking", "refund"]),
+        QuotaTransaction.created_at >= datetime.combine(start_date, datetime.min.time()),
+        QuotaTransaction.created_at < datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+    ).group_by(QuotaTransaction.user_id).subquery("credits")
+    
+    flows = [func.coalesce(credits.c[name], 0).label(name) for name in CREDIT_FLOWS]
+    query = select(
+        User.id.label("user_id"), User.name, User.email, User.status, User.property_id,
+        Property.name.label("property_name"), User.weekday_quota, User.weekend_quota,
+        User.weekday_balance, User.weekend_balance, *flows,
+        func.count().over().label("total_owners"),
+        *[func.sum(func.coalesce(credits.c[name], 0)).over().label(f"total_{name}") for name in CREDIT_FLOWS]
+    ).outerjoin(Property, Property.id == User.property_id).outerjoin(
+        credits, credits.c.user_id == User.id
+    ).where(User.role == UserRole.OWNER)
+    if property_id:
+        query = query.where(User.property_id == property_id)
+    if status:
+        query = query.where(User.status == status)
+    return query.subquery("utilization")
+
+def _credit_utilization_entry(row, days: int) -> dict:
+    consumed = row.weekday_consumed + row.weekend_consumed
+    quota = (row.weekday_quota or 0) + (row.weekend_quota or 0)
+    entry = {name: getattr(row, name) for name in CREDIT_UTILIZATION_COLUMNS[:-2]}
+    entry["status"] = row.status.value if row.status else None
+    entry["burn_rate"] = round(consumed * 30 / days, 2)  # credits consumed per 30 days
+    entry["quota_consumed"] = round(consumed / quota, 4) if quota else None
+    return entry
+
+@router.get("/reports/credit-utilization")
+def get_credit_utilization(
+    start_date: date = None,
+    end_date: date = None,
+    property_id: int = None,
+    status: UserStatus = None,
+    cursor: str = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_read_db),
+    admin: CurrentUser = Depends(get_current_admin_user)
+):
+    """
+    Every owner's quota, balance and escrowed/consumed/refunded credits for the period
+    (default: this year so far), with burn rate in credits per 30 days, ordered by name.
+    
+    Returns up to `limit` owners; pass the returned `next_cursor` to get the next page.
+    `totals` covers every owner matching the filters, not just the page.
+    """
+    start_date, end_date = _credit_period(start_date, end_date)
+    days = (end_date - start_date).days + 1
+    utilization = _credit_utilization_query(start_date, end_date, property_id, status)
+    query = select(utilization)
+    if cursor:
+        after_name, after_id = _decode_name_cursor(cursor)
+        query = query.where(or_(
+            utilization.c.name > after_name,
+            and_(utilization.c.name == after_name, utilization.c.user_id > after_id)
+        ))
+    rows = db.execute(query.order_by(utilization.c.name, utilization.c.user_id).limit(limit + 1)).all()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = _encode_name_cursor(last.name, last.user_id)
+    totals = {"owners": rows[0].total_owners if rows else 0}
+    totals.update({name: int(getattr(rows[0], f"total_{name}")) if rows else 0 for name in CREDIT_FLOWS})
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "days": days,
+        "owners": [_credit_utilization_entry(row, days) for row in rows[:limit]],
+        "totals": totals,
+        "next_cursor": next_cursor
+    }
+
+@router.get("/export/credit-utilization")
+def export_credit_utilization(
+    request: Request,
+    format: str = Query("csv", pattern=EXPORT_FORMAT_PATTERN),
+    start_date: date = None,
+    end_date: date = None,
+    property_id: int = None,
+    status: UserStatus = None,
+    admin: CurrentUser = Depends(get_current_admin_user)
+):
+    """The credit-utilization report for every matching owner, streamed as CSV or NDJSON"""
+    start_date, end_date = _credit_period(start_date, end_date)
+    days = (end_date - start_date).days + 1
+    utilization = _credit_utilization_query(start_date, end_date, property_id, status)
+    query = select(utilization).order_by(utilization.c.name, utilization.c.user_id)
+    
+    def fetch(db: Session, batch_size: int):
+        for row in db.execute(query.execution_options(yield_per=batch_size)):
+            yield _credit_utilization_entry(row, days)
+    
+    filename = f"credit-utilization_{start_date}_to_{end_date}"
+    return stream_export(read_session_factory(request), fetch, CREDIT_UTILIZATION_COLUMNS, format, filename)
+
 # Email Configuration Endpoints
 @router.get("/email-config", response_model=EmailConfigResponse)
 def get_email_config(
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     """Get email configuration (password is not returned for security)"""
     config = db.query(EmailConfig).first()
@@ -1516,7 +2110,7 @@ def get_email_config(
 def create_or_update_email_config(
     config_data: EmailConfigCreate,
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     """Create or update email configuration"""
     existing_config = db.query(EmailConfig).first()
@@ -1533,6 +2127,10 @@ def create_or_update_email_config(
         existing_config.frontend_url = config_data.frontend_url
         existing_config.enabled = config_data.enabled
         existing_config.updated_at = datetime.utcnow()
+        record_event(
+            db, admin, "email_config.updated", "email_config", existing_config.id,
+            **config_data.dict(exclude={"smtp_password"})
+        )
         db.commit()
         db.refresh(existing_config)
         # Return without password for security
@@ -1554,6 +2152,11 @@ def create_or_update_email_config(
             raise HTTPException(status_code=400, detail="SMTP password is required for new configuration")
         new_config = EmailConfig(**config_data.dict(exclude_none=True))
         db.add(new_config)
+        db.flush()
+        record_event(
+            db, admin, "email_config.created", "email_config", new_config.id,
+            **config_data.dict(exclude={"smtp_password"})
+        )
         db.commit()
         db.refresh(new_config)
         # Return without password for security
@@ -1573,7 +2176,7 @@ def create_or_update_email_config(
 @router.get("/email-templates", response_model=List[EmailTemplateResponse])
 def get_email_templates(
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     """Get all email templates"""
     templates = db.query(EmailTemplate).all()
@@ -1583,7 +2186,7 @@ def get_email_templates(
 def get_email_template(
     template_type: str,
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     """Get specific email template"""
     template = db.query(EmailTemplate).filter(EmailTemplate.template_type == template_type).first()
@@ -1596,7 +2199,7 @@ def update_email_template(
     template_type: str,
     template_data: EmailTemplateUpdate,
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     """Update or create email template (upsert)"""
     template = db.query(EmailTemplate).filter(EmailTemplate.template_type == template_type).first()
@@ -1613,6 +2216,7 @@ def update_email_template(
             text_body=template_data.text_body or None
         )
         db.add(new_template)
+        record_event(db, admin, "email_template.created", "email_template", template_type)
         db.commit()
         db.refresh(new_template)
         return new_template
@@ -1628,6 +2232,7 @@ def update_email_template(
         template.text_body = None
     
     template.updated_at = datetime.utcnow()
+    record_event(db, admin, "email_template.updated", "email_template", template_type)
     db.commit()
     db.refresh(template)
     return template
@@ -1636,7 +2241,7 @@ def update_email_template(
 def create_email_template(
     template_data: EmailTemplateCreate,
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     """Create email template"""
     existing = db.query(EmailTemplate).filter(EmailTemplate.template_type == template_data.template_type).first()
@@ -1645,6 +2250,7 @@ def create_email_template(
     
     new_template = EmailTemplate(**template_data.dict())
     db.add(new_template)
+    record_event(db, admin, "email_template.created", "email_template", template_data.template_type)
     db.commit()
     db.refresh(new_template)
     return new_template
@@ -1653,7 +2259,7 @@ def create_email_template(
 def test_email_config(
     test_data: TestEmailRequest,
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin_user)
+    admin: CurrentUser = Depends(get_current_admin_user)
 ):
     """Send a test email to verify configuration"""
     config = db.query(EmailConfig).first()
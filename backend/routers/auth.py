@@ -1,12 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from database import get_db
 from models import User, UserStatus, UserRole, EmailConfig
-from schemas import UserRegister, UserLogin, Token, UserResponse, ForgotPassword, ResetPassword
-from auth import verify_password, get_password_hash, create_access_token, get_current_user
+from schemas import UserRegister, UserLogin, Token, UserResponse, ForgotPassword, ResetPassword, RefreshTokenRequest
+from auth import (
+    verify_password_async, get_password_hash, get_password_hash_async, password_needs_rehash, hash_token, create_token_pair,
+    decode_refresh_token, get_current_user_row, REFRESH_TOKEN_EXPIRE_DAYS
+)
 from datetime import timedelta, datetime
 import secrets
 from email_service import send_registration_confirmation_email, send_email_verified_notification
+from rate_limit import check_login_rate_limit
+from token_revocation import revoke_refresh_token, revoke_user_tokens, is_refresh_token_revoked
+from audit import record_event
 from sqlalchemy.orm import Session
 
 router = APIRouter()
@@ -31,10 +40,12 @@ def register(user_data: UserRegister, db: Session = Depends(get_db)):
         password_hash=hashed_password,
         status="pending",
         email_verified=False,
-        verification_token=verification_token,
+        verification_token=hash_token(verification_token),
         verification_token_expires=verification_expires
     )
     db.add(db_user)
+    db.flush()
+    record_event(db, db_user, "user.registered", "user", db_user.id, name=db_user.name)
     db.commit()
     db.refresh(db_user)
     
@@ -43,8 +54,8 @@ def register(user_data: UserRegister, db: Session = Depends(get_db)):
         email_config = db.query(EmailConfig).filter(EmailConfig.enabled == True).first()
         if email_config:
             send_registration_confirmation_email(
-                db_user.email, 
-                db_user.name, 
+                db_user.email,
+                db_user.name,
                 verification_token,
                 frontend_url=email_config.frontend_url,
                 smtp_server=email_config.smtp_server,
@@ -62,27 +73,23 @@ def register(user_data: UserRegister, db: Session = Depends(get_db)):
     
     return db_user
 
-@router.post("/login", response_model=Token)
-def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
+def _find_login_user(user_credentials: UserLogin, request: Request, db: Session) -> Optional[User]:
+    # Throttle before touching the database or bcrypt
+    check_login_rate_limit(request, user_credentials.email)
+    
     try:
-        user = db.query(User).filter(User.email == user_credentials.email).first()
+        return db.query(User).filter(User.email == user_credentials.email).first()
     except Exception as e:
         # If query fails due to missing columns, provide helpful error message
         error_msg = str(e).lower()
         if 'email_verified' in error_msg or 'verification_token' in error_msg or 'column' in error_msg:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Database schema needs to be updated. Please run: cd backend && python add_email_columns.py"
+                detail="Database schema needs to be updated. Please run: cd backend && alembic upgrade head"
             )
         raise
-    
-    if not user or not verify_password(user_credentials.password, user.password_hash):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect email or password",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
+
+def _check_login_allowed(user: User, db: Session):
     # Admin users can always login (bypass email verification and status checks)
     if user.role == UserRole.ADMIN:
         # For admin users, try to set email_verified if column exists
@@ -118,16 +125,84 @@ def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Your account is pending admin approval. You will receive an email notification once your account is approved.",
             )
+
+def _complete_login(user: User, new_password_hash: Optional[str], db: Session) -> dict:
+    rehashed = new_password_hash is not None
+    if rehashed:
+        user.password_hash = new_password_hash
+    
+    record_event(db, user, "auth.login", "user", user.id, password_rehashed=rehashed)
+    # Build the tokens before the commit expires the user row (saves a reload)
+    tokens = create_token_pair(user)
+    db.commit()
+    
+    return tokens
+
+@router.post("/login", response_model=Token)
+async def login(user_credentials: UserLogin, request: Request, db: Session = Depends(get_db)):
+    # The session is synchronous, so its work runs in the threadpool; bcrypt is awaited on
+    # its own pool so no threadpool thread sits blocked while a hash is computed
+    user = await run_in_threadpool(_find_login_user, user_credentials, request, db)
+    password_hash = user.password_hash if user else None
+    
+    if not user or not await verify_password_async(user_credentials.password, password_hash):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect email or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    await run_in_threadpool(_check_login_allowed, user, db)
+    
+    # Upgrade hashes made with an outdated bcrypt cost while we have the plain password
+    new_password_hash = None
+    if password_needs_rehash(password_hash):
+        new_password_hash = await get_password_hash_async(user_credentials.password)
     
-    access_token_expires = timedelta(minutes=30)
-    access_token = create_access_token(
-        data={"sub": user.email, "user_id": user.id, "role": user.role},
-        expires_delta=access_token_expires
+    return await run_in_threadpool(_complete_login, user, new_password_hash, db)
+
+@router.post("/refresh", response_model=Token)
+def refresh_access_token(refresh_data: RefreshTokenRequest, db: Session = Depends(get_db)):
+    """Exchange a refresh token for a new access/refresh pair (the old refresh token is revoked)"""
+    invalid_token = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid or expired refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
     )
-    return {"access_token": access_token, "token_type": "bearer"}
+    payload = decode_refresh_token(refresh_data.refresh_token)
+    if payload is None:
+        raise invalid_token
+    
+    user = db.query(User).filter(User.email == payload["sub"]).first()
+    if not user or user.id != payload.get("user_id"):
+        raise invalid_token
+    
+    def reject_replay():
+        # A rotated token being replayed means it leaked; cut off every token for this user
+        revoke_user_tokens(db, user.id, timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
+        record_event(db, user, "auth.refresh_token_replayed", "user", user.id, jti=payload["jti"])
+        db.commit()
+        raise invalid_token
+    
+    if is_refresh_token_revoked(db, payload["jti"], user.id, payload.get("iat", 0)):
+        reject_replay()
+    
+    if user.role != UserRole.ADMIN and user.status != UserStatus.ACTIVE:
+        raise invalid_token
+    
+    revoke_refresh_token(db, payload["jti"], user.id, payload["exp"])
+    try:
+        db.flush()
+    except IntegrityError:
+        # A concurrent request exchanged the same token between our check and this insert
+        db.rollback()
+        reject_replay()
+    record_event(db, user, "auth.token_refreshed", "user", user.id, jti=payload["jti"])
+    db.commit()
+    return create_token_pair(user)
 
 @router.get("/me", response_model=UserResponse)
-def get_current_user_info(current_user: User = Depends(get_current_user)):
+def get_current_user_info(current_user: User = Depends(get_current_user_row)):
     return current_user
 
 @router.post("/forgot-password")
@@ -139,8 +214,9 @@ def forgot_password(forgot_data: ForgotPassword, db: Session = Depends(get_db)):
     
     # Generate reset token (valid for 1 hour)
     reset_token = secrets.token_urlsafe(32)
-    user.reset_token = reset_token
+    user.reset_token = hash_token(reset_token)
     user.reset_token_expires = datetime.utcnow() + timedelta(hours=1)
+    record_event(db, user, "auth.password_reset_requested", "user", user.id)
     db.commit()
     
     # In production, send email with reset link
@@ -153,7 +229,7 @@ def forgot_password(forgot_data: ForgotPassword, db: Session = Depends(get_db)):
 
 @router.post("/reset-password")
 def reset_password(reset_data: ResetPassword, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.reset_token == reset_data.token).first()
+    user = db.query(User).filter(User.reset_token == hash_token(reset_data.token)).first()
     
     if not user:
         raise HTTPException(status_code=400, detail="Invalid or expired reset token")
@@ -165,6 +241,7 @@ def reset_password(reset_data: ResetPassword, db: Session = Depends(get_db)):
     user.password_hash = get_password_hash(reset_data.new_password)
     user.reset_token = None
     user.reset_token_expires = None
+    record_event(db, user, "auth.password_reset", "user", user.id)
     db.commit()
     
     return {"message": "Password reset successfully"}
@@ -172,45 +249,13 @@ def reset_password(reset_data: ResetPassword, db: Session = Depends(get_db)):
 @router.get("/verify-email")
 def verify_email(token: str, db: Session = Depends(get_db)):
     """Verify email address using verification token"""
-    from urllib.parse import unquote
     from datetime import timezone
     
-    print(f"=== Email Verification Request ===")
-    print(f"Token received: {token}")
-    print(f"Token length: {len(token)}")
+    # Tokens are stored as digests, so this is a single indexed lookup
+    user = db.query(User).filter(User.verification_token == hash_token(token)).first()
     
-    # FastAPI automatically URL-decodes query parameters, but handle both cases
-    # Try with the token as-is first (FastAPI should have decoded it)
-    user = db.query(User).filter(User.verification_token == token).first()
-    print(f"User found with original token: {user is not None}")
-    
-    # If not found, try URL decoding (in case it wasn't decoded)
     if not user:
-        decoded_token = unquote(token)
-        print(f"Trying decoded token: {decoded_token[:30]}... (different: {decoded_token != token})")
-        if decoded_token != token:
-            user = db.query(User).filter(User.verification_token == decoded_token).first()
-            print(f"User found with decoded token: {user is not None}")
-    
-    # Also try double-decoding in case it was encoded twice
-    if not user:
-        double_decoded = unquote(unquote(token))
-        if double_decoded != token and double_decoded != decoded_token:
-            print(f"Trying double-decoded token: {double_decoded[:30]}...")
-            user = db.query(User).filter(User.verification_token == double_decoded).first()
-            print(f"User found with double-decoded token: {user is not None}")
-    
-    if not user:
-        # Check if there are any users with tokens at all
-        users_with_tokens = db.query(User).filter(User.verification_token.isnot(None)).all()
-        print(f"Total users with tokens in DB: {len(users_with_tokens)}")
-        if users_with_tokens:
-            sample_token = users_with_tokens[0].verification_token
-            print(f"Sample token from DB: {sample_token[:30]}... (length: {len(sample_token)})")
-            print(f"Tokens match: {token == sample_token}")
-        
-        # Log for debugging
-        print(f"Verification failed: Token not found. Token received: {token[:20]}... (length: {len(token)})")
+        print(f"Verification failed: Token not found (length: {len(token)})")
         raise HTTPException(status_code=400, detail="Invalid or expired verification token")
     
     if user.email_verified:
@@ -238,6 +283,7 @@ def verify_email(token: str, db: Session = Depends(get_db)):
     user.verification_token = None
     user.verification_token_expires = None
     # User status remains "pending" until admin approval
+    record_event(db, user, "user.email_verified", "user", user.id)
     db.commit()
     
     print(f"Email verified successfully for user: {user.email}")
@@ -247,7 +293,7 @@ def verify_email(token: str, db: Session = Depends(get_db)):
         email_config = db.query(EmailConfig).filter(EmailConfig.enabled == True).first()
         if email_config:
             send_email_verified_notification(
-                user.email, 
+                user.email,
                 user.name,
                 smtp_server=email_config.smtp_server,
                 smtp_port=email_config.smtp_port,
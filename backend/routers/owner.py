@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, or_, select, func
 from typing import List
 from datetime import date, datetime, timedelta
-from database import get_db
+from database import get_db, get_async_db, AsyncSessionLocal
+from replica import get_async_read_db
 from models import (
     User, Property, Cottage, Booking, MaintenanceBlock, SystemCalendar,
     BookingStatus, UserStatus, QuotaTransaction
@@ -12,31 +14,100 @@ from schemas import (
     UserResponse, BookingCreate, BookingUpdate, BookingResponse, CottageResponse,
     QuotaTransactionResponse, DateAvailability, CottageAvailability
 )
-from auth import get_current_active_user
+from auth import (
+    CurrentUser, get_current_active_user, get_current_active_user_async, get_current_active_user_row,
+    get_current_active_user_row_async, get_current_user_async, oauth2_scheme
+)
+from audit import record_event
+import change_feed
+import live_updates
 import calendar
 
 router = APIRouter()
 
+ACTIVE_BOOKING_STATUSES = [BookingStatus.PENDING, BookingStatus.CONFIRMED]
+
+def _credit_breakdown(check_in: date, check_out: date, calendar_by_date: dict) -> dict:
+    """Weekday/weekend credits for a stay, given the SystemCalendar rows in [check_in, check_out)"""
+    weekday_count = 0
+    weekend_count = 0
+    holidays = 0
+    peak_season_days = 0
+    current = check_in
+    
+    while current < check_out:
+        calendar_entry = calendar_by_date.get(current)
+        
+        is_holiday = calendar_entry.is_holiday if calendar_entry else False
+        is_peak_season = calendar_entry.is_peak_season if calendar_entry else False
+        is_weekend = current.weekday() >= 5
+        
+        if is_weekend or is_holiday or is_peak_season:
+            weekend_count += 1
+        else:
+            weekday_count += 1
+        if is_holiday:
+            holidays += 1
+        if is_peak_season:
+            peak_season_days += 1
+        
+        current += timedelta(days=1)
+    
+    return {
+        "weekday_credits": weekday_count,
+        "weekend_credits": weekend_count,
+        "total_credits": weekday_count + weekend_count,
+        "breakdown": {
+            "weekdays": weekday_count,
+            "weekends": weekend_count,
+            "holidays": holidays,
+            "peak_season_days": peak_season_days
+        }
+    }
+
+def _calendar_range_query(start: date, end_exclusive: date):
+    return select(SystemCalendar).filter(
+        SystemCalendar.date >= start,
+        SystemCalendar.date < end_exclusive
+    )
+
+def _booking_cost(booking_data: BookingCreate, current_user: User, db: Session) -> dict:
+    """Synchronous cost calculation used by create_booking and update_booking"""
+    cottage = db.query(Cottage).filter(Cottage.id == booking_data.cottage_id).first()
+    if not cottage:
+        raise HTTPException(status_code=404, detail="Cottage not found")
+    
+    if cottage.property_id != current_user.property_id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    entries = db.execute(_calendar_range_query(booking_data.check_in, booking_data.check_out)).scalars().all()
+    return _credit_breakdown(booking_data.check_in, booking_data.check_out, {e.date: e for e in entries})
+
 # OWN-03: Property Context
 @router.get("/dashboard")
-def get_dashboard(
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+async def get_dashboard(
+    current_user: User = Depends(get_current_active_user_row_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     if not current_user.property_id:
         raise HTTPException(status_code=400, detail="User not assigned to a property")
     
-    property_obj = db.query(Property).filter(Property.id == current_user.property_id).first()
-    cottages = db.query(Cottage).filter(Cottage.property_id == current_user.property_id).all()
-    
-    # Get pending bookings count
-    pending_bookings = db.query(Booking).filter(
-        Booking.user_id == current_user.id,
-        Booking.status == BookingStatus.PENDING
-    ).all()
-    
-    pending_weekday = sum(b.weekday_credits_used for b in pending_bookings)
-    pending_weekend = sum(b.weekend_credits_used for b in pending_bookings)
+    property_obj = await db.get(Property, current_user.property_id)
+    cottages = (await db.execute(
+        select(Cottage).filter(Cottage.property_id == current_user.property_id)
+    )).scalars().all()
+    
+    # Credits escrowed in pending bookings
+    pending = (await db.execute(
+        select(
+            func.coalesce(func.sum(Booking.weekday_credits_used), 0),
+            func.coalesce(func.sum(Booking.weekend_credits_used), 0)
+        ).filter(
+            Booking.user_id == current_user.id,
+            Booking.status == BookingStatus.PENDING
+        )
+    )).one()
+    pending_weekday, pending_weekend = int(pending[0]), int(pending[1])
     
     return {
         "user": current_user,
@@ -50,14 +121,14 @@ def get_dashboard(
 
 # OWN-04, OWN-05: Real-Time Availability & Holiday Transparency
 @router.get("/availability/{cottage_id}", response_model=CottageAvailability)
-def get_cottage_availability(
+async def get_cottage_availability(
     cottage_id: int,
     start_date: date,
     end_date: date,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    cottage = db.query(Cottage).filter(Cottage.id == cottage_id).first()
+    cottage = await db.get(Cottage, cottage_id)
     if not cottage:
         raise HTTPException(status_code=404, detail="Cottage not found")
     
@@ -65,30 +136,35 @@ def get_cottage_availability(
     if cottage.property_id != current_user.property_id:
         raise HTTPException(status_code=403, detail="Access denied to this cottage")
     
+    # Fetch everything overlapping the range once instead of querying per day
+    bookings = (await db.execute(
+        select(Booking.check_in, Booking.check_out).filter(
+            Booking.cottage_id == cottage_id,
+            Booking.check_in <= end_date,
+            Booking.check_out > start_date,
+            Booking.status.in_(ACTIVE_BOOKING_STATUSES)
+        )
+    )).all()
+    maintenance_blocks = (await db.execute(
+        select(MaintenanceBlock.start_date, MaintenanceBlock.end_date).filter(
+            MaintenanceBlock.cottage_id == cottage_id,
+            MaintenanceBlock.start_date <= end_date,
+            MaintenanceBlock.end_date >= start_date
+        )
+    )).all()
+    calendar_entries = (await db.execute(
+        _calendar_range_query(start_date, end_date + timedelta(days=1))
+    )).scalars().all()
+    calendar_by_date = {entry.date: entry for entry in calendar_entries}
+    
     availability = []
     current = start_date
     
     while current <= end_date:
-        # Check if booked
-        booking = db.query(Booking).filter(
-            Booking.cottage_id == cottage_id,
-            Booking.check_in <= current,
-            Booking.check_out > current,
-            Booking.status.in_([BookingStatus.PENDING, BookingStatus.CONFIRMED])
-        ).first()
-        
-        # Check if maintenance
-        maintenance = db.query(MaintenanceBlock).filter(
-            MaintenanceBlock.cottage_id == cottage_id,
-            MaintenanceBlock.start_date <= current,
-            MaintenanceBlock.end_date >= current
-        ).first()
-        
-        # Check if holiday or peak season
-        calendar_entry = db.query(SystemCalendar).filter(
-            SystemCalendar.date == current
-        ).first()
+        is_booked = any(b.check_in <= current < b.check_out for b in bookings)
+        is_maintenance = any(m.start_date <= current <= m.end_date for m in maintenance_blocks)
         
+        calendar_entry = calendar_by_date.get(current)
         is_holiday = calendar_entry.is_holiday if calendar_entry else False
         is_peak_season = calendar_entry.is_peak_season if calendar_entry else False
         
@@ -98,9 +174,9 @@ def get_cottage_availability(
         
         availability.append(DateAvailability(
             date=current,
-            is_available=not booking and not maintenance,
-            is_booked=bool(booking),
-            is_maintenance=bool(maintenance),
+            is_available=not is_booked and not is_maintenance,
+            is_booked=is_booked,
+            is_maintenance=is_maintenance,
             is_holiday=is_holiday,
             is_peak_season=is_peak_season,
             cost_weekday=cost_weekday
@@ -116,60 +192,28 @@ def get_cottage_availability(
 
 # OWN-06: Cost Calculator
 @router.post("/calculate-cost")
-def calculate_cost(
+async def calculate_cost(
     booking_data: BookingCreate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    cottage_id = booking_data.cottage_id
-    check_in = booking_data.check_in
-    check_out = booking_data.check_out
-    cottage = db.query(Cottage).filter(Cottage.id == cottage_id).first()
+    cottage = await db.get(Cottage, booking_data.cottage_id)
     if not cottage:
         raise HTTPException(status_code=404, detail="Cottage not found")
     
     if cottage.property_id != current_user.property_id:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    weekday_count = 0
-    weekend_count = 0
-    current = check_in
-    
-    while current < check_out:
-        calendar_entry = db.query(SystemCalendar).filter(
-            SystemCalendar.date == current
-        ).first()
-        
-        is_holiday = calendar_entry.is_holiday if calendar_entry else False
-        is_peak_season = calendar_entry.is_peak_season if calendar_entry else False
-        is_weekend = current.weekday() >= 5
-        
-        if is_weekend or is_holiday or is_peak_season:
-            weekend_count += 1
-        else:
-            weekday_count += 1
-        
-        current += timedelta(days=1)
-    
-    return {
-        "weekday_credits": weekday_count,
-        "weekend_credits": weekend_count,
-        "total_credits": weekday_count + weekend_count,
-        "breakdown": {
-            "weekdays": weekday_count,
-            "weekends": weekend_count,
-            "holidays": sum(1 for d in [check_in + timedelta(days=i) for i in range((check_out - check_in).days)]
-                           if db.query(SystemCalendar).filter(SystemCalendar.date == d, SystemCalendar.is_holiday == True).first()),
-            "peak_season_days": sum(1 for d in [check_in + timedelta(days=i) for i in range((check_out - check_in).days)]
-                                  if db.query(SystemCalendar).filter(SystemCalendar.date == d, SystemCalendar.is_peak_season == True).first())
-        }
-    }
+    entries = (await db.execute(
+        _calendar_range_query(booking_data.check_in, booking_data.check_out)
+    )).scalars().all()
+    return _credit_breakdown(booking_data.check_in, booking_data.check_out, {e.date: e for e in entries})
 
 # OWN-07: Submit Request
 @router.post("/bookings", response_model=BookingResponse)
 def create_booking(
     booking_data: BookingCreate,
-    current_user: User = Depends(get_current_active_user),
+    current_user: User = Depends(get_current_active_user_row),
     db: Session = Depends(get_db)
 ):
     cottage = db.query(Cottage).filter(Cottage.id == booking_data.cottage_id).first()
@@ -180,11 +224,7 @@ def create_booking(
         raise HTTPException(status_code=403, detail="Access denied")
     
     # Calculate cost
-    cost_result = calculate_cost(
-        booking_data=booking_data,
-        current_user=current_user,
-        db=db
-    )
+    cost_result = _booking_cost(booking_data, current_user, db)
     
     # Check availability
     current = booking_data.check_in
@@ -251,6 +291,7 @@ def create_booking(
         weekend_credits_used=cost_result["weekend_credits"]
     )
     db.add(db_booking)
+    db.flush()
     
     # Create transaction record
     transaction = QuotaTransaction(
@@ -262,6 +303,12 @@ def create_booking(
         description=f"Booking request for {cottage.cottage_id}"
     )
     db.add(transaction)
+    record_event(
+        db, current_user, "booking.requested", "booking", db_booking.id,
+        cottage_id=db_booking.cottage_id, check_in=db_booking.check_in, check_out=db_booking.check_out,
+        weekday_credits_used=db_booking.weekday_credits_used,
+        weekend_credits_used=db_booking.weekend_credits_used
+    )
     
     db.commit()
     db.refresh(db_booking)
@@ -269,25 +316,24 @@ def create_booking(
 
 # OWN-08, OWN-09: Balance Dashboard & Escrow Visibility
 @router.get("/quota-status")
-def get_quota_status(
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+async def get_quota_status(
+    current_user: User = Depends(get_current_active_user_row_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    pending_bookings = db.query(Booking).filter(
-        Booking.user_id == current_user.id,
-        Booking.status == BookingStatus.PENDING
-    ).all()
-    
-    confirmed_bookings = db.query(Booking).filter(
-        Booking.user_id == current_user.id,
-        Booking.status == BookingStatus.CONFIRMED
-    ).all()
-    
-    pending_weekday = sum(b.weekday_credits_used for b in pending_bookings)
-    pending_weekend = sum(b.weekend_credits_used for b in pending_bookings)
+    totals = (await db.execute(
+        select(
+            Booking.status,
+            func.sum(Booking.weekday_credits_used),
+            func.sum(Booking.weekend_credits_used)
+        ).filter(
+            Booking.user_id == current_user.id,
+            Booking.status.in_(ACTIVE_BOOKING_STATUSES)
+        ).group_by(Booking.status)
+    )).all()
+    credits = {row[0]: (int(row[1] or 0), int(row[2] or 0)) for row in totals}
     
-    confirmed_weekday = sum(b.weekday_credits_used for b in confirmed_bookings)
-    confirmed_weekend = sum(b.weekend_credits_used for b in confirmed_bookings)
+    pending_weekday, pending_weekend = credits.get(BookingStatus.PENDING, (0, 0))
+    confirmed_weekday, confirmed_weekend = credits.get(BookingStatus.CONFIRMED, (0, 0))
     
     return {
         "weekday_quota": current_user.weekday_quota,
@@ -309,7 +355,7 @@ def get_quota_status(
 # OWN-10: Transaction History
 @router.get("/transactions", response_model=List[QuotaTransactionResponse])
 def get_transactions(
-    current_user: User = Depends(get_current_active_user),
+    current_user: CurrentUser = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     transactions = db.query(QuotaTransaction).filter(
@@ -319,24 +365,25 @@ def get_transactions(
 
 # OWN-11: Trip Status Tracking
 @router.get("/my-trips")
-def get_my_trips(
+async def get_my_trips(
     status: BookingStatus = None,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    query = db.query(Booking).filter(Booking.user_id == current_user.id)
+    query = select(Booking, Cottage.cottage_id).outerjoin(
+        Cottage, Cottage.id == Booking.cottage_id
+    ).filter(Booking.user_id == current_user.id)
     if status:
         query = query.filter(Booking.status == status)
     
-    bookings = query.order_by(Booking.check_in.desc()).all()
+    rows = (await db.execute(query.order_by(Booking.check_in.desc()))).all()
     
     result = []
-    for booking in bookings:
-        cottage = db.query(Cottage).filter(Cottage.id == booking.cottage_id).first()
+    for booking, cottage_name in rows:
         result.append({
             "id": booking.id,
             "cottage_id": booking.cottage_id,
-            "cottage_name": cottage.cottage_id if cottage else "Unknown",
+            "cottage_name": cottage_name if cottage_name else "Unknown",
             "check_in": booking.check_in,
             "check_out": booking.check_out,
             "status": booking.status,
@@ -347,11 +394,62 @@ def get_my_trips(
     
     return result
 
+# Delta sync for My Trips (see change_feed.py)
+@router.get("/bookings/changes")
+async def get_my_booking_changes(
+    since: int = Query(None, ge=0),
+    limit: int = Query(500, ge=1, le=5000),
+    current_user: CurrentUser = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Your bookings created, updated or deleted after the `since` cursor (as in GET /api/admin/bookings/changes)"""
+    sequence = (await db.execute(change_feed.sequence_query())).one()
+    if since is None:
+        return {"changes": [], "cursor": sequence.value, "has_more": False}
+    change_feed.check_cursor(sequence, since)
+    booking_ids, cursor, has_more = change_feed.latest_changes(
+        (await db.execute(change_feed.changes_query(since, limit, current_user.id))).all(), limit
+    )
+    if not booking_ids:
+        return {"changes": [], "cursor": since, "has_more": False}
+    rows = (await db.execute(change_feed.bookings_query(booking_ids))).all()
+    return change_feed.feed_response(booking_ids, rows, cursor, has_more)
+
+# Push updates for the availability screen (see live_updates.py)
+@router.get("/live")
+async def stream_availability_updates(
+    cottages: List[int] = Query(None),
+    token: str = Depends(oauth2_scheme)
+):
+    """
+    Server-Sent Events stream of booking and maintenance changes for cottages in your property.
+    
+    Pass `cottages` (repeatable) to follow only some of them; by default all are followed.
+    """
+    # A short-lived session: the stream itself must not hold a database connection
+    async with AsyncSessionLocal() as db:
+        current_user = await get_current_active_user_async(await get_current_user_async(token, db))
+        if not current_user.property_id:
+            raise HTTPException(status_code=400, detail="User not assigned to a property")
+        allowed = set((await db.execute(
+            select(Cottage.id).filter(Cottage.property_id == current_user.property_id)
+        )).scalars())
+        cursor = (await db.execute(change_feed.sequence_query())).one().value
+    followed = set(cottages) if cottages else allowed
+    if not followed:
+        raise HTTPException(status_code=400, detail="No cottages to follow in your property")
+    if not followed <= allowed:
+        raise HTTPException(status_code=403, detail="Access denied to this cottage")
+    return live_updates.event_stream(
+        {live_updates.cottage_topic(cottage_id) for cottage_id in followed},
+        {"cursor": cursor, "cottages": sorted(followed), "approvals": False}
+    )
+
 # OWN-12: Self-Cancellation
 @router.post("/cancel-booking/{booking_id}")
 def cancel_booking(
     booking_id: int,
-    current_user: User = Depends(get_current_active_user),
+    current_user: User = Depends(get_current_active_user_row),
     db: Session = Depends(get_db)
 ):
     booking = db.query(Booking).filter(
@@ -383,6 +481,7 @@ def cancel_booking(
         description="Booking cancelled by user - quota refunded"
     )
     db.add(transaction)
+    record_event(db, current_user, "booking.cancelled", "booking", booking.id)
     db.commit()
     db.refresh(booking)
     return booking
@@ -391,7 +490,7 @@ def cancel_booking(
 @router.get("/booking-receipt/{booking_id}")
 def get_booking_receipt(
     booking_id: int,
-    current_user: User = Depends(get_current_active_user),
+    current_user: CurrentUser = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     booking = db.query(Booking).filter(
@@ -429,7 +528,7 @@ def get_booking_receipt(
 def update_booking(
     booking_id: int,
     booking_update: BookingUpdate,
-    current_user: User = Depends(get_current_active_user),
+    current_user: User = Depends(get_current_active_user_row),
     db: Session = Depends(get_db)
 ):
     booking = db.query(Booking).filter(
@@ -446,6 +545,8 @@ def update_booking(
             detail="Only pending bookings can be edited. Please cancel and create a new booking."
         )
     
+    previous = {"cottage_id": booking.cottage_id, "check_in": booking.check_in, "check_out": booking.check_out}
+    
     # Determine what to update
     new_cottage_id = booking_update.cottage_id if booking_update.cottage_id is not None else booking.cottage_id
     new_check_in = booking_update.check_in if booking_update.check_in is not None else booking.check_in
@@ -496,14 +597,14 @@ def update_booking(
             current += timedelta(days=1)
         
         # Calculate new cost
-        cost_result = calculate_cost(
-            booking_data=BookingCreate(
+        cost_result = _booking_cost(
+            BookingCreate(
                 cottage_id=new_cottage_id,
                 check_in=new_check_in,
                 check_out=new_check_out
             ),
-            current_user=current_user,
-            db=db
+            current_user,
+            db
         )
         
         # Check if user has enough credits (including the refunded ones)
@@ -552,6 +653,13 @@ def update_booking(
             transaction.weekend_change = -cost_result["weekend_credits"]
             transaction.description = f"Booking updated for {cottage.cottage_id}"
     
+    record_event(
+        db, current_user, "booking.updated", "booking", booking.id,
+        previous=previous,
+        cottage_id=new_cottage_id, check_in=new_check_in, check_out=new_check_out,
+        weekday_credits_used=booking.weekday_credits_used,
+        weekend_credits_used=booking.weekend_credits_used
+    )
     db.commit()
     db.refresh(booking)
     return booking
@@ -560,7 +668,7 @@ def update_booking(
 @router.delete("/bookings/{booking_id}")
 def delete_booking(
     booking_id: int,
-    current_user: User = Depends(get_current_active_user),
+    current_user: User = Depends(get_current_active_user_row),
     db: Session = Depends(get_db)
 ):
     booking = db.query(Booking).filter(
@@ -594,6 +702,10 @@ def delete_booking(
     
     # Delete booking
     db.delete(booking)
+    record_event(
+        db, current_user, "booking.deleted", "booking", booking_id,
+        cottage_id=booking.cottage_id, check_in=booking.check_in, check_out=booking.check_out
+    )
     db.commit()
     
     return {"message": "Booking deleted successfully"}
@@ -0,0 +1,132 @@
+"""
+Periodic maintenance jobs run inside the API workers
+
+Jobs are plain functions that open their own session; main.py starts the
+scheduler on startup. Jobs that refresh per-worker state run in every worker;
+jobs that rewrite shared tables (purges, rollup and projection rebuilds) only
+run in the worker holding the scheduler's Postgres advisory lock, so N workers
+don't take the same table locks N times. They can also be run once from the
+command line:
+    cd backend
+    python tasks.py
+"""
+import asyncio
+import os
+import threading
+from datetime import datetime, timezone
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.pool import NullPool
+from starlette.concurrency import run_in_threadpool
+from database import SessionLocal, engine
+from models import User
+from token_revocation import sync_revocations, purge_expired_revocations
+from rollups import rebuild_rollups
+from calendar_projection import rebuild_projection
+from change_feed import purge_booking_changes
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TOKEN_PURGE_INTERVAL_MINUTES = int(os.getenv("TOKEN_PURGE_INTERVAL_MINUTES", "60"))
+REVOCATION_SYNC_INTERVAL_MINUTES = float(os.getenv("REVOCATION_SYNC_INTERVAL_MINUTES", "0.5"))
+# Rollups and the calendar projection are maintained on every write; the rebuild only corrects drift from writes outside the ORM
+STATISTICS_REBUILD_INTERVAL_MINUTES = float(os.getenv("STATISTICS_REBUILD_INTERVAL_MINUTES", "1440"))
+CALENDAR_REBUILD_INTERVAL_MINUTES = float(os.getenv("CALENDAR_REBUILD_INTERVAL_MINUTES", "1440"))
+SYNC_CHANGE_PURGE_INTERVAL_MINUTES = float(os.getenv("SYNC_CHANGE_PURGE_INTERVAL_MINUTES", "60"))
+
+def purge_expired_tokens() -> int:
+    """Clear expired verification/reset tokens and revocation rows so their indexes stay small"""
+    purged_revocations = purge_expired_revocations()
+    db = SessionLocal()
+    try:
+        now = datetime.now(timezone.utc)
+        verification = db.query(User).filter(
+            User.verification_token.isnot(None),
+            User.verification_token_expires < now
+        ).update({User.verification_token: None, User.verification_token_expires: None}, synchronize_session=False)
+        reset = db.query(User).filter(
+            User.reset_token.isnot(None),
+            User.reset_token_expires < now
+        ).update({User.reset_token: None, User.reset_token_expires: None}, synchronize_session=False)
+        db.commit()
+        return verification + reset + purged_revocations
+    finally:
+        db.close()
+
+class SchedulerLock:
+    """Session-level advisory lock that elects the one worker running the database-wide jobs
+    
+    The holder keeps a dedicated connection open for as long as it lives; when that
+    worker exits or its connection drops, the lock is released and the next worker to
+    check takes over. Without Postgres (SQLite in development) every worker holds it.
+    """
+    
+    def __init__(self, key: int):
+        self.key = key
+        self._engine = None
+        self._connection = None
+        self._lock = threading.Lock()
+    
+    def held(self) -> bool:
+        if engine.dialect.name != "postgresql":
+            return True
+        with self._lock:
+            if self._connection is not None:
+                try:
+                    self._connection.exec_driver_sql("SELECT 1")
+                    return True
+                except Exception:
+                    # The lock went with the connection
+                    self._close()
+            if self._engine is None:
+                # Outside the request pool so the held connection isn't recycled or counted against it
+                self._engine = create_engine(engine.url, poolclass=NullPool, isolation_level="AUTOCOMMIT")
+            connection = self._engine.connect()
+            try:
+                acquired = connection.execute(select(func.pg_try_advisory_lock(self.key))).scalar()
+            except Exception:
+                connection.close()
+                raise
+            if acquired:
+                self._connection = connection
+            else:
+                connection.close()
+            return acquired
+    
+    def _close(self):
+        try:
+            self._connection.close()
+        except Exception:
+            pass
+        self._connection = None
+
+scheduler_lock = SchedulerLock(key=0x76616E61)  # arbitrary, shared by every worker
+
+async def _run_every(minutes: float, job, database_wide: bool):
+    while True:
+        await asyncio.sleep(minutes * 60)
+        try:
+            if database_wide and not await run_in_threadpool(scheduler_lock.held):
+                continue
+            await run_in_threadpool(job)
+        except Exception as e:
+            # A failed run should not stop the schedule
+            print(f"Scheduled job {job.__name__} failed: {str(e)}")
+
+def start_scheduler() -> list:
+    """Start the periodic jobs on the running event loop (intervals of 0 disable a job)"""
+    # (interval, job, database-wide: only the scheduler lock holder runs it)
+    jobs = [
+        (TOKEN_PURGE_INTERVAL_MINUTES, purge_expired_tokens, True),
+        (REVOCATION_SYNC_INTERVAL_MINUTES, sync_revocations, False),
+        (STATISTICS_REBUILD_INTERVAL_MINUTES, rebuild_rollups, True),
+        (CALENDAR_REBUILD_INTERVAL_MINUTES, rebuild_projection, True),
+        (SYNC_CHANGE_PURGE_INTERVAL_MINUTES, purge_booking_changes, True),
+    ]
+    return [
+        asyncio.create_task(_run_every(minutes, job, database_wide))
+        for minutes, job, database_wide in jobs if minutes > 0
+    ]
+
+if __name__ == "__main__":
+    print(f"Purged {purge_expired_tokens()} expired token(s)")
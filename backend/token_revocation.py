@@ -0,0 +1,101 @@
+"""
+Revocation list for JWTs
+
+Two kinds of entries are kept, both in the token_revocations table and mirrored
+in memory so request-time checks are a dict lookup:
+    jti     - a single refresh token that has been rotated or revoked
+    user_id - every token for that user issued before revoked_at
+Rows are only needed until the tokens they cover expire, after which the
+scheduled purge removes them. Other workers pick up new rows on the next sync.
+"""
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from database import SessionLocal
+from models import TokenRevocation
+
+class RevocationStore:
+    def __init__(self):
+        self._jtis = {}        # jti -> expiry (unix time)
+        self._users = {}       # user_id -> revoked_at (unix time)
+        self._lock = threading.Lock()
+    
+    def is_revoked(self, payload: dict) -> bool:
+        jti = payload.get("jti")
+        if jti and jti in self._jtis:
+            return True
+        revoked_at = self._users.get(payload.get("user_id"))
+        return revoked_at is not None and payload.get("iat", 0) < revoked_at
+    
+    def remember_jti(self, jti: str, expires_at: float):
+        with self._lock:
+            self._jtis[jti] = expires_at
+    
+    def remember_user(self, user_id: int, revoked_at: float):
+        with self._lock:
+            self._users[user_id] = max(revoked_at, self._users.get(user_id, 0))
+    
+    def load(self, rows):
+        """Replace the in-memory view with rows from the table"""
+        jtis, users = {}, {}
+        for row in rows:
+            if row.jti:
+                jtis[row.jti] = row.expires_at.timestamp()
+            elif row.user_id is not None:
+                users[row.user_id] = max(row.revoked_at, users.get(row.user_id, 0))
+        with self._lock:
+            self._jtis, self._users = jtis, users
+
+revocation_store = RevocationStore()
+
+def revoke_refresh_token(db, jti: str, user_id: int, expires_at: float):
+    """Record a rotated/revoked refresh token; the caller commits"""
+    db.add(TokenRevocation(
+        jti=jti,
+        user_id=user_id,
+        revoked_at=time.time(),
+        expires_at=datetime.fromtimestamp(expires_at, tz=timezone.utc)
+    ))
+    revocation_store.remember_jti(jti, expires_at)
+
+def revoke_user_tokens(db, user_id: int, lifetime: timedelta):
+    """Invalidate every access and refresh token issued to a user so far; the caller commits"""
+    now = time.time()
+    db.add(TokenRevocation(
+        user_id=user_id,
+        revoked_at=now,
+        # Once the longest-lived token issued before now has expired the row is no longer needed
+        expires_at=datetime.fromtimestamp(now, tz=timezone.utc) + lifetime
+    ))
+    revocation_store.remember_user(user_id, now)
+
+def is_refresh_token_revoked(db, jti: str, user_id: Optional[int], issued_at: float) -> bool:
+    """Authoritative check against the table, used when a refresh token is exchanged"""
+    if db.query(TokenRevocation.id).filter(TokenRevocation.jti == jti).first():
+        return True
+    return db.query(TokenRevocation.id).filter(
+        TokenRevocation.jti.is_(None),
+        TokenRevocation.user_id == user_id,
+        TokenRevocation.revoked_at > issued_at
+    ).first() is not None
+
+def sync_revocations():
+    """Reload the in-memory list from the table (picks up revocations made by other workers)"""
+    db = SessionLocal()
+    try:
+        now = datetime.now(timezone.utc)
+        revocation_store.load(db.query(TokenRevocation).filter(TokenRevocation.expires_at >= now).all())
+    finally:
+        db.close()
+
+def purge_expired_revocations() -> int:
+    db = SessionLocal()
+    try:
+        deleted = db.query(TokenRevocation).filter(
+            TokenRevocation.expires_at < datetime.now(timezone.utc)
+        ).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+    finally:
+        db.close()
@@ -17,9 +17,28 @@ interface AuditEntry {
   details: string;
 }
 
+interface AuditPage {
+  entries: AuditEntry[];
+  next_cursor: string | null;
+}
+
+const PAGE_SIZE = 200;
+
+const fetchAuditPage = async (start?: string, end?: string, cursor?: string | null): Promise<AuditPage> => {
+  const params: any = { limit: PAGE_SIZE };
+  if (start) params.start_date = start;
+  if (end) params.end_date = end;
+  if (cursor) params.cursor = cursor;
+  const response = await api.get('/api/admin/audit-trail', { params });
+  return response.data;
+};
+
 const AuditTrail: React.FC = () => {
   const [auditEntries, setAuditEntries] = useState<AuditEntry[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(false);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [exporting, setExporting] = useState(false);
   const [startDate, setStartDate] = useState('');
   const [endDate, setEndDate] = useState('');
 
@@ -38,12 +57,9 @@ const AuditTrail: React.FC = () => {
   const fetchAuditTrail = async (start?: string, end?: string) => {
     setLoading(true);
     try {
-      const params: any = {};
-      if (start) params.start_date = start;
-      if (end) params.end_date = end;
-      
-      const response = await api.get('/api/admin/audit-trail', { params });
-      setAuditEntries(response.data);
+      const page = await fetchAuditPage(start, end);
+      setAuditEntries(page.entries);
+      setNextCursor(page.next_cursor);
     } catch (error) {
       console.error('Error fetching audit trail:', error);
       alert('Error fetching audit trail data');
@@ -52,6 +68,21 @@ const AuditTrail: React.FC = () => {
     }
   };
 
+  const handleLoadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const page = await fetchAuditPage(startDate, endDate, nextCursor);
+      setAuditEntries(entries => [...entries, ...page.entries]);
+      setNextCursor(page.next_cursor);
+    } catch (error) {
+      console.error('Error fetching audit trail:', error);
+      alert('Error fetching audit trail data');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleSearch = () => {
     if (!startDate || !endDate) {
       alert('Please select both start and end dates');
@@ -60,14 +91,32 @@ const AuditTrail: React.FC = () => {
     fetchAuditTrail(startDate, endDate);
   };
 
-  const handleExportToExcel = () => {
+  const handleExportToExcel = async () => {
     if (auditEntries.length === 0) {
       alert('No data to export');
       return;
     }
 
+    // The table may only show the first pages; export the whole range
+    let allEntries = auditEntries;
+    let cursor = nextCursor;
+    setExporting(true);
+    try {
+      while (cursor) {
+        const page = await fetchAuditPage(startDate, endDate, cursor);
+        allEntries = [...allEntries, ...page.entries];
+        cursor = page.next_cursor;
+      }
+    } catch (error) {
+      console.error('Error fetching audit trail:', error);
+      alert('Error fetching audit trail data');
+      return;
+    } finally {
+      setExporting(false);
+    }
+
     // Prepare data for Excel
-    const excelData = auditEntries.map(entry => ({
+    const excelData = allEntries.map(entry => ({
       'Date & Time': new Date(entry.timestamp).toLocaleString('en-US', {
         year: 'numeric',
         month: 'short',
@@ -165,10 +214,10 @@ const AuditTrail: React.FC = () => {
           <button
             onClick={handleExportToExcel}
             className="btn btn-success"
-            disabled={loading || auditEntries.length === 0}
+            disabled={loading || exporting || auditEntries.length === 0}
             style={{ padding: '10px 20px', backgroundColor: '#28a745', color: 'white' }}
           >
-            📥 Export to Excel
+            {exporting ? '⏳ Exporting...' : '📥 Export to Excel'}
           </button>
         </div>
       </div>
@@ -182,7 +231,7 @@ const AuditTrail: React.FC = () => {
       ) : auditEntries.length > 0 ? (
         <>
           <div style={{ marginBottom: '15px', color: '#6c757d', fontSize: '14px' }}>
-            Showing {auditEntries.length} audit entry(ies) from {new Date(startDate).toLocaleDateString()} to {new Date(endDate).toLocaleDateString()}
+            Showing {auditEntries.length}{nextCursor ? '+' : ''} audit entry(ies) from {new Date(startDate).toLocaleDateString()} to {new Date(endDate).toLocaleDateString()}
           </div>
           <div style={{ overflowX: 'auto' }}>
             <table className="table">
@@ -260,6 +309,18 @@ const AuditTrail: React.FC = () => {
               </tbody>
             </table>
           </div>
+          {nextCursor && (
+            <div style={{ textAlign: 'center', marginTop: '15px' }}>
+              <button
+                onClick={handleLoadMore}
+                className="btn btn-primary"
+                disabled={loadingMore}
+                style={{ padding: '10px 20px' }}
+              >
+                {loadingMore ? '⏳ Loading...' : 'Load more'}
+              </button>
+            </div>
+          )}
         </>
       ) : (
         <div style={{ 
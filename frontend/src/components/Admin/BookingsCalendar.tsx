@@ -48,12 +48,16 @@ const BookingsCalendar: React.FC = () => {
 
   useEffect(() => {
     fetchAllData();
-  }, []);
+  }, [currentDate]);
 
   const fetchAllData = async () => {
     try {
+      // Only the bookings touching the weeks on screen
+      const { gridStart, gridEnd } = getVisibleRange(currentDate);
       const [bookingsRes, holidaysRes, peakSeasonsRes, maintenanceRes] = await Promise.all([
-        api.get('/api/admin/bookings-calendar'),
+        api.get('/api/admin/bookings-calendar', {
+          params: { start: formatDateLocal(gridStart), end: formatDateLocal(gridEnd) }
+        }),
         api.get('/api/admin/holidays'),
         api.get('/api/admin/peak-seasons'),
         api.get('/api/admin/maintenance-blocks')
@@ -69,6 +73,16 @@ const BookingsCalendar: React.FC = () => {
     }
   };
 
+  // The grid shows whole weeks: from the Sunday on or before the 1st to the Saturday on or after the last day
+  const getVisibleRange = (date: Date) => {
+    const firstDay = new Date(date.getFullYear(), date.getMonth(), 1);
+    const lastDay = new Date(date.getFullYear(), date.getMonth() + 1, 0);
+    return {
+      gridStart: new Date(firstDay.getFullYear(), firstDay.getMonth(), 1 - firstDay.getDay()),
+      gridEnd: new Date(lastDay.getFullYear(), lastDay.getMonth(), lastDay.getDate() + 6 - lastDay.getDay())
+    };
+  };
+
   const getDaysInMonth = (date: Date) => {
     const year = date.getFullYear();
     const month = date.getMonth();
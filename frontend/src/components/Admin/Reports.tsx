@@ -65,16 +65,16 @@ const Reports: React.FC = () => {
   const fetchTodayStats = async () => {
     try {
       setTodayStatsLoading(true);
+      const today = new Date();
+      const todayStr = `${today.getFullYear()}-${String(today.getMonth() + 1).padStart(2, '0')}-${String(today.getDate()).padStart(2, '0')}`;
+      
       const [pendingMembersRes, pendingBookingsRes, bookingsRes, maintenanceRes] = await Promise.all([
         api.get('/api/admin/pending-members'),
         api.get('/api/admin/approval-queue'),
-        api.get('/api/admin/bookings-calendar'),
+        api.get('/api/admin/bookings-calendar', { params: { start: todayStr, end: todayStr } }),
         api.get('/api/admin/maintenance-blocks')
       ]);
 
-      const today = new Date();
-      const todayStr = `${today.getFullYear()}-${String(today.getMonth() + 1).padStart(2, '0')}-${String(today.getDate()).padStart(2, '0')}`;
-      
       // Number of pending requests (pending members)
       const noOfPendingRequests = pendingMembersRes.data.length;
       
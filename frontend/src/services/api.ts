@@ -21,12 +21,45 @@ api.interceptors.request.use((config) => {
   return config;
 });
 
-// Handle token expiration
+// Share one refresh call between requests that fail at the same time
+let refreshPromise: Promise<string> | null = null;
+
+const refreshAccessToken = (): Promise<string> => {
+  if (!refreshPromise) {
+    const refreshToken = localStorage.getItem('refresh_token');
+    refreshPromise = (refreshToken
+      ? axios.post(`${API_URL}/api/auth/refresh`, { refresh_token: refreshToken }).then((response) => {
+          localStorage.setItem('token', response.data.access_token);
+          localStorage.setItem('refresh_token', response.data.refresh_token);
+          return response.data.access_token as string;
+        })
+      : Promise.reject(new Error('No refresh token'))
+    ).finally(() => {
+      refreshPromise = null;
+    });
+  }
+  return refreshPromise;
+};
+
+// Handle token expiration: refresh once and retry, otherwise send the user to login
 api.interceptors.response.use(
   (response) => response,
-  (error) => {
-    if (error.response?.status === 401) {
+  async (error) => {
+    const original = error.config;
+    const isAuthCall = original?.url?.startsWith('/api/auth/login') || original?.url?.startsWith('/api/auth/refresh');
+    if (error.response?.status === 401 && original && !original._retry && !isAuthCall) {
+      original._retry = true;
+      try {
+        const token = await refreshAccessToken();
+        original.headers.Authorization = `Bearer ${token}`;
+        return api(original);
+      } catch (refreshError) {
+        // Fall through to logout
+      }
+    }
+    if (error.response?.status === 401 && !isAuthCall) {
       localStorage.removeItem('token');
+      localStorage.removeItem('refresh_token');
       localStorage.removeItem('user');
       window.location.href = '/login';
     }